@@ -1,4 +1,10 @@
-from app.auth.utils import get_password_hash, verify_password
+from app.auth.utils import (
+    get_password_hash,
+    verify_password,
+    get_password_hash_async,
+    verify_password_async,
+    shutdown_hash_executor
+)
 from app.auth.jwt import (
     create_access_token, 
     ACCESS_TOKEN_EXPIRE_MINUTES
@@ -9,14 +15,19 @@ from app.auth.dependencies import (
     get_current_user,
     oauth2_scheme
 )
+from app.auth.cache import principal_cache
 
 __all__ = [
     "get_password_hash",
     "verify_password",
+    "get_password_hash_async",
+    "verify_password_async",
+    "shutdown_hash_executor",
     "create_access_token",
     "ACCESS_TOKEN_EXPIRE_MINUTES",
     "get_user",
     "authenticate_user", 
     "get_current_user",
-    "oauth2_scheme"
+    "oauth2_scheme",
+    "principal_cache"
 ]
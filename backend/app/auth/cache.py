@@ -0,0 +1,87 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from app.models import OrmUser
+from config import Config
+
+
+class PrincipalCache:
+    """
+    In-process LRU cache of authenticated principals keyed by the raw JWT.
+
+    A cached token has already had its signature verified, so a hit skips both
+    the jose decode and the users table lookup. Entries never outlive the
+    token's own `exp` claim.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[OrmUser, float]]" = OrderedDict()
+        self._tokens_by_username: Dict[str, Set[str]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, token: str) -> Optional[OrmUser]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if expires_at <= time.time():
+            self._remove(token)
+            return None
+        self._entries.move_to_end(token)
+        return user
+
+    def put(self, token: str, user: OrmUser, token_exp: Optional[float]) -> None:
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, float(token_exp))
+        if expires_at <= time.time():
+            return
+
+        # Store a detached snapshot so no request shares a session-bound instance
+        snapshot = OrmUser(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            hashed_password=user.hashed_password,
+        )
+        self._remove(token)
+        self._entries[token] = (snapshot, expires_at)
+        self._tokens_by_username.setdefault(user.username, set()).add(token)
+
+        while len(self._entries) > self.max_entries:
+            oldest_token = next(iter(self._entries))
+            self._remove(oldest_token)
+
+    def invalidate_user(self, username: str) -> None:
+        """Drop every cached token for a user, e.g. after a password or profile change."""
+        for token in list(self._tokens_by_username.get(username, ())):
+            self._remove(token)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tokens_by_username.clear()
+
+    def _remove(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        username = entry[0].username
+        tokens = self._tokens_by_username.get(username)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_username[username]
+
+
+principal_cache = PrincipalCache(
+    max_entries=Config.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=Config.PRINCIPAL_CACHE_TTL_SECONDS,
+)
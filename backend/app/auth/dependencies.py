@@ -7,8 +7,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import TokenData, OrmUser
 from app.core.dependencies import get_db_session
-from app.auth.utils import verify_password
+from app.auth.utils import (
+    verify_password_async,
+    get_password_hash_async,
+    password_needs_rehash
+)
 from app.auth.jwt import SECRET_KEY, ALGORITHM
+from app.auth.cache import principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -18,18 +23,26 @@ async def get_user(db: AsyncSession, username: str) -> Optional[OrmUser]:
     return result.scalar_one_or_none()
 
 async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[OrmUser]:
-    """Authenticates a user using ORM."""
+    """Authenticates a user using ORM, upgrading the stored hash if the bcrypt cost changed."""
     user = await get_user(db, username)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(password)
+        await db.commit()
+        principal_cache.invalidate_user(user.username)
     return user
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db_session)
 ) -> OrmUser:
+    cached_user = principal_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -46,4 +59,5 @@ async def get_current_user(
     user = await get_user(db, username=token_data.username)
     if user is None:
         raise credentials_exception
+    principal_cache.put(token, user, payload.get("exp"))
     return user
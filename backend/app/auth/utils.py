@@ -1,9 +1,66 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 import bcrypt
+from config import Config
+
+# Dedicated pool so bcrypt never runs on the event loop or in the default executor
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_hash_slots: Optional[asyncio.Semaphore] = None
+
+def _get_hash_executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(
+            max_workers=Config.PASSWORD_HASH_WORKERS,
+            thread_name_prefix="bcrypt"
+        )
+    return _hash_executor
+
+def _get_hash_slots() -> asyncio.Semaphore:
+    # Admission control: callers beyond the pool size wait here instead of
+    # piling work into the executor queue
+    global _hash_slots
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(Config.PASSWORD_HASH_WORKERS)
+    return _hash_slots
 
 def get_password_hash(password: str) -> str:
     """Hash a password using bcrypt."""
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=Config.BCRYPT_ROUNDS)).decode()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash."""
     return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check whether a stored hash was made with a different cost factor than configured."""
+    try:
+        # bcrypt hashes look like $2b$12$<salt+hash>
+        rounds = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != Config.BCRYPT_ROUNDS
+
+async def _run_in_hash_pool(func, *args):
+    async with _get_hash_slots():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_executor(), func, *args)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the dedicated bcrypt pool."""
+    return await _run_in_hash_pool(get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the dedicated bcrypt pool."""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+def shutdown_hash_executor() -> None:
+    """Stop the bcrypt pool; called from the application lifespan."""
+    global _hash_executor, _hash_slots
+    if _hash_executor is not None:
+        # Never block the event loop on a running bcrypt job; queued ones are dropped
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+    _hash_slots = None
@@ -1,9 +1,18 @@
-from app.core.database import engine, metadata, async_session_maker
-from app.core.dependencies import get_db_session
+from app.core.database import (
+    engine,
+    read_engine,
+    metadata,
+    async_session_maker,
+    read_session_maker
+)
+from app.core.dependencies import get_db_session, get_read_db_session
 
 __all__ = [
     "engine", 
+    "read_engine",
     "metadata", 
     "async_session_maker",
-    "get_db_session"
+    "read_session_maker",
+    "get_db_session",
+    "get_read_db_session"
 ]
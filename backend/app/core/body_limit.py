@@ -0,0 +1,46 @@
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+REQUEST_TOO_LARGE_DETAIL = "Request body is too large"
+
+
+class BodySizeLimitMiddleware:
+    """
+    Rejects request bodies larger than max_body_bytes with a 413.
+
+    A declared Content-Length over the limit is refused before anything is
+    read; otherwise the byte count is checked as chunks arrive, so an
+    oversized (or chunked) upload is aborted as soon as it crosses the limit
+    instead of being spooled to disk by the multipart parser first.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_bytes: int):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            response = JSONResponse({"detail": REQUEST_TOO_LARGE_DETAIL}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received_bytes = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                received_bytes += len(message.get("body", b""))
+                if received_bytes > self.max_body_bytes:
+                    # Raised inside body parsing; FastAPI turns it into the response
+                    raise HTTPException(status_code=413, detail=REQUEST_TOO_LARGE_DETAIL)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -1,3 +1,4 @@
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker 
 import os
@@ -6,9 +7,10 @@ from config import Config
 from app.models import Base
 
 DATABASE_URL = Config.DATABASE_URL
+IS_SQLITE = DATABASE_URL.startswith('sqlite')
 
 # If using SQLite, make sure the database file has proper permissions
-if DATABASE_URL.startswith('sqlite'):
+if IS_SQLITE:
     # Extract the database path from the URL (assuming format sqlite+aiosqlite:///./path)
     db_path_str = DATABASE_URL.split(':///')[-1]
     db_path = Path(db_path_str)
@@ -26,12 +28,46 @@ if DATABASE_URL.startswith('sqlite'):
 else:
     connect_args = {}
 
+def _apply_sqlite_pragmas(dbapi_connection, read_only: bool) -> None:
+    """Apply the configured SQLite pragmas to a freshly opened connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={Config.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={Config.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={Config.SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size={Config.SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={Config.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA temp_store={Config.SQLITE_TEMP_STORE}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
 engine = create_async_engine(
     DATABASE_URL,
     connect_args=connect_args,
     echo=False  # debug için true todo: kaldır
 )
 
+if IS_SQLITE:
+    # Separate pool for reads: with WAL, readers never wait on the writer connection
+    read_engine = create_async_engine(
+        DATABASE_URL,
+        connect_args=connect_args,
+        echo=False
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_write_connect(dbapi_connection, connection_record):
+        _apply_sqlite_pragmas(dbapi_connection, read_only=False)
+
+    @event.listens_for(read_engine.sync_engine, "connect")
+    def _on_read_connect(dbapi_connection, connection_record):
+        _apply_sqlite_pragmas(dbapi_connection, read_only=True)
+else:
+    read_engine = engine
+
 async_session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+read_session_maker = sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
 
 metadata = Base.metadata
@@ -1,8 +1,13 @@
 from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import async_session_maker
+from app.core.database import async_session_maker, read_session_maker
 
 async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
     """Dependency that provides an SQLAlchemy AsyncSession."""
     async with async_session_maker() as session:
         yield session
+
+async def get_read_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency that provides a read-only AsyncSession on the separate read engine."""
+    async with read_session_maker() as session:
+        yield session
@@ -0,0 +1,126 @@
+import json
+from typing import List, Optional, Tuple
+
+from sqlalchemy import bindparam, inspect, text
+
+# (table, column, DDL) for columns added to existing tables
+NEW_COLUMNS = [
+    ("ai_jobs", "timings", "TEXT"),
+    ("ai_jobs", "heartbeat_at", "DATETIME"),
+    ("stories", "page_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("stories", "version", "INTEGER NOT NULL DEFAULT 1"),
+]
+
+# (index, table, columns) for indexes added to existing tables
+NEW_INDEXES = [
+    ("ix_stories_created_at_id", "stories", "created_at, id"),
+    ("ix_stories_likes_id", "stories", "likes, id"),
+    ("ix_stories_read_count_id", "stories", "read_count, id"),
+]
+
+# Stories moved from the JSON content column to story_pages per committed transaction
+CONTENT_MIGRATION_BATCH = 500
+
+
+def _table_names(sync_conn):
+    return set(inspect(sync_conn).get_table_names())
+
+
+def _column_names(sync_conn, table_name):
+    return {column["name"] for column in inspect(sync_conn).get_columns(table_name)}
+
+
+async def add_missing_columns(conn) -> None:
+    """Add columns introduced after a table was first created (create_all never alters tables)."""
+    for table_name, column_name, column_ddl in NEW_COLUMNS:
+        columns = await conn.run_sync(_column_names, table_name)
+        if column_name not in columns:
+            await conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_ddl}"))
+
+
+async def add_missing_indexes(conn) -> None:
+    """Create indexes introduced after a table was first created (create_all skips existing tables)."""
+    for index_name, table_name, columns in NEW_INDEXES:
+        await conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns})"))
+
+
+async def migrate_legacy_reactions(conn) -> None:
+    """Fold the old story_likes/story_dislikes tables into story_reactions and drop them."""
+    table_names = await conn.run_sync(_table_names)
+    for legacy_table, value in (("story_likes", 1), ("story_dislikes", -1)):
+        if legacy_table not in table_names:
+            continue
+        # Likes are copied first, so a user present in both tables keeps the like
+        await conn.execute(text(
+            "INSERT OR IGNORE INTO story_reactions (story_id, user_id, value) "
+            f"SELECT story_id, user_id, {value} FROM {legacy_table}"
+        ))
+        await conn.execute(text(f"DROP TABLE {legacy_table}"))
+
+
+def _legacy_pages(content: str) -> List[Tuple[Optional[str], Optional[str]]]:
+    """(text, image) pairs from an old content blob; text that is not a page list becomes one page."""
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return [(content, None)]
+    if not isinstance(data, list):
+        return [(str(data), None)]
+    return [(page.get("text"), page.get("image")) for page in data if isinstance(page, dict)]
+
+
+async def _migrate_content_batch(conn) -> bool:
+    """Move one batch of content blobs into story_pages; False once none are left."""
+    rows = (await conn.execute(text(
+        "SELECT id, content FROM stories WHERE content IS NOT NULL AND content != '' "
+        f"ORDER BY id LIMIT {CONTENT_MIGRATION_BATCH}"
+    ))).all()
+    if not rows:
+        return False
+    page_rows = []
+    page_counts = []
+    for story_id, content in rows:
+        pages = _legacy_pages(content)
+        page_rows.extend(
+            {"story_id": story_id, "page_index": index, "text": page_text, "image": image}
+            for index, (page_text, image) in enumerate(pages)
+        )
+        page_counts.append({"story_id": story_id, "page_count": len(pages)})
+    story_ids = {"story_ids": [story_id for story_id, _ in rows]}
+    await conn.execute(
+        text("DELETE FROM story_pages WHERE story_id IN :story_ids").bindparams(
+            bindparam("story_ids", expanding=True)
+        ),
+        story_ids
+    )
+    if page_rows:
+        await conn.execute(text(
+            "INSERT INTO story_pages (story_id, page_index, text, image) "
+            "VALUES (:story_id, :page_index, :text, :image)"
+        ), page_rows)
+    await conn.execute(
+        text("UPDATE stories SET content = '', page_count = :page_count WHERE id = :story_id"),
+        page_counts
+    )
+    return True
+
+
+async def migrate_content_to_pages(engine) -> None:
+    """
+    Split stories.content JSON blobs into story_pages rows and empty the old column.
+
+    Each batch of CONTENT_MIGRATION_BATCH stories commits in its own
+    transaction, so converting a large table does not hold the writer lock
+    for the whole startup; an interrupted run resumes where it stopped.
+    """
+    while True:
+        async with engine.begin() as conn:
+            if not await _migrate_content_batch(conn):
+                return
+
+
+async def run_migrations(conn) -> None:
+    """Bring an existing database up to the current schema; safe to run on every startup."""
+    await add_missing_columns(conn)
+    await add_missing_indexes(conn)
+    await migrate_legacy_reactions(conn)
@@ -2,11 +2,13 @@ from app.models.base import Base
 from app.models.user import OrmUser, UserBase, UserCreate, User
 from app.models.token import Token, TokenData
 from app.models.story import (
-    OrmStory, OrmTag, TagBase, Tag,
+    OrmStory, OrmStoryPage, OrmTag, TagBase, Tag,
     StoryBase, StoryCreate, StoryList, StoryDetail,
-    StoriesResponse, AuthorInfo, Page
+    StoriesResponse, AuthorInfo, Page, PageDetail, StoryPage, StoryPagesResponse,
+    PageInsert, PageReplace, PageMove, PageDelete, PageOperation, StoryPatch
 )
 from app.models.ai_story import AIStoryRequest, AIStoryOutput, AIPageContent
+from app.models.ai_job import OrmAIJob, AIJobStatus
 
 __all__ = [
     "Base",
@@ -17,6 +19,7 @@ __all__ = [
     "Token",
     "TokenData",
     "OrmStory",
+    "OrmStoryPage",
     "OrmTag",
     "TagBase",
     "Tag",
@@ -27,7 +30,18 @@ __all__ = [
     "StoriesResponse",
     "AuthorInfo",
     "Page",
+    "PageDetail",
+    "StoryPage",
+    "StoryPagesResponse",
+    "PageInsert",
+    "PageReplace",
+    "PageMove",
+    "PageDelete",
+    "PageOperation",
+    "StoryPatch",
     "AIStoryRequest",
     "AIStoryOutput",
-    "AIPageContent"
+    "AIPageContent",
+    "OrmAIJob",
+    "AIJobStatus"
 ]
@@ -0,0 +1,56 @@
+import json
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, field_validator
+from sqlalchemy import String, Integer, ForeignKey, Text, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+AI_JOB_QUEUED = "queued"
+AI_JOB_RUNNING = "running"
+AI_JOB_SUCCEEDED = "succeeded"
+AI_JOB_FAILED = "failed"
+
+class OrmAIJob(Base):
+    __tablename__ = "ai_jobs"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
+    status: Mapped[str] = mapped_column(String(20), default=AI_JOB_QUEUED, index=True)
+    stage: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    progress_current: Mapped[int] = mapped_column(Integer, default=0)
+    progress_total: Mapped[int] = mapped_column(Integer, default=0)
+    user_prompt: Mapped[str] = mapped_column(String(2000))
+    category: Mapped[str] = mapped_column(String(50))
+    # Not a foreign key: the job record outlives a deleted story
+    story_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)
+    # JSON list of pipeline spans (stage, seconds, bytes, retries, tokens)
+    timings: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Refreshed by the process running the job; a stale value means its owner is gone
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+# --- Pydantic Models ---
+
+class AIJobStatus(BaseModel):
+    id: str
+    status: str
+    stage: Optional[str] = None
+    progress_current: int = 0
+    progress_total: int = 0
+    story_id: Optional[int] = None
+    error: Optional[str] = None
+    timings: Optional[List[dict]] = None
+    created_at: datetime
+    updated_at: datetime
+
+    @field_validator('timings', mode='before')
+    @classmethod
+    def deserialize_timings(cls, v):
+        if isinstance(v, str):
+            return json.loads(v) if v else None
+        return v
+
+    class Config:
+        from_attributes = True
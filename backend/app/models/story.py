@@ -1,13 +1,12 @@
 from datetime import datetime, timezone
-from typing import List, Optional
-from pydantic import BaseModel, field_validator
-import json
-import logging # For potential logging in validator
-from sqlalchemy import String, Integer, Boolean, ForeignKey, Table, Column
+from typing import Annotated, Dict, List, Literal, Optional, Union
+from pydantic import AliasChoices, BaseModel, Field, computed_field
+from sqlalchemy import String, Integer, Boolean, ForeignKey, Table, Column, Index, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base
 from app.models.user import User, OrmUser
+from app.utils.file_utils import image_variant_urls
 
 # Association table for story tags
 story_tags = Table(
@@ -17,20 +16,13 @@ story_tags = Table(
     Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
 )
 
-# Association table for story likes
-story_likes = Table(
-    "story_likes",
-    Base.metadata,
-    Column("story_id", Integer, ForeignKey("stories.id"), primary_key=True),
-    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
-)
-
-# Association table for story dislikes
-story_dislikes = Table(
-    "story_dislikes",
+# One reaction row per (story, user): value is 1 for a like, -1 for a dislike
+story_reactions = Table(
+    "story_reactions",
     Base.metadata,
     Column("story_id", Integer, ForeignKey("stories.id"), primary_key=True),
     Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("value", Integer, nullable=False),
 )
 
 class OrmTag(Base):
@@ -46,12 +38,22 @@ class OrmTag(Base):
 
 class OrmStory(Base):
     __tablename__ = "stories"
+    __table_args__ = (
+        # Composite (sort_key, id) indexes back keyset pagination on the feeds
+        Index("ix_stories_created_at_id", "created_at", "id"),
+        Index("ix_stories_likes_id", "likes", "id"),
+        Index("ix_stories_read_count_id", "read_count", "id"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True)
     title: Mapped[str] = mapped_column(String(200))
     image: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
     description: Mapped[str] = mapped_column(String(500))
-    content: Mapped[str] = mapped_column(String(10000))
+    # Pre-story_pages JSON blob of all pages; the startup migration moves it into rows and empties it
+    legacy_content: Mapped[str] = mapped_column("content", String(10000), default="")
+    page_count: Mapped[int] = mapped_column(Integer, default=0)
+    # Bumped by every content edit; PATCH requests must name the version they were based on
+    version: Mapped[int] = mapped_column(Integer, default=1)
     likes: Mapped[int] = mapped_column(Integer, default=0)  # Net score (likes - dislikes)
     read_count: Mapped[int] = mapped_column(Integer, default=0)
     read_time: Mapped[int] = mapped_column(Integer, default=5)  # in minutes
@@ -68,22 +70,20 @@ class OrmStory(Base):
     tags: Mapped[List[OrmTag]] = relationship(
         secondary=story_tags, back_populates="stories"
     )
-    
-    # Users who liked this story
-    liked_by: Mapped[List[OrmUser]] = relationship(
-        "OrmUser",
-        secondary=story_likes,
-        back_populates="liked_stories"
-    )
-    
-    # Users who disliked this story
-    disliked_by: Mapped[List[OrmUser]] = relationship(
-        "OrmUser",
-        secondary=story_dislikes,
-        back_populates="disliked_stories"
+    # Rows are removed explicitly by the service, never loaded just to delete them
+    pages: Mapped[List["OrmStoryPage"]] = relationship(
+        order_by="OrmStoryPage.page_index", passive_deletes=True
     )
 
-logger = logging.getLogger(__name__) # Define logger for use in validator
+class OrmStoryPage(Base):
+    __tablename__ = "story_pages"
+
+    # (story_id, page_index) is the primary key, so page ranges are index range scans
+    story_id: Mapped[int] = mapped_column(ForeignKey("stories.id", ondelete="CASCADE"), primary_key=True)
+    page_index: Mapped[int] = mapped_column(Integer, primary_key=True)
+    text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    image: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+
 
 # --- Pydantic Models ---
 
@@ -95,6 +95,12 @@ class Page(BaseModel):
     class Config:
         from_attributes = True
 
+class PageDetail(Page):
+    @computed_field
+    @property
+    def image_variants(self) -> Optional[Dict[str, str]]:
+        return image_variant_urls(self.image)
+
 class TagBase(BaseModel):
     name: str
     
@@ -133,52 +139,68 @@ class StoryList(StoryBase):
     category: str
     published_date: datetime = datetime.now(timezone.utc)
     author: User
+
+    @computed_field
+    @property
+    def image_variants(self) -> Optional[Dict[str, str]]:
+        # Responsive WebP URLs (full/medium/thumb) for processed images
+        return image_variant_urls(self.image)
     
 class StoryDetail(StoryList):
-    content: List[Page] = []  # Changed from string to list of Page objects
+    # Read from OrmStory.pages; may hold only the first pages (see page_count)
+    content: List[PageDetail] = Field([], validation_alias=AliasChoices("pages", "content"))
+    page_count: int
+    version: int
     read_time: int
     read_count: int
     is_interactive: bool
     age_group: str
     tags: List[Tag] = []
 
-    @field_validator('content', mode='before')
-    @classmethod
-    def deserialize_content_from_json_string(cls, v: any) -> List[dict]:
-        if isinstance(v, str):
-            if not v:  # Handle empty string as empty list
-                return []
-            try:
-                data = json.loads(v)
-                if not isinstance(data, list):
-                    logger.warning(f"Story content from DB is not a list: {type(data)}. Value: {v[:100]}")
-                    # Decide handling: raise error or attempt to adapt.
-                    # For StoryDetail, a list of pages is expected.
-                    # If it's a single string not in a list, it's an error for StoryDetail.
-                    # The original code in service would wrap it: [Page(text=str(data))]
-                    # For a validator, it's cleaner to expect the correct format or fail.
-                    raise ValueError("Content JSON from DB must be a list of page objects.")
-                
-                # Pydantic will then validate each item in the list against the Page model.
-                return data # Return the list of dicts for Pydantic to process
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to decode story content JSON: {e}. Value: {v[:100]}")
-                raise ValueError(f"Invalid JSON in content field: {e}")
-        elif isinstance(v, list):
-            # If it's already a list (e.g., from internal model creation or tests), pass through.
-            return v
-        
-        # If v is None or other unexpected types, Pydantic will handle the type error,
-        # or we can raise a specific error here.
-        if v is None:
-            return [] # Treat None content as empty list
-            
-        logger.warning(f"Unexpected type for content field: {type(v)}. Expected str (JSON) or list.")
-        # Let Pydantic attempt to validate or fail for other types.
-        # Raising a ValueError here might be more explicit.
-        raise ValueError(f"Content must be a JSON string or a list of page objects, got {type(v)}")
+
+class StoryPage(PageDetail):
+    index: int = Field(validation_alias=AliasChoices("page_index", "index"))
+
+
+class StoryPagesResponse(BaseModel):
+    total: int  # page count of the whole story
+    pages: List[StoryPage]
+    next_from: Optional[int] = None  # pass back as ?from= for the following pages
+
+
+class PageInsert(BaseModel):
+    op: Literal["insert"]
+    index: int = Field(ge=0)  # pages from here on move one place back
+    page: Page
+
+
+class PageReplace(BaseModel):
+    op: Literal["replace"]
+    index: int = Field(ge=0)
+    page: Page
+
+
+class PageMove(BaseModel):
+    op: Literal["move"]
+    index: int = Field(ge=0)
+    to: int = Field(ge=0)  # position of the page once the move is done
+
+
+class PageDelete(BaseModel):
+    op: Literal["delete"]
+    index: int = Field(ge=0)
+
+
+PageOperation = Annotated[Union[PageInsert, PageReplace, PageMove, PageDelete], Field(discriminator="op")]
+
+
+class StoryPatch(BaseModel):
+    version: int  # StoryDetail.version the edit was made against
+    operations: List[PageOperation] = []  # applied in order, indexes as left by the previous one
+    tags: Optional[List[str]] = None  # replaces the story's tags when given
 
 
 class StoriesResponse(BaseModel):
-    total: int
+    total: Optional[int] = None  # omitted when the client sends include_total=false
     stories: List[StoryList]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= to fetch the next page
@@ -1,6 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from typing import List
+from sqlalchemy.orm import Mapped, mapped_column
 from app.models.base import Base
 
 # ORM User sınıfı
@@ -11,20 +10,6 @@ class OrmUser(Base):
     username: Mapped[str] = mapped_column(unique=True, index=True)
     email: Mapped[str] = mapped_column(unique=True, index=True)
     hashed_password: Mapped[str]
-    
-    # Stories liked by this user
-    liked_stories: Mapped[List["OrmStory"]] = relationship(
-        "OrmStory",
-        secondary="story_likes",
-        back_populates="liked_by"
-    )
-    
-    # Stories disliked by this user
-    disliked_stories: Mapped[List["OrmStory"]] = relationship(
-        "OrmStory",
-        secondary="story_dislikes",
-        back_populates="disliked_by"
-    )
 
 # --- Pydantic Modelleri ---
 
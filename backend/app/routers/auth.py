@@ -10,7 +10,7 @@ from app.core.dependencies import get_db_session
 from app.auth import (
     authenticate_user,
     create_access_token,
-    get_password_hash,
+    get_password_hash_async,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     get_current_user,
     get_user 
@@ -44,7 +44,7 @@ async def register_user(
         )
 
     # ORM User instance
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     db_user = OrmUser(
         username=user.username,
         email=user.email,
@@ -0,0 +1,27 @@
+from fastapi import APIRouter
+
+from app.services.feed_cache import feed_cache
+from app.services.ai_cache import ai_cache
+from app.services.ai_upstream import ai_upstream
+from app.services.ai_tracing import ai_stage_metrics
+from app.services.upload_cache import upload_cache
+from app.services.upload_gc import upload_gc
+from app.services.read_counter import read_count_buffer
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"]
+)
+
+@router.get("")
+async def get_metrics():
+    """izleme için iç sayaçları döndür"""
+    return {
+        "feed_cache": feed_cache.stats(),
+        "ai_cache": ai_cache.stats(),
+        "ai_upstream": ai_upstream.stats(),
+        "ai_stages": ai_stage_metrics.stats(),
+        "upload_cache": upload_cache.stats(),
+        "upload_gc": upload_gc.stats(),
+        "read_counts": read_count_buffer.stats()
+    }
@@ -1,24 +1,31 @@
-from fastapi import APIRouter, Depends, Query, status, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, Depends, Query, status, UploadFile, File, HTTPException, Form, Response
 from typing import Optional, Annotated, List, Dict
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import desc, asc, and_
 from pydantic import TypeAdapter, Json
 import json
 
-from app.core.dependencies import get_db_session
+from app.core.dependencies import get_db_session, get_read_db_session
 from app.auth.dependencies import get_current_user
-from app.models import OrmStory, StoryDetail, StoriesResponse, OrmUser, StoryCreate, StoryBase, Page
+from app.models import OrmStory, StoryDetail, StoriesResponse, StoryPagesResponse, StoryPatch, OrmUser, StoryCreate, StoryBase, Page
 from app.services.story_service import (
     get_stories_with_filter, 
     create_new_story,
     update_existing_story,
+    patch_story,
     delete_story_by_id,
     process_story_like,
     process_story_dislike,
-    increment_story_read_count
+    get_story_detail_by_id,
+    get_story_pages
 )
+from app.services.story_search import search_condition
+from app.services.story_totals import ALL_KEY, FEATURED_KEY, category_key, age_group_key
+from app.services.read_counter import read_count_buffer
+from app.services.feed_cache import feed_cache, FEATURED_FEED, NEW_FEED, POPULAR_FEED
 from app.utils.file_utils import save_upload_file
 from app.routers.story_routes import ai_story # Added ai_story router
+from config import Config
 
 router = APIRouter(
     prefix="/api/stories",
@@ -38,84 +45,118 @@ async def upload_story_image(
     try:
         file_path = await save_upload_file(file)
         return {"filename": file.filename, "file_path": file_path}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
 
+def _cached_feed_response(cache_key, generation, total, stories, next_cursor) -> Response:
+    """Serialize a public feed page once and keep the bytes in the feed cache"""
+    body = StoriesResponse(total=total, stories=stories, next_cursor=next_cursor).model_dump_json().encode()
+    feed_cache.put(cache_key, body, [story.id for story in stories], generation)
+    return Response(content=body, media_type="application/json")
+
 @router.get("/featured", response_model=StoriesResponse)
 async def get_featured_stories(
     current_user: Annotated[OrmUser, Depends(get_current_user)],
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: AsyncSession = Depends(get_db_session)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    db: AsyncSession = Depends(get_read_db_session)
 ):
     """öne çıkan hikayeleri getir"""
-    total, stories = await get_stories_with_filter(
+    cache_key = (FEATURED_FEED, limit, offset, cursor, include_total)
+    cached_body = feed_cache.get(cache_key)
+    if cached_body is not None:
+        return Response(content=cached_body, media_type="application/json")
+
+    generation = feed_cache.generation()
+    total, stories, next_cursor = await get_stories_with_filter(
         db, 
         OrmStory.featured == True,
         limit=limit, 
-        offset=offset
+        offset=offset,
+        cursor=cursor,
+        include_total=include_total,
+        total_key=FEATURED_KEY
     )
     
-    return {
-        "total": total,
-        "stories": stories
-    }
+    return _cached_feed_response(cache_key, generation, total, stories, next_cursor)
 
 @router.get("/new", response_model=StoriesResponse)
 async def get_new_stories(
     current_user: Annotated[OrmUser, Depends(get_current_user)],
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: AsyncSession = Depends(get_db_session)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    db: AsyncSession = Depends(get_read_db_session)
 ):
     """en yeni hikayeleri getir"""
-    total, stories = await get_stories_with_filter(
+    cache_key = (NEW_FEED, limit, offset, cursor, include_total)
+    cached_body = feed_cache.get(cache_key)
+    if cached_body is not None:
+        return Response(content=cached_body, media_type="application/json")
+
+    generation = feed_cache.generation()
+    total, stories, next_cursor = await get_stories_with_filter(
         db, 
         True,
         sort_column=OrmStory.created_at,
         sort_direction=desc,
         limit=limit, 
-        offset=offset
+        offset=offset,
+        cursor=cursor,
+        include_total=include_total,
+        total_key=ALL_KEY
     )
     
-    return {
-        "total": total,
-        "stories": stories
-    }
+    return _cached_feed_response(cache_key, generation, total, stories, next_cursor)
 
 @router.get("/popular", response_model=StoriesResponse)
 async def get_popular_stories(
     current_user: Annotated[OrmUser, Depends(get_current_user)],
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: AsyncSession = Depends(get_db_session)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    db: AsyncSession = Depends(get_read_db_session)
 ):
     """beğeni sayısına göre en popüler hikayeleri getir"""
-    total, stories = await get_stories_with_filter(
+    cache_key = (POPULAR_FEED, limit, offset, cursor, include_total)
+    cached_body = feed_cache.get(cache_key)
+    if cached_body is not None:
+        return Response(content=cached_body, media_type="application/json")
+
+    generation = feed_cache.generation()
+    total, stories, next_cursor = await get_stories_with_filter(
         db, 
         True,
         sort_column=OrmStory.likes,
         sort_direction=desc,
         limit=limit, 
-        offset=offset
+        offset=offset,
+        cursor=cursor,
+        include_total=include_total,
+        total_key=ALL_KEY
     )
     
-    return {
-        "total": total,
-        "stories": stories
-    }
+    return _cached_feed_response(cache_key, generation, total, stories, next_cursor)
 
 @router.get("/filter", response_model=StoriesResponse)
 async def filter_stories(
     current_user: Annotated[OrmUser, Depends(get_current_user)],
     category: Optional[str] = None,
     age_group: Optional[str] = None,
-    sort_by: str = Query("created_at", regex="^(created_at|likes|read_count)$"),
-    order: str = Query("desc", regex="^(asc|desc)$"),
+    sort_by: Optional[str] = Query(None, pattern="^(created_at|likes|read_count|relevance)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
     query: Optional[str] = None,
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: AsyncSession = Depends(get_db_session)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    db: AsyncSession = Depends(get_read_db_session)
 ):
     """kriterlere göre hikayeleri filtrele"""
     filter_conditions = []
@@ -127,15 +168,27 @@ async def filter_stories(
         filter_conditions.append(OrmStory.age_group == age_group)
 
     if query:
-        search_query = f"%{query}%"
-        filter_conditions.append(
-            (OrmStory.title.ilike(search_query)) |
-            (OrmStory.description.ilike(search_query))
-        )
+        filter_conditions.append(search_condition(query))
 
     combined_filter = and_(*filter_conditions) if filter_conditions else True
 
-    if sort_by == "created_at":
+    # single-dimension filters map onto the exact feed counters
+    total_key = None
+    if not query:
+        if category and not age_group:
+            total_key = category_key(category)
+        elif age_group and not category:
+            total_key = age_group_key(age_group)
+        elif not category and not age_group:
+            total_key = ALL_KEY
+
+    # searches rank by relevance unless the client asks for a specific order
+    if sort_by is None:
+        sort_by = "relevance" if query else "created_at"
+
+    if sort_by == "relevance":
+        sort_column = None
+    elif sort_by == "created_at":
         sort_column = OrmStory.created_at
     elif sort_by == "likes":
         sort_column = OrmStory.likes
@@ -144,28 +197,54 @@ async def filter_stories(
 
     sort_direction = desc if order == "desc" else asc
 
-    total, stories = await get_stories_with_filter(
+    total, stories, next_cursor = await get_stories_with_filter(
         db,
         combined_filter,
         sort_column=sort_column,
         sort_direction=sort_direction,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=cursor,
+        include_total=include_total,
+        total_key=total_key,
+        search_query=query
     )
     
     return {
         "total": total,
-        "stories": stories
+        "stories": stories,
+        "next_cursor": next_cursor
     }
 
 @router.get("/{story_id}", response_model=StoryDetail)
 async def get_story_detail(
     story_id: int,
     current_user: Annotated[OrmUser, Depends(get_current_user)],
-    db: AsyncSession = Depends(get_db_session)
+    page_limit: Optional[int] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_read_db_session)
 ):
-    """belirli bir hikaye için detaylı bilgileri getir"""
-    return await increment_story_read_count(db, story_id)
+    """belirli bir hikaye için detaylı bilgileri getir (page_limit ile yalnızca ilk sayfalar)"""
+    story = await get_story_detail_by_id(db, story_id, page_limit)
+    read_count_buffer.record(story_id)
+    return story
+
+@router.get("/{story_id}/pages", response_model=StoryPagesResponse)
+async def get_story_page_range(
+    story_id: int,
+    current_user: Annotated[OrmUser, Depends(get_current_user)],
+    start: int = Query(0, alias="from", ge=0),
+    end: Optional[int] = Query(None, alias="to", ge=0),
+    db: AsyncSession = Depends(get_read_db_session)
+):
+    """hikayenin [from, to) aralığındaki sayfalarını getir"""
+    limit = start + Config.STORY_PAGE_RANGE_LIMIT
+    end = limit if end is None else min(max(end, start), limit)
+    total, pages = await get_story_pages(db, story_id, start, end)
+    return {
+        "total": total,
+        "pages": pages,
+        "next_from": end if end < total else None
+    }
 
 @router.post("/", response_model=StoryDetail, status_code=status.HTTP_201_CREATED)
 async def create_story(
@@ -275,6 +354,20 @@ async def update_story(
             detail=f"Error updating story: {str(e)}"
         )
 
+@router.patch("/{story_id}", response_model=StoryDetail)
+async def patch_story_content(
+    story_id: int,
+    patch: StoryPatch,
+    current_user: Annotated[OrmUser, Depends(get_current_user)],
+    db: AsyncSession = Depends(get_db_session)
+):
+    """
+    - **version**: düzenlemenin dayandığı hikaye sürümü (farklıysa 409 döner)
+    - **operations**: sırayla uygulanan sayfa işlemleri (insert, replace, move, delete)
+    - **tags**: verilirse hikayenin etiketlerinin yerine geçer
+    """
+    return await patch_story(db, story_id, patch, current_user.id)
+
 @router.delete("/{story_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_story(
     story_id: int,
@@ -1,56 +1,88 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
 
+from app.core.database import read_session_maker
 from app.core.dependencies import get_db_session
 from app.auth.dependencies import get_current_user
-from app.models import OrmUser, StoryCreate, StoryDetail, Page, AIStoryRequest
-from app.services.story_service import create_new_story
-from app.services.ai_story_generator import generate_story_from_ai
+from app.models import OrmUser, AIStoryRequest, AIJobStatus
+from app.services.ai_jobs import ai_job_manager, TERMINAL_STATUSES
+from config import Config
 
 router = APIRouter()
 
-@router.post("/ai-generate", response_model=StoryDetail, status_code=status.HTTP_201_CREATED)
+@router.post("/ai-generate", response_model=AIJobStatus, status_code=status.HTTP_202_ACCEPTED)
 async def generate_ai_story(
     ai_request: AIStoryRequest,
     current_user: Annotated[OrmUser, Depends(get_current_user)],
     db: AsyncSession = Depends(get_db_session)
 ):
     """
-    Generate a new story using AI based on a user prompt and category.
-    The AI will generate the title, description, content, age group, and tags.
-    The image will be null.
+    Queue AI generation of a new story from a user prompt and category.
+    Returns the job immediately; follow it via GET /ai-jobs/{job_id} or the
+    /ai-jobs/{job_id}/events SSE stream. Re-submitting the same prompt while a
+    job is still pending returns that job instead of starting a new one.
     """
+    return await ai_job_manager.submit(db, current_user.id, ai_request)
+
+@router.get("/ai-jobs/{job_id}", response_model=AIJobStatus)
+async def get_ai_job(
+    job_id: str,
+    current_user: Annotated[OrmUser, Depends(get_current_user)],
+    db: AsyncSession = Depends(get_db_session)
+):
+    """Get the current status and progress of an AI generation job"""
+    return await ai_job_manager.get_job(db, job_id, current_user.id)
+
+@router.get("/ai-jobs/{job_id}/events")
+async def stream_ai_job_events(
+    job_id: str,
+    current_user: Annotated[OrmUser, Depends(get_current_user)],
+    db: AsyncSession = Depends(get_db_session)
+):
+    """
+    Server-Sent Events stream of job progress; closes once the job finishes.
+    Progress is pushed by the worker running the job when it runs in this
+    process; otherwise the job row is polled. Idle intervals send a keep-alive comment.
+    """
+    # Subscribe before reading the row so no update between the two is missed
+    listener = ai_job_manager.subscribe(job_id)
     try:
-        ai_generated_data = await generate_story_from_ai(
-            user_prompt=ai_request.user_prompt,
-            category=ai_request.category
-        )
-
-        # Prepare content pages
-        content_pages = [
-            Page(text=page.text, image=page.image) for page in ai_generated_data.content
-        ]
-
-        story_data_for_create = StoryCreate(
-            title=ai_generated_data.title,
-            image=ai_generated_data.image,  # Use the generated cover image path
-            description=ai_generated_data.description,
-            category=ai_request.category, # Category from user input
-            content=content_pages,
-            is_interactive=True,  # Default, or could be part of AI generation if needed
-            age_group=ai_generated_data.age_group,
-            tags=ai_generated_data.tags
-        )
-        
-        created_story = await create_new_story(db, story_data_for_create, current_user.id)
-        return created_story
-
-    except ValueError as ve: # Specific errors from AI service (config, validation, JSON)
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
-    except Exception as e:
-        # Catch-all for other unexpected errors during AI generation or story creation
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to generate or save AI story: {str(e)}"
-        )
+        job = await ai_job_manager.get_job(db, job_id, current_user.id)
+    except Exception:
+        ai_job_manager.unsubscribe(job_id, listener)
+        raise
+    initial = AIJobStatus.model_validate(job)
+
+    async def event_stream():
+        try:
+            snapshot = initial
+            yield f"event: progress\ndata: {snapshot.model_dump_json()}\n\n"
+            while snapshot.status not in TERMINAL_STATUSES:
+                try:
+                    latest = await asyncio.wait_for(listener.get(), Config.AI_JOB_EVENTS_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    # The job may be running in another worker process, whose
+                    # updates never reach this listener; read the row instead
+                    async with read_session_maker() as poll_db:
+                        latest = AIJobStatus.model_validate(
+                            await ai_job_manager.get_job(poll_db, job_id, current_user.id)
+                        )
+                    # Heartbeats touch updated_at without any progress to report
+                    if latest.model_dump(exclude={"updated_at"}) == snapshot.model_dump(exclude={"updated_at"}):
+                        # Comment line; keeps proxies from closing an idle stream
+                        yield ": keep-alive\n\n"
+                        continue
+                snapshot = latest
+                yield f"event: progress\ndata: {snapshot.model_dump_json()}\n\n"
+        finally:
+            ai_job_manager.unsubscribe(job_id, listener)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
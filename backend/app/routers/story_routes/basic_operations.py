@@ -3,13 +3,14 @@ from typing import Optional, Annotated
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import TypeAdapter
 
-from app.core.dependencies import get_db_session
+from app.core.dependencies import get_db_session, get_read_db_session
 from app.auth.dependencies import get_current_user
 from app.models import OrmUser, StoryCreate, StoryBase, StoryDetail
 from app.services.story_service import (
     create_new_story, update_existing_story, 
-    delete_story_by_id, increment_story_read_count
+    delete_story_by_id, get_story_detail_by_id
 )
+from app.services.read_counter import read_count_buffer
 from app.utils.file_utils import save_upload_file
 
 router = APIRouter()
@@ -18,10 +19,12 @@ router = APIRouter()
 async def get_story_detail(
     story_id: int,
     current_user: Annotated[OrmUser, Depends(get_current_user)],
-    db: AsyncSession = Depends(get_db_session)
+    db: AsyncSession = Depends(get_read_db_session)
 ):
     """Get detailed information for a specific story"""
-    return await increment_story_read_count(db, story_id)
+    story = await get_story_detail_by_id(db, story_id)
+    read_count_buffer.record(story_id)
+    return story
 
 @router.post("/", response_model=StoryDetail, status_code=status.HTTP_201_CREATED)
 async def create_story(
@@ -59,6 +62,8 @@ async def create_story(
             
         return await create_new_story(db, story_obj, current_user.id)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating story: {str(e)}")
 
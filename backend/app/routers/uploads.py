@@ -0,0 +1,133 @@
+import hashlib
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from app.services.upload_cache import upload_cache
+from app.utils.file_utils import image_fallback_keys
+from app.utils.image_processing import WEBP_EXTENSION
+from app.utils.storage import (
+    IMMUTABLE_CACHE_CONTROL,
+    InvalidStorageKeyError,
+    RangeNotSatisfiableError,
+    TEMP_SUFFIX,
+    content_type_for_key,
+    storage
+)
+from config import Config
+
+router = APIRouter(
+    prefix="/uploads",
+    tags=["uploads"]
+)
+
+def _etag(key: str) -> str:
+    # Keys are never rewritten, so the key alone identifies the bytes: a strong ETag without reading the file
+    return f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so a W/ prefix does not matter
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def _single_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) of a satisfiable single "bytes=" range; None for anything else."""
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start, _, end = spec.strip().partition("-")
+    if not (start or end) or not all(part.isdigit() for part in (start, end) if part):
+        return None
+    if not start:
+        start, end = max(0, size - int(end)), size - 1  # suffix range: the last N bytes
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start > end:
+        return None
+    return start, end
+
+async def _exists(key: str) -> bool:
+    return key in upload_cache or await storage.size(key) is not None
+
+def _accepts_webp(accept: str) -> bool:
+    """Whether an Accept header allows image/webp; the most specific matching range decides."""
+    quality_by_range = {}
+    for media_range in accept.lower().split(","):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        quality_by_range[media_type] = max(quality, quality_by_range.get(media_type, 0.0))
+    for media_type in ("image/webp", "image/*", "*/*"):
+        if media_type in quality_by_range:
+            return quality_by_range[media_type] > 0
+    return False
+
+async def _negotiate_webp(key: str, accept: Optional[str]) -> str:
+    """The JPEG/PNG copy of a WebP key when the client's Accept header leaves WebP out (or sets q=0)."""
+    if not accept or _accepts_webp(accept):
+        return key
+    for fallback_key in image_fallback_keys(key):
+        if await _exists(fallback_key):
+            return fallback_key
+    return key
+
+@router.api_route("/{key:path}", methods=["GET", "HEAD"])
+async def get_upload(key: str, request: Request):
+    """yüklenen veya üretilen dosyayı döndür (süresiz önbellek, ETag/304, Range, WebP seçimi)"""
+    # Half-written files from an interrupted put() are never served
+    if key.endswith(TEMP_SUFFIX):
+        raise HTTPException(status_code=404, detail="File not found")
+    try:
+        return await _serve_upload(key, request)
+    except InvalidStorageKeyError:
+        raise HTTPException(status_code=400, detail="Invalid file path")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    except RangeNotSatisfiableError:
+        raise HTTPException(status_code=416, detail="Range not satisfiable")
+
+async def _serve_upload(key: str, request: Request) -> Response:
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if Config.UPLOADS_WEBP_NEGOTIATION and key.endswith(WEBP_EXTENSION):
+        headers["Vary"] = "Accept"
+        key = await _negotiate_webp(key, request.headers.get("accept"))
+    headers["ETag"] = _etag(key)
+
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        if not await _exists(key):
+            raise FileNotFoundError(key)
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header is not None and if_range is not None and if_range.strip() != headers["ETag"]:
+        range_header = None  # the client's copy is stale: send the whole file
+
+    # Small files: one read (or a memory hit) instead of a streamed FileResponse
+    body = upload_cache.get(key)
+    if body is None:
+        body = await storage.read(key, Config.UPLOADS_INLINE_MAX_BYTES)
+        if body is not None:
+            upload_cache.put(key, body)
+    if body is not None:
+        headers["Accept-Ranges"] = "bytes"
+        media_type = content_type_for_key(key)
+        if range_header is None:
+            return Response(body, headers=headers, media_type=media_type)
+        byte_range = _single_range(range_header, len(body))
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+            return Response(body[start:end + 1], status_code=206, headers=headers, media_type=media_type)
+
+    # Large files and unusual ranges (multipart, unsatisfiable) are left to the backend
+    return await storage.response(key, headers=headers, range_header=range_header)
@@ -0,0 +1,149 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import unicodedata
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional
+
+import aiofiles
+
+from app.services.story_search import normalize_turkish
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+TEXT_NAMESPACE = "text"
+IMAGE_NAMESPACE = "images"
+
+
+def normalize_prompt(value: Optional[str]) -> str:
+    """Normalize a prompt so trivially different spellings share a cache entry."""
+    value = unicodedata.normalize("NFKC", value or "")
+    return " ".join(normalize_turkish(value).split())
+
+
+class AICache:
+    """
+    Persistent, content-addressed cache for AI generation results.
+
+    Each entry is a small JSON file named by the SHA-256 of its normalized
+    inputs (text output, or the stored path of a generated image). Concurrent
+    requests for the same key are coalesced so only one upstream call runs.
+    The directory is pruned by age and total size.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int, max_age_seconds: int, enabled: bool):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.enabled = enabled
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._last_prune = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(*parts: Optional[str]) -> str:
+        joined = "\x1f".join(normalize_prompt(part) for part in parts)
+        return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+    async def get_or_create(
+        self,
+        namespace: str,
+        key: str,
+        producer: Callable[[], Awaitable[Optional[dict]]],
+        is_valid: Optional[Callable[[dict], Awaitable[bool]]] = None
+    ) -> Optional[dict]:
+        """Return the cached value for key, or run producer once and store its result."""
+        if not self.enabled:
+            return await producer()
+
+        path = self.cache_dir / namespace / f"{key}.json"
+        cached = await self._read(path)
+        if cached is not None and (is_valid is None or await is_valid(cached)):
+            self.hits += 1
+            return cached
+
+        inflight_key = f"{namespace}:{key}"
+        inflight = self._inflight.get(inflight_key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[inflight_key] = future
+        try:
+            value = await producer()
+            if value is not None:
+                await self._write(path, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # waiters get it re-raised; don't warn when there are none
+            raise
+        finally:
+            del self._inflight[inflight_key]
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+    async def _read(self, path: Path) -> Optional[dict]:
+        try:
+            if time.time() - path.stat().st_mtime > self.max_age_seconds:
+                return None
+            async with aiofiles.open(path, "r", encoding="utf-8") as cache_file:
+                return json.loads(await cache_file.read())
+        except (OSError, ValueError):
+            return None
+
+    async def _write(self, path: Path, value: dict) -> None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+            async with aiofiles.open(temp_path, "w", encoding="utf-8") as cache_file:
+                await cache_file.write(json.dumps(value, ensure_ascii=False))
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Failed to write AI cache entry {path.name}: {e}")
+            return
+
+        # Prune at most once a minute, off the event loop
+        if time.time() - self._last_prune > 60:
+            self._last_prune = time.time()
+            await asyncio.to_thread(self.prune)
+
+    def prune(self) -> None:
+        """Drop expired entries, then the oldest ones until the cache fits max_bytes."""
+        now = time.time()
+        entries = []
+        for entry_path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = entry_path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.max_age_seconds:
+                entry_path.unlink(missing_ok=True)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, entry_path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            entry_path.unlink(missing_ok=True)
+            total_bytes -= size
+
+
+ai_cache = AICache(
+    cache_dir=Config.AI_CACHE_DIR,
+    max_bytes=Config.AI_CACHE_MAX_BYTES,
+    max_age_seconds=Config.AI_CACHE_MAX_AGE_SECONDS,
+    enabled=Config.AI_CACHE_ENABLED,
+)
@@ -0,0 +1,295 @@
+import asyncio
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+
+from fastapi import HTTPException
+from sqlalchemy import or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.database import async_session_maker
+from app.models import OrmAIJob, AIJobStatus, AIStoryRequest, StoryCreate, Page
+from app.models.ai_job import AI_JOB_QUEUED, AI_JOB_RUNNING, AI_JOB_SUCCEEDED, AI_JOB_FAILED
+from app.services.ai_story_generator import generate_story_from_ai
+from app.services.story_service import create_new_story
+from app.services.ai_tracing import span, start_trace
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {AI_JOB_SUCCEEDED, AI_JOB_FAILED}
+
+
+def build_story_create(ai_generated_data, category: str) -> StoryCreate:
+    """Map the AI output onto the regular story creation model"""
+    content_pages = [
+        Page(text=page.text, image=page.image) for page in ai_generated_data.content
+    ]
+    return StoryCreate(
+        title=ai_generated_data.title,
+        image=ai_generated_data.image,  # Use the generated cover image path
+        description=ai_generated_data.description,
+        category=category, # Category from user input
+        content=content_pages,
+        is_interactive=True,  # Default, or could be part of AI generation if needed
+        age_group=ai_generated_data.age_group,
+        tags=ai_generated_data.tags
+    )
+
+
+def _utcnow() -> datetime:
+    # Naive UTC, as stored in the heartbeat_at column
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class AIJobManager:
+    """
+    Runs AI story generation outside the HTTP request.
+
+    Jobs are persisted in the ai_jobs table and executed by a fixed pool of
+    worker tasks. A worker claims a job with a conditional UPDATE from queued
+    to running, so with several app processes each job runs exactly once.
+    The claiming process refreshes the job's heartbeat while it runs; running
+    jobs whose heartbeat went stale (their process died) are re-queued by
+    whichever process notices first. Progress changes are written to the job
+    row and pushed to in-process subscribers (SSE streams).
+    """
+
+    def __init__(self, workers: int, max_pending: int, lease_seconds: float):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.lease_seconds = lease_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: Set[str] = set()
+        self._running: Set[str] = set()
+        self._worker_tasks: List[asyncio.Task] = []
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._queued = set()
+        await self._recover()
+        self._worker_tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+        self._worker_tasks.append(asyncio.create_task(self._reaper()))
+
+    async def stop(self) -> None:
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        if self._running:
+            # Hand interrupted jobs back right away instead of waiting for their lease to expire
+            async with async_session_maker() as db:
+                await db.execute(
+                    update(OrmAIJob)
+                    .where(OrmAIJob.id.in_(self._running), OrmAIJob.status == AI_JOB_RUNNING)
+                    .values(status=AI_JOB_QUEUED, stage=None, progress_current=0, heartbeat_at=None)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+            self._running = set()
+
+    def _enqueue(self, job_id: str) -> None:
+        if job_id not in self._queued:
+            self._queued.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    async def _recover(self) -> None:
+        """Re-queue running jobs whose owner stopped heartbeating, then queue every queued job."""
+        async with async_session_maker() as db:
+            await db.execute(
+                update(OrmAIJob)
+                .where(
+                    OrmAIJob.status == AI_JOB_RUNNING,
+                    or_(
+                        OrmAIJob.heartbeat_at.is_(None),
+                        OrmAIJob.heartbeat_at < _utcnow() - timedelta(seconds=self.lease_seconds)
+                    )
+                )
+                .values(status=AI_JOB_QUEUED, stage=None, progress_current=0, heartbeat_at=None)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            # Other processes may queue the same ids; the claim in _run_job picks one runner
+            result = await db.execute(
+                select(OrmAIJob.id)
+                .where(OrmAIJob.status == AI_JOB_QUEUED)
+                .order_by(OrmAIJob.created_at)
+            )
+            for job_id in result.scalars().all():
+                self._enqueue(job_id)
+
+    async def _reaper(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds)
+            try:
+                await self._recover()
+            except Exception as e:
+                logger.error(f"AI job recovery failed: {e}")
+
+    async def submit(self, db: AsyncSession, user_id: int, ai_request: AIStoryRequest) -> OrmAIJob:
+        """Queue a generation job, reusing an identical unfinished job from the same user."""
+        existing_result = await db.execute(
+            select(OrmAIJob).where(
+                OrmAIJob.user_id == user_id,
+                OrmAIJob.user_prompt == ai_request.user_prompt,
+                OrmAIJob.category == ai_request.category,
+                OrmAIJob.status.in_([AI_JOB_QUEUED, AI_JOB_RUNNING])
+            )
+        )
+        existing_job = existing_result.scalars().first()
+        if existing_job:
+            return existing_job
+
+        if self._queue is None or self._queue.qsize() >= self.max_pending:
+            raise HTTPException(status_code=503, detail="AI generation queue is full, please try again later")
+
+        job = OrmAIJob(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            status=AI_JOB_QUEUED,
+            user_prompt=ai_request.user_prompt,
+            category=ai_request.category
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+
+        self._enqueue(job.id)
+        return job
+
+    async def get_job(self, db: AsyncSession, job_id: str, user_id: int) -> OrmAIJob:
+        result = await db.execute(
+            select(OrmAIJob).where(OrmAIJob.id == job_id, OrmAIJob.user_id == user_id)
+        )
+        job = result.scalar_one_or_none()
+        if not job:
+            raise HTTPException(status_code=404, detail="AI job not found")
+        return job
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        listener: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(listener)
+        return listener
+
+    def unsubscribe(self, job_id: str, listener: asyncio.Queue) -> None:
+        listeners = self._subscribers.get(job_id)
+        if listeners is not None:
+            listeners.discard(listener)
+            if not listeners:
+                del self._subscribers[job_id]
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            try:
+                await self._run_job(job_id)
+            except Exception as e:
+                logger.error(f"AI job {job_id} crashed: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _claim(self, job_id: str) -> bool:
+        """Move the job from queued to running; False if another worker or process got it first."""
+        async with async_session_maker() as db:
+            claimed = await db.execute(
+                update(OrmAIJob)
+                .where(OrmAIJob.id == job_id, OrmAIJob.status == AI_JOB_QUEUED)
+                .values(status=AI_JOB_RUNNING, heartbeat_at=_utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        return claimed.rowcount == 1
+
+    async def _heartbeat(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                async with async_session_maker() as db:
+                    await db.execute(
+                        update(OrmAIJob)
+                        .where(OrmAIJob.id == job_id, OrmAIJob.status == AI_JOB_RUNNING)
+                        .values(heartbeat_at=_utcnow())
+                        .execution_options(synchronize_session=False)
+                    )
+                    await db.commit()
+            except Exception as e:
+                logger.warning(f"AI job {job_id} heartbeat failed: {e}")
+
+    async def _run_job(self, job_id: str) -> None:
+        if not await self._claim(job_id):
+            return
+        self._running.add(job_id)
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            await self._execute(job_id)
+        except asyncio.CancelledError:
+            # Left in _running so stop() can re-queue the interrupted job
+            raise
+        except Exception:
+            self._running.discard(job_id)
+            raise
+        else:
+            self._running.discard(job_id)
+        finally:
+            heartbeat.cancel()
+
+    async def _execute(self, job_id: str) -> None:
+        async with async_session_maker() as db:
+            job = await db.get(OrmAIJob, job_id)
+            user_id, user_prompt, category = job.user_id, job.user_prompt, job.category
+            snapshot = AIJobStatus.model_validate(job)
+        self._publish(job_id, snapshot)
+
+        async def report_progress(stage: str, current: int, total: int) -> None:
+            await self._update(job_id, stage=stage, progress_current=current, progress_total=total)
+
+        trace = start_trace()
+        try:
+            with span("total"):
+                ai_generated_data = await generate_story_from_ai(
+                    user_prompt=user_prompt,
+                    category=category,
+                    progress_callback=report_progress
+                )
+                with span("db_insert"):
+                    async with async_session_maker() as db:
+                        created_story = await create_new_story(
+                            db, build_story_create(ai_generated_data, category), user_id
+                        )
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            await self._update(job_id, status=AI_JOB_FAILED, error=str(detail)[:1000], timings=json.dumps(trace))
+            return
+
+        logger.info(f"AI job {job_id} finished in {trace[-1]['seconds']}s ({len(trace)} spans)")
+        await self._update(job_id, status=AI_JOB_SUCCEEDED, story_id=created_story.id, timings=json.dumps(trace))
+
+    async def _update(self, job_id: str, **values) -> None:
+        async with async_session_maker() as db:
+            job = await db.get(OrmAIJob, job_id)
+            if job is None:
+                return
+            for field, value in values.items():
+                setattr(job, field, value)
+            await db.commit()
+            await db.refresh(job)
+            snapshot = AIJobStatus.model_validate(job)
+        self._publish(job_id, snapshot)
+
+    def _publish(self, job_id: str, snapshot: AIJobStatus) -> None:
+        for listener in self._subscribers.get(job_id, ()):
+            listener.put_nowait(snapshot)
+
+
+ai_job_manager = AIJobManager(
+    workers=Config.AI_JOB_WORKERS,
+    max_pending=Config.AI_JOB_MAX_PENDING,
+    lease_seconds=Config.AI_JOB_LEASE_SECONDS,
+)
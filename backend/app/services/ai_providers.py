@@ -0,0 +1,303 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import random
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_google_genai import ChatGoogleGenerativeAI
+from google import genai as ggenai
+from google.genai import errors as google_genai_errors
+from google.genai import types as google_genai_types
+
+from app.models.ai_story import AIStoryOutput
+from app.services.ai_upstream import ai_upstream
+from app.services.ai_tracing import span
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Raw image bytes and their MIME type, as returned by AIProvider.generate_image
+GeneratedImage = Tuple[bytes, str]
+
+
+JSON_FORMAT_INSTRUCTIONS = """
+You MUST output your response in a JSON format. All text fields (title, description, content text, tags) MUST be in TURKISH.
+The JSON object should match the following structure:
+{
+  "title": "A Catchy Title in TURKISH (2-3 words, e.g., 'Cesur Tavşan')",
+  "description": "A short lesson or moral of the story in TURKISH. (e.g., 'Başkalarına karşı her zaman nazik ol.')",
+  "age_group": "Specify an appropriate age group (e.g., '3-6', '7-10', 'all', '13+').",
+  "image_prompt": "A short, descriptive prompt in ENGLISH for a COVER IMAGE that visually represents the entire story. e.g., 'A brave rabbit looking at a castle on a hill'. This prompt will be used for cover image generation.",
+  "content": [
+    {"text": "Text for page 1 in TURKISH. Keep it VERY SHORT (1-2 sentences), simple, and engaging for children. Ensure a positive message.", "image_prompt": "A short, descriptive prompt in ENGLISH for an image that visually represents the text for this page. e.g., 'A brave rabbit standing on a hill at sunset'. This prompt will be used for image generation.", "image": null},
+    {"text": "Text for page 2 in TURKISH. Continue the story. Keep it VERY SHORT (1-2 sentences). No graphic or violent scenes.", "image_prompt": "Another short, descriptive prompt in ENGLISH for an image for this page.", "image": null},
+    // Add more pages if needed, up to 15 pages. Each page's text must be VERY SHORT.
+    // If no suitable image is relevant for a page, image_prompt can be null.
+  ],
+  "tags": ["relevant_tag1_in_turkish", "relevant_tag2_in_turkish", "story_topic_tag_in_turkish"]
+}
+The 'image' field in each content page, and the root 'image' field (for the cover) should initially be null in your JSON output; they will be populated later if image generation is successful.
+The story must be suitable for children: simple language, positive message, and no graphic or violent scenes.
+The title should be 2-3 catchy words in TURKISH.
+The description should be a short lesson or moral in TURKISH.
+Content should be a list of objects, representing multiple pages (e.g., 3 to 6 pages). Each page's text must be VERY SHORT and in TURKISH.
+Tags should match the story's topic and be in TURKISH.
+ALL Image prompts (for cover and pages) MUST be in ENGLISH.
+"""
+
+
+class AIProvider:
+    """
+    Text and image generation backend used by the story generator.
+
+    Providers are long-lived: start() builds clients once and close() releases
+    them from the application lifespan. generate_story_text returns the parsed
+    story JSON; generate_image returns raw image bytes or None when the model
+    produced no image.
+    """
+
+    name = "base"
+    text_model = ""
+    image_model = ""
+
+    @property
+    def is_configured(self) -> bool:
+        return True
+
+    def start(self) -> None:
+        pass
+
+    async def warm_up(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def generate_story_text(self, user_prompt: str, category: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def generate_image(self, prompt_text: str) -> Optional[GeneratedImage]:
+        raise NotImplementedError
+
+
+class GoogleAIProvider(AIProvider):
+    """
+    Gemini via LangChain for story text and google-genai for images.
+
+    The LangChain pieces (model, prompt template with pre-rendered format
+    instructions, JSON parser) and the google-genai client are built once, so
+    requests reuse their HTTP connection pools instead of paying client and TLS
+    setup per story. The pieces are invoked one by one so each is timed.
+    """
+
+    name = "google"
+    text_model = "gemini-1.5-pro-latest"
+    image_model = 'gemini-2.0-flash-exp-image-generation' # Using the Gemini 2.0 Flash model for images
+
+    def __init__(self, api_key: Optional[str], base_url: Optional[str] = None):
+        self.api_key = api_key
+        # Endpoint override for an API gateway or a local stand-in; None is Google's
+        self.base_url = base_url
+        self._story_chain = None
+        self._image_client = None
+
+    @property
+    def is_configured(self) -> bool:
+        return bool(self.api_key)
+
+    def start(self) -> None:
+        if not self.api_key:
+            logger.warning("GOOGLE_API_KEY not configured; AI clients not initialized.")
+            return
+        if self._story_chain is None:
+            self._story_chain = self._build_story_chain()
+        if self._image_client is None:
+            http_options = google_genai_types.HttpOptions(base_url=self.base_url) if self.base_url else None
+            self._image_client = ggenai.Client(api_key=self.api_key, http_options=http_options)
+
+    async def warm_up(self) -> None:
+        """
+        Open the connection pools the requests use ahead of the first story
+        with model metadata lookups, which are not billed: the sync image
+        client on the upstream pool, and the async client the LLM calls with.
+        """
+        if self._image_client is not None:
+            try:
+                await ai_upstream.run_blocking(self._image_client.models.get, model=self.image_model)
+            except Exception as e:
+                logger.warning(f"Image client warm-up failed: {e}")
+        if self._story_chain is not None:
+            _, llm, _ = self._story_chain
+            # The google-genai async client ainvoke() sends its requests through
+            llm_client = getattr(llm, "async_client", None) or getattr(getattr(llm, "client", None), "aio", None)
+            if llm_client is None:
+                return
+            try:
+                await llm_client.models.get(model=self.text_model)
+            except Exception as e:
+                logger.warning(f"LLM client warm-up failed: {e}")
+
+    async def close(self) -> None:
+        if self._image_client is not None:
+            close = getattr(self._image_client, "close", None)
+            if close is not None:
+                close()
+        self._story_chain = None
+        self._image_client = None
+
+    async def generate_story_text(self, user_prompt: str, category: str) -> Dict[str, Any]:
+        if self._story_chain is None:
+            self.start()
+        prompt_template, llm, parser = self._story_chain
+
+        with span("prompt_render"):
+            prompt_value = prompt_template.format_prompt(user_prompt=user_prompt, category=category)
+
+        with span("llm_call", model=self.text_model) as record:
+            message = await llm.ainvoke(prompt_value)
+            usage = getattr(message, "usage_metadata", None) or {}
+            record["input_tokens"] = usage.get("input_tokens")
+            record["output_tokens"] = usage.get("output_tokens")
+            record["bytes"] = len(str(message.content).encode("utf-8"))
+
+        with span("json_parse"):
+            return parser.invoke(message)
+
+    async def generate_image(self, prompt_text: str) -> Optional[GeneratedImage]:
+        if self._image_client is None:
+            self.start()
+        img_gen_config = google_genai_types.GenerateContentConfig(
+            response_modalities=['TEXT', 'IMAGE']
+        )
+        response = await ai_upstream.run_blocking(
+            self._image_client.models.generate_content,
+            model=self.image_model,
+            contents=prompt_text,
+            config=img_gen_config
+        )
+
+        if not (response and hasattr(response, 'candidates') and len(response.candidates) > 0):
+            logger.warning(f"No valid candidates in API response for prompt: {prompt_text}")
+            if response and hasattr(response, 'prompt_feedback'):
+                logger.warning(f"Prompt feedback for prompt '{prompt_text}': {response.prompt_feedback}")
+            return None
+
+        candidate = response.candidates[0]
+        if not (hasattr(candidate, 'content') and hasattr(candidate.content, 'parts')):
+            logger.warning(f"Response candidate for prompt '{prompt_text}' has no 'content' or no 'parts'.")
+            return None
+
+        for part in candidate.content.parts:
+            if hasattr(part, 'inline_data') and part.inline_data is not None and part.inline_data.mime_type.startswith('image/'):
+                return part.inline_data.data, part.inline_data.mime_type # Raw bytes
+
+        logger.warning(f"No image data found in any part for prompt: {prompt_text}. Finish reason: {getattr(candidate, 'finish_reason', 'N/A')}")
+        return None
+
+    def _build_story_chain(self):
+        # Initialize the Gemini model for text generation (LangChain)
+        client_options = {"api_endpoint": self.base_url} if self.base_url else None
+        llm = ChatGoogleGenerativeAI(model=self.text_model, google_api_key=self.api_key, client_options=client_options)
+
+        parser = JsonOutputParser(pydantic_object=AIStoryOutput)
+
+        prompt_template = PromptTemplate(
+            template="Generate a child-friendly story in TURKISH based on the following details.\n"
+                     "User Prompt: {user_prompt}\n"
+                     "Category: {category}\n"
+                     "ALL textual output (title, description, content text, tags) MUST be in TURKISH.\n"
+                     "Image prompts (image_prompt) MUST be in ENGLISH.\n"
+                     "{format_instructions}\n",
+            input_variables=["user_prompt", "category"],
+            partial_variables={"format_instructions": parser.get_format_instructions() + "\n" + JSON_FORMAT_INSTRUCTIONS}
+        )
+
+        return prompt_template, llm, parser
+
+
+# 1x1 transparent PNG returned for every stub image
+_STUB_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+
+class StubAIProvider(AIProvider):
+    """
+    Offline provider for local development and load testing.
+
+    Output is derived from a hash of the prompt, so the same request always
+    produces the same story. Latency and failure rate come from Config; failures
+    are drawn from a seeded generator so a benchmark run is reproducible.
+    """
+
+    name = "stub"
+    text_model = "stub-text"
+    image_model = "stub-image"
+
+    def __init__(
+        self,
+        text_latency_seconds: float,
+        image_latency_seconds: float,
+        failure_rate: float,
+        page_count: int,
+        seed: int
+    ):
+        self.text_latency_seconds = text_latency_seconds
+        self.image_latency_seconds = image_latency_seconds
+        self.failure_rate = failure_rate
+        self.page_count = page_count
+        self._failures = random.Random(seed)
+
+    @staticmethod
+    def _digest(*parts: str) -> str:
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:8]
+
+    def _maybe_fail(self, what: str) -> None:
+        if self.failure_rate and self._failures.random() < self.failure_rate:
+            # Same error type and status the real SDK raises for an exhausted quota
+            raise google_genai_errors.ClientError(429, {"error": {
+                "code": 429, "status": "RESOURCE_EXHAUSTED", "message": f"Stub provider simulated {what} failure"
+            }})
+
+    async def generate_story_text(self, user_prompt: str, category: str) -> Dict[str, Any]:
+        with span("llm_call", model=self.text_model):
+            await asyncio.sleep(self.text_latency_seconds)
+            self._maybe_fail("text")
+        digest = self._digest(user_prompt, category)
+        return {
+            "title": f"Hikaye {digest}",
+            "description": f"{category} hakkında bir hikaye.",
+            "age_group": "3-6",
+            "image_prompt": f"stub cover {digest}",
+            "content": [
+                {"text": f"Sayfa {page}: {user_prompt}", "image_prompt": f"stub page {digest} {page}", "image": None}
+                for page in range(1, self.page_count + 1)
+            ],
+            "tags": [category, "stub"]
+        }
+
+    async def generate_image(self, prompt_text: str) -> Optional[GeneratedImage]:
+        await asyncio.sleep(self.image_latency_seconds)
+        self._maybe_fail("image")
+        return _STUB_PNG, "image/png"
+
+
+def create_ai_provider(name: str) -> AIProvider:
+    """Build the provider selected by AI_PROVIDER."""
+    if name == GoogleAIProvider.name:
+        return GoogleAIProvider(Config.GOOGLE_API_KEY)
+    if name == StubAIProvider.name:
+        return StubAIProvider(
+            text_latency_seconds=Config.AI_STUB_TEXT_LATENCY_SECONDS,
+            image_latency_seconds=Config.AI_STUB_IMAGE_LATENCY_SECONDS,
+            failure_rate=Config.AI_STUB_FAILURE_RATE,
+            page_count=Config.AI_STUB_PAGE_COUNT,
+            seed=Config.AI_STUB_SEED
+        )
+    raise ValueError(f"Unknown AI_PROVIDER: {name}")
+
+
+ai_provider = create_ai_provider(Config.AI_PROVIDER)
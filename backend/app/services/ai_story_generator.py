@@ -1,129 +1,150 @@
 import json
 import logging
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage
 from pydantic import ValidationError
-import base64
-import io
-from io import BytesIO
-import uuid
-import aiofiles
-from pathlib import Path
-from typing import Optional
-from google import genai as ggenai
-from google.genai import types as google_genai_types # Added import for GenerateContentConfig
+from typing import Optional, Callable, Awaitable
 import asyncio
-from functools import partial
 
-from app.models.ai_story import AIStoryOutput, AIPageContent
+from app.models.ai_story import AIStoryOutput
 from config import Config
-from app.utils.file_utils import UPLOADS_DIR
+from app.utils.file_utils import store_image
+from app.utils.storage import storage, key_for_path
+from app.services.ai_cache import ai_cache, TEXT_NAMESPACE, IMAGE_NAMESPACE
+from app.services.ai_providers import ai_provider
+from app.services.ai_upstream import ai_upstream
+from app.services.ai_tracing import span
 
 logger = logging.getLogger(__name__)
 
 
-GOOGLE_API_KEY = Config.GOOGLE_API_KEY
+# Progress stages reported through generate_story_from_ai's progress_callback
+STAGE_TEXT_DONE = "text_done"
+STAGE_COVER_DONE = "cover_done"
+STAGE_PAGE_DONE = "page_done"
+ProgressCallback = Callable[[str, int, int], Awaitable[None]]
 
+# Created in start_image_slots() so the semaphore belongs to the loop the app runs on
+_global_image_slots: Optional[asyncio.Semaphore] = None
 
-JSON_FORMAT_INSTRUCTIONS = """
-You MUST output your response in a JSON format. All text fields (title, description, content text, tags) MUST be in TURKISH.
-The JSON object should match the following structure:
-{
-  "title": "A Catchy Title in TURKISH (2-3 words, e.g., 'Cesur Tavşan')",
-  "description": "A short lesson or moral of the story in TURKISH. (e.g., 'Başkalarına karşı her zaman nazik ol.')",
-  "age_group": "Specify an appropriate age group (e.g., '3-6', '7-10', 'all', '13+').",
-  "image_prompt": "A short, descriptive prompt in ENGLISH for a COVER IMAGE that visually represents the entire story. e.g., 'A brave rabbit looking at a castle on a hill'. This prompt will be used for cover image generation.",
-  "content": [
-    {"text": "Text for page 1 in TURKISH. Keep it VERY SHORT (1-2 sentences), simple, and engaging for children. Ensure a positive message.", "image_prompt": "A short, descriptive prompt in ENGLISH for an image that visually represents the text for this page. e.g., 'A brave rabbit standing on a hill at sunset'. This prompt will be used for image generation.", "image": null},
-    {"text": "Text for page 2 in TURKISH. Continue the story. Keep it VERY SHORT (1-2 sentences). No graphic or violent scenes.", "image_prompt": "Another short, descriptive prompt in ENGLISH for an image for this page.", "image": null},
-    // Add more pages if needed, up to 15 pages. Each page's text must be VERY SHORT.
-    // If no suitable image is relevant for a page, image_prompt can be null.
-  ],
-  "tags": ["relevant_tag1_in_turkish", "relevant_tag2_in_turkish", "story_topic_tag_in_turkish"]
-}
-The 'image' field in each content page, and the root 'image' field (for the cover) should initially be null in your JSON output; they will be populated later if image generation is successful.
-The story must be suitable for children: simple language, positive message, and no graphic or violent scenes.
-The title should be 2-3 catchy words in TURKISH.
-The description should be a short lesson or moral in TURKISH.
-Content should be a list of objects, representing multiple pages (e.g., 3 to 6 pages). Each page's text must be VERY SHORT and in TURKISH.
-Tags should match the story's topic and be in TURKISH.
-ALL Image prompts (for cover and pages) MUST be in ENGLISH.
-"""
 
-async def save_base64_image_async(base64_data_string: str, file_extension: str, filename_prefix: str = "story_page") -> Optional[str]:
+def _get_global_image_slots() -> asyncio.Semaphore:
+    global _global_image_slots
+    if _global_image_slots is None:
+        _global_image_slots = asyncio.Semaphore(Config.AI_IMAGE_CONCURRENCY_GLOBAL)
+    return _global_image_slots
+
+
+def start_image_slots() -> None:
+    """Create a fresh process-wide image slot semaphore for this app's event loop."""
+    global _global_image_slots
+    _global_image_slots = asyncio.Semaphore(Config.AI_IMAGE_CONCURRENCY_GLOBAL)
+
+async def _cached_image_exists(entry: dict) -> bool:
+    # The image may have been removed from storage since the entry was written
+    key = key_for_path(entry.get("path", ""))
+    return key is not None and await storage.size(key) is not None
+
+async def _generate_image(
+    image_prompt: str,
+    image_generation_prompt_text: str,
+    filename_prefix: str,
+    story_image_slots: asyncio.Semaphore
+) -> Optional[str]:
     """
-    Decodes a base64 string (without data URI header), saves it as an image file asynchronously, 
-    and returns its relative path.
+    Returns the path of an image for the prompt, reusing a previously generated
+    one when the same normalized prompt was already rendered.
     """
-    if not base64_data_string:
-        return None
-    try:
-        img_data = base64.b64decode(base64_data_string)
-
-        # Ensure UPLOADS_DIR exists
-        UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+    async def produce() -> Optional[dict]:
+        saved_image_path = await _generate_image_uncached(
+            image_prompt, image_generation_prompt_text, filename_prefix, story_image_slots
+        )
+        return {"path": saved_image_path} if saved_image_path else None
+
+    entry = await ai_cache.get_or_create(
+        IMAGE_NAMESPACE,
+        ai_cache.make_key(ai_provider.image_model, filename_prefix, image_prompt),
+        produce,
+        is_valid=_cached_image_exists
+    )
+    return entry["path"] if entry else None
+
+async def _generate_image_uncached(
+    image_prompt: str,
+    image_generation_prompt_text: str,
+    filename_prefix: str,
+    story_image_slots: asyncio.Semaphore
+) -> Optional[str]:
+    """
+    Generates a single image and saves it, returning its relative path.
+    Never raises: failures and timeouts are logged and return None so the story
+    can still be created without that image.
+    """
+    async with story_image_slots, _get_global_image_slots():
+        with span("image_call", model=ai_provider.image_model, kind=filename_prefix) as record:
+            try:
+                logger.debug(f"Generating image ({filename_prefix}) for prompt: '{image_prompt}' using model {ai_provider.image_model}")
+                # Quota limiting and retries happen inside the timeout
+                generated = await asyncio.wait_for(
+                    ai_upstream.submit(lambda: ai_provider.generate_image(image_generation_prompt_text)),
+                    timeout=Config.AI_IMAGE_TIMEOUT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                record["error"] = "timeout"
+                logger.warning(f"Image generation ({filename_prefix}) timed out after {Config.AI_IMAGE_TIMEOUT_SECONDS}s for prompt: '{image_prompt}'")
+                return None
+            except Exception as img_exc:
+                record["error"] = type(img_exc).__name__
+                logger.error(f"Error generating image ({filename_prefix}) for prompt '{image_prompt}': {str(img_exc)}")
+                return None
+            if generated is not None:
+                record["bytes"] = len(generated[0])
 
-        # Ensure file_extension starts with a dot
-        if not file_extension.startswith('.'):
-            file_extension = '.' + file_extension
+    if generated is None:
+        return None
 
-        unique_filename = f"{filename_prefix}_{uuid.uuid4()}{file_extension}"
-        file_path = UPLOADS_DIR / unique_filename
-        
-        async with aiofiles.open(file_path, 'wb') as out_file:
-            await out_file.write(img_data)
-            
-        return f"/uploads/images/{unique_filename}"  # Relative path for DB
+    image_bytes, mime_type = generated
+    # The provider's bytes go straight to the image pipeline, without a base64 round trip
+    try:
+        with span("image_write", bytes=len(image_bytes)):
+            stored_file = await store_image(image_bytes)
     except Exception as e:
-        logger.error(f"Failed to save base64 image ({filename_prefix}): {e}")
+        logger.warning(f"Failed to save image for prompt: {image_prompt} after getting inline_data: {e}")
         return None
-
-async def generate_story_from_ai(user_prompt: str, category: str) -> AIStoryOutput:
+    logger.debug(f"Successfully generated and saved image ({filename_prefix}) for prompt: {image_prompt} ({stored_file.size} bytes, sha256 {stored_file.sha256})")
+    return stored_file.path
+
+async def generate_story_from_ai(
+    user_prompt: str,
+    category: str,
+    progress_callback: Optional[ProgressCallback] = None
+) -> AIStoryOutput:
     """
-    Generates a story using Google Gemini model via LangChain for both text and the google-genai client for image generation.
+    Generates a story text and its cover and page images with the configured AI provider.
+    progress_callback, if given, is awaited with (stage, current, total) as stages finish.
     """
-    if not GOOGLE_API_KEY:
+    if not ai_provider.is_configured:
         logger.error("GOOGLE_API_KEY not configured for AI generation.")
         raise ValueError("AI service is not configured. Missing GOOGLE_API_KEY.")
 
-    # Initialize the Gemini model for text generation (LangChain)
-    llm = ChatGoogleGenerativeAI(model="gemini-1.5-pro-latest", google_api_key=GOOGLE_API_KEY)
-
-    parser = JsonOutputParser(pydantic_object=AIStoryOutput)
-
-    prompt_template = PromptTemplate(
-        template="Generate a child-friendly story in TURKISH based on the following details.\n"
-                 "User Prompt: {user_prompt}\n"
-                 "Category: {category}\n"
-                 "ALL textual output (title, description, content text, tags) MUST be in TURKISH.\n"
-                 "Image prompts (image_prompt) MUST be in ENGLISH.\n"
-                 "{format_instructions}\n",
-        input_variables=["user_prompt", "category"],
-        partial_variables={"format_instructions": parser.get_format_instructions() + "\n" + JSON_FORMAT_INSTRUCTIONS}
-    )
-
-    chain = prompt_template | llm | parser
-
     try:
-        logger.info(f"Generating AI story text for prompt: '{user_prompt}', category: '{category}'")
-        ai_response_data = await chain.ainvoke({
-            "user_prompt": user_prompt,
-            "category": category
-        })
+        logger.debug(f"Generating AI story text for prompt: '{user_prompt}', category: '{category}'")
+        ai_response_data = await ai_cache.get_or_create(
+            TEXT_NAMESPACE,
+            ai_cache.make_key(ai_provider.text_model, category, user_prompt),
+            lambda: ai_provider.generate_story_text(user_prompt, category)
+        )
         
-        if isinstance(ai_response_data, dict):
-             validated_response = AIStoryOutput(**ai_response_data)
-        elif isinstance(ai_response_data, AIStoryOutput):
-             validated_response = ai_response_data
-        else:
-            logger.error(f"Unexpected AI text response type: {type(ai_response_data)}")
-            raise ValueError("AI generated an unexpected text response format.")
-
-        # Initialize google-genai client for image generation
-        image_gen_client = ggenai.Client(api_key=GOOGLE_API_KEY)
-        image_model_name = 'gemini-2.0-flash-exp-image-generation' # Using the Gemini 2.0 Flash model for images
+        with span("validate"):
+            if isinstance(ai_response_data, dict):
+                 validated_response = AIStoryOutput(**ai_response_data)
+            elif isinstance(ai_response_data, AIStoryOutput):
+                 validated_response = ai_response_data
+            else:
+                logger.error(f"Unexpected AI text response type: {type(ai_response_data)}")
+                raise ValueError("AI generated an unexpected text response format.")
+
+        page_count = len(validated_response.content)
+        if progress_callback:
+            await progress_callback(STAGE_TEXT_DONE, 0, page_count)
 
         # Generate cover image if prompt is available
         cover_image_prompt = None
@@ -133,154 +154,53 @@ async def generate_story_from_ai(user_prompt: str, category: str) -> AIStoryOutp
         elif isinstance(ai_response_data, dict) and ai_response_data.get('image_prompt'):
             cover_image_prompt = ai_response_data['image_prompt']
 
+        # Cover and page images are requested concurrently; a failed or timed-out
+        # image only leaves that slot empty
+        story_image_slots = asyncio.Semaphore(Config.AI_IMAGE_CONCURRENCY_PER_STORY)
+        image_jobs = []
         if cover_image_prompt:
-            try:
-                logger.info(f"Generating COVER image for prompt: '{cover_image_prompt}' using model {image_model_name}")
-                image_generation_prompt_text = f"Create a child-friendly illustration for a story cover: {cover_image_prompt}. Make it colorful, detailed, and captivating."
-                loop = asyncio.get_event_loop()
-                img_gen_config = google_genai_types.GenerateContentConfig(
-                    response_modalities=['TEXT', 'IMAGE']
-                )
-                response = await loop.run_in_executor(
-                    None,
-                    partial(
-                        image_gen_client.models.generate_content,
-                        model=image_model_name,
-                        contents=image_generation_prompt_text,
-                        config=img_gen_config
-                    )
-                )
-
-                if response and hasattr(response, 'candidates') and len(response.candidates) > 0:
-                    candidate = response.candidates[0]
-                    if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts'):
-                        for i, part in enumerate(candidate.content.parts):
-                            if hasattr(part, 'inline_data') and part.inline_data is not None and part.inline_data.mime_type.startswith('image/'):
-                                image_bytes = part.inline_data.data
-                                mime_type = part.inline_data.mime_type
-                                file_ext = ".png"  # Default
-                                if mime_type == "image/jpeg":
-                                    file_ext = ".jpg"
-                                elif mime_type == "image/png":
-                                    file_ext = ".png"
-                                elif mime_type == "image/webp":
-                                    file_ext = ".webp"
-                                
-                                base64_image_data_string = base64.b64encode(image_bytes).decode('utf-8')
-                                saved_image_path = await save_base64_image_async(
-                                    base64_data_string=base64_image_data_string, 
-                                    file_extension=file_ext,
-                                    filename_prefix="story_cover" # Different prefix for cover
-                                )
-                                if saved_image_path:
-                                    validated_response.image = saved_image_path
-                                    logger.info(f"Successfully generated and saved COVER image for prompt: {cover_image_prompt}")
-                                else:
-                                    logger.warning(f"Failed to save COVER image for prompt: {cover_image_prompt} after getting inline_data.")
-                                break # Found image part
-                    else:
-                        logger.warning("No image part found in cover image candidate.")
-                else:
-                    logger.warning("No candidates returned for cover image generation.")
-            except Exception as img_exc:
-                logger.error(f"Error generating COVER image for prompt '{cover_image_prompt}': {str(img_exc)}", exc_info=True)
-            # Only remove image_prompt after generation attempt
-            if hasattr(validated_response, 'image_prompt'):
-                try:
-                    delattr(validated_response, 'image_prompt')
-                except Exception:
-                    pass
+            image_jobs.append((validated_response, _generate_image(
+                image_prompt=cover_image_prompt,
+                image_generation_prompt_text=f"Create a child-friendly illustration for a story cover: {cover_image_prompt}. Make it colorful, detailed, and captivating.",
+                filename_prefix="story_cover", # Different prefix for cover
+                story_image_slots=story_image_slots
+            )))
         else:
             logger.warning("No image_prompt found for cover image generation in AI response.")
 
         for page_content in validated_response.content:
             if page_content.image_prompt:
-                try:
-                    logger.info(f"Generating image for prompt: '{page_content.image_prompt}' using model {image_model_name}")
-
-                    image_generation_prompt_text = f"Create a child-friendly illustration of: {page_content.image_prompt}. Make it colorful and detailed."
-
-                    loop = asyncio.get_event_loop()
-                    
-                    # Configuration for image generation as per user's example
-                    img_gen_config = google_genai_types.GenerateContentConfig(
-                        response_modalities=['TEXT', 'IMAGE']
-                    )
+                image_jobs.append((page_content, _generate_image(
+                    image_prompt=page_content.image_prompt,
+                    image_generation_prompt_text=f"Create a child-friendly illustration of: {page_content.image_prompt}. Make it colorful and detailed.",
+                    filename_prefix="story_page",
+                    story_image_slots=story_image_slots
+                )))
+
+        pages_done = 0
+        page_image_total = sum(1 for target, _ in image_jobs if target is not validated_response)
+
+        async def _run_image_job(target, job):
+            nonlocal pages_done
+            saved_image_path = await job
+            if saved_image_path:
+                target.image = saved_image_path
+            if progress_callback:
+                if target is validated_response:
+                    await progress_callback(STAGE_COVER_DONE, 0, page_count)
+                else:
+                    pages_done += 1
+                    await progress_callback(STAGE_PAGE_DONE, pages_done, page_image_total)
 
-                    response = await loop.run_in_executor(
-                        None,
-                        partial(
-                            image_gen_client.models.generate_content,
-                            model=image_model_name,
-                            contents=image_generation_prompt_text,
-                            config=img_gen_config # Using config as per user's example
-                        )
-                    )
+        await asyncio.gather(*(_run_image_job(target, job) for target, job in image_jobs))
 
-                    if response and hasattr(response, 'candidates') and len(response.candidates) > 0:
-                        candidate = response.candidates[0]
-                        logger.info(f"Image generation candidate for prompt '{page_content.image_prompt}': Finish reason: {candidate.finish_reason if hasattr(candidate, 'finish_reason') else 'N/A'}, Safety ratings: {candidate.safety_ratings if hasattr(candidate, 'safety_ratings') else 'N/A'}")
-                        
-                        image_found_in_parts = False
-                        if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts'):
-                            logger.info(f"Number of parts in candidate content for prompt '{page_content.image_prompt}': {len(candidate.content.parts)}")
-                            for i, part in enumerate(candidate.content.parts):
-                                logger.info(f"Processing part {i} for prompt '{page_content.image_prompt}': Type: {type(part)}")
-                                if hasattr(part, 'text') and part.text: # Log any text part
-                                    logger.info(f"Part {i} for prompt '{page_content.image_prompt}' has text: {part.text[:200]}")
-                                
-                                if hasattr(part, 'inline_data') and part.inline_data is not None and part.inline_data.mime_type.startswith('image/'):
-                                    logger.info(f"Part {i} for prompt '{page_content.image_prompt}' has inline_data with mime_type: {part.inline_data.mime_type}")
-                                    image_bytes = part.inline_data.data # These are raw bytes
-                                    mime_type = part.inline_data.mime_type
-                                    
-                                    file_ext = ".png"  # Default
-                                    if mime_type == "image/jpeg":
-                                        file_ext = ".jpg"
-                                    elif mime_type == "image/png":
-                                        file_ext = ".png"
-                                    elif mime_type == "image/webp":
-                                        file_ext = ".webp"
-                                    # Add other image types if needed
-                                    
-                                    # Convert raw bytes to base64 encoded string for save_base64_image_async
-                                    base64_image_data_string = base64.b64encode(image_bytes).decode('utf-8')
-                                    
-                                    saved_image_path = await save_base64_image_async(
-                                        base64_data_string=base64_image_data_string, 
-                                        file_extension=file_ext
-                                        # filename_prefix will use default "story_page" from function definition
-                                    )
-                                    
-                                    if saved_image_path:
-                                        page_content.image = saved_image_path
-                                        logger.info(f"Successfully generated and saved image for prompt: {page_content.image_prompt}")
-                                        image_found_in_parts = True
-                                        break # Image found and saved, exit parts loop
-                                    else:
-                                        logger.warning(f"Failed to save image for prompt: {page_content.image_prompt} after getting inline_data.")
-                                else:
-                                    # Log if part.inline_data is None or not an image
-                                    inline_data_info = 'N/A'
-                                    if hasattr(part, 'inline_data'):
-                                        if part.inline_data is None:
-                                            inline_data_info = 'is None'
-                                        else:
-                                            inline_data_info = f"mime_type: {part.inline_data.mime_type}"
-                                    logger.info(f"Part {i} for prompt '{page_content.image_prompt}' does not have usable image inline_data. Inline_data info: {inline_data_info}")
-                            
-                            if not image_found_in_parts:
-                                logger.warning(f"No image data found and saved from any part for prompt: {page_content.image_prompt}. All parts inspected.")
-                        else:
-                            logger.warning(f"Response candidate for prompt '{page_content.image_prompt}' has no 'content' or no 'parts'. Candidate content: {candidate.content if hasattr(candidate, 'content') else 'N/A'}")
-                    else:
-                        logger.warning(f"No valid candidates in API response for prompt: {page_content.image_prompt}. Full response object: {response}")
-                        if response and hasattr(response, 'prompt_feedback'):
-                             logger.warning(f"Prompt feedback for prompt '{page_content.image_prompt}': {response.prompt_feedback}")
-                
-                except Exception as img_exc:
-                    logger.error(f"Error generating image for prompt '{page_content.image_prompt}': {str(img_exc)}", exc_info=True)
-                
+        # Only remove image prompts after generation attempts
+        if hasattr(validated_response, 'image_prompt'):
+            try:
+                delattr(validated_response, 'image_prompt')
+            except Exception:
+                pass
+        for page_content in validated_response.content:
             page_content.image_prompt = None # Clear prompt regardless of success/failure
         
         return validated_response
@@ -0,0 +1,116 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence
+
+# Upper bounds (seconds) of the duration histogram buckets
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_current_trace: ContextVar[Optional[List[dict]]] = ContextVar("ai_trace", default=None)
+_current_span: ContextVar[Optional[dict]] = ContextVar("ai_span", default=None)
+
+
+class StageHistogram:
+    """Cumulative duration histogram plus byte, retry and token totals for one stage."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum_seconds = 0.0
+        self.errors = 0
+        self.bytes_total = 0
+        self.retries_total = 0
+        self.wait_seconds_total = 0.0
+        self.input_tokens_total = 0
+        self.output_tokens_total = 0
+
+    def observe(self, record: dict) -> None:
+        seconds = record["seconds"]
+        self.count += 1
+        self.sum_seconds += seconds
+        for index, upper_bound in enumerate(self.buckets):
+            if seconds <= upper_bound:
+                self.bucket_counts[index] += 1
+        if record.get("error"):
+            self.errors += 1
+        self.bytes_total += record.get("bytes") or 0
+        self.retries_total += record.get("retries") or 0
+        self.wait_seconds_total += record.get("wait_seconds") or 0
+        self.input_tokens_total += record.get("input_tokens") or 0
+        self.output_tokens_total += record.get("output_tokens") or 0
+
+    def stats(self) -> dict:
+        return {
+            "count": self.count,
+            "sum_seconds": round(self.sum_seconds, 4),
+            "buckets": {
+                str(upper_bound): count
+                for upper_bound, count in zip(self.buckets, self.bucket_counts)
+            },
+            "errors": self.errors,
+            "bytes_total": self.bytes_total,
+            "retries_total": self.retries_total,
+            "wait_seconds_total": round(self.wait_seconds_total, 4),
+            "input_tokens_total": self.input_tokens_total,
+            "output_tokens_total": self.output_tokens_total,
+        }
+
+
+class StageMetrics:
+    """Process-wide histograms of AI pipeline spans, keyed by stage name."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._stages: Dict[str, StageHistogram] = {}
+
+    def observe(self, record: dict) -> None:
+        histogram = self._stages.get(record["stage"])
+        if histogram is None:
+            histogram = self._stages[record["stage"]] = StageHistogram(self.buckets)
+        histogram.observe(record)
+
+    def stats(self) -> dict:
+        return {stage: histogram.stats() for stage, histogram in self._stages.items()}
+
+
+ai_stage_metrics = StageMetrics()
+
+
+def start_trace() -> List[dict]:
+    """Collect spans finished in the current task (and tasks it spawns) into a new list."""
+    trace: List[dict] = []
+    _current_trace.set(trace)
+    return trace
+
+
+@contextmanager
+def span(stage: str, **attributes) -> Iterator[dict]:
+    """
+    Time a pipeline stage. The yielded dict can be given extra attributes
+    (bytes, input_tokens, output_tokens, error); retries and queue wait are
+    accumulated through add_to_span(). The finished span is added to the
+    histograms and to the current trace.
+    """
+    record = {"stage": stage, **attributes}
+    token = _current_span.set(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException as exc:
+        record.setdefault("error", type(exc).__name__)
+        raise
+    finally:
+        record["seconds"] = round(time.perf_counter() - started, 4)
+        _current_span.reset(token)
+        ai_stage_metrics.observe(record)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.append(record)
+
+
+def add_to_span(field: str, amount: float) -> None:
+    """Add to a numeric attribute (retries, wait_seconds) of the innermost open span, if any."""
+    record = _current_span.get()
+    if record is not None:
+        record[field] = record.get(field, 0) + amount
@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import CancelledError as FutureCancelledError, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from google.genai import errors as google_genai_errors
+
+from app.services.ai_tracing import add_to_span
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP status codes worth retrying: quota exhaustion and transient server errors
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """Quota and transient upstream failures; anything else fails immediately."""
+    if isinstance(exc, google_genai_errors.APIError):
+        return exc.code in RETRYABLE_STATUS_CODES
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    # Other SDK and HTTP client errors carry the status on the exception or its response
+    for status_code in (
+        getattr(exc, "status_code", None),
+        getattr(exc, "code", None),
+        getattr(getattr(exc, "response", None), "status_code", None),
+    ):
+        if isinstance(status_code, int):
+            return status_code in RETRYABLE_STATUS_CODES
+    # Wrappers such as langchain's re-raise the SDK error as their cause
+    if exc.__cause__ is not None and exc.__cause__ is not exc:
+        return is_retryable_error(exc.__cause__)
+    return False
+
+
+class TokenBucket:
+    """
+    Async token bucket; a rate of 0 or less disables limiting.
+
+    A waiter reserves its token up front (the balance may go negative) and
+    then sleeps until the token is due. Reservations are made in call
+    order, and no lock is held while sleeping, so waiters don't queue
+    behind each other. Reserving runs without an await, so it needs no
+    asyncio lock that would bind the module singleton to one event loop.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    def _reserve(self) -> float:
+        """Take one token; returns how long to wait before it is due."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        return max(0.0, -self._tokens / self.rate)
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        wait_seconds = self._reserve()
+        if wait_seconds <= 0:
+            return
+        try:
+            await asyncio.sleep(wait_seconds)
+        except asyncio.CancelledError:
+            # Hand the unused reservation back to later waiters
+            self._tokens += 1
+            raise
+
+
+class UpstreamAIExecutor:
+    """
+    Admission control for calls to the AI provider.
+
+    submit() waits for a token from the quota bucket, runs the call and retries
+    quota/transient errors with jittered exponential backoff. Blocking SDK calls
+    go through run_blocking(), which uses a dedicated thread pool instead of the
+    loop's default executor shared with aiofiles.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        rate_per_minute: float,
+        burst: int,
+        max_retries: int,
+        retry_base_seconds: float,
+        retry_max_seconds: float
+    ):
+        self.workers = workers
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Guards counters that pool threads update
+        self._counter_lock = threading.Lock()
+        self.waiting_for_token = 0
+        self.waiting_for_thread = 0
+        self.active = 0
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ai-upstream")
+        return self._executor
+
+    def _record_wait(self, seconds: float) -> None:
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    async def run_blocking(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking upstream call on the dedicated pool."""
+        queued_at = time.monotonic()
+        # Whichever side gets here first leaves the thread queue: the pool thread
+        # starting the call, or the awaiting coroutine being cancelled before that
+        state = {"dequeued": False, "cancelled": False}
+        with self._counter_lock:
+            self.waiting_for_thread += 1
+
+        def run() -> T:
+            with self._counter_lock:
+                if state["cancelled"]:
+                    raise FutureCancelledError()  # nobody awaits the result any more
+                state["dequeued"] = True
+                self.waiting_for_thread -= 1
+                self.active += 1
+                self._record_wait(time.monotonic() - queued_at)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._counter_lock:
+                    self.active -= 1
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), run)
+        finally:
+            with self._counter_lock:
+                if not state["dequeued"]:
+                    state["cancelled"] = True
+                    self.waiting_for_thread -= 1
+
+    async def submit(self, call: Callable[[], Awaitable[T]]) -> T:
+        """Rate-limit and retry an upstream call; call is re-invoked on each attempt."""
+        attempt = 0
+        while True:
+            queued_at = time.monotonic()
+            self.waiting_for_token += 1
+            try:
+                await self.bucket.acquire()
+            finally:
+                self.waiting_for_token -= 1
+            waited = time.monotonic() - queued_at
+            with self._counter_lock:
+                self._record_wait(waited)
+            add_to_span("wait_seconds", round(waited, 4))
+            self.calls += 1
+            try:
+                return await call()
+            except Exception as exc:
+                if attempt >= self.max_retries or not is_retryable_error(exc):
+                    self.failures += 1
+                    raise
+                delay = random.uniform(0, min(self.retry_max_seconds, self.retry_base_seconds * 2 ** attempt))
+                attempt += 1
+                self.retries += 1
+                add_to_span("retries", 1)
+                logger.warning(f"Upstream AI call failed ({exc}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_depth": self.waiting_for_token + self.waiting_for_thread,
+            "waiting_for_token": self.waiting_for_token,
+            "waiting_for_thread": self.waiting_for_thread,
+            "active": self.active,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "wait_seconds_total": round(self.wait_seconds_total, 3),
+            "wait_seconds_max": round(self.wait_seconds_max, 3),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+ai_upstream = UpstreamAIExecutor(
+    workers=Config.AI_UPSTREAM_WORKERS,
+    rate_per_minute=Config.AI_IMAGE_RATE_PER_MINUTE,
+    burst=Config.AI_IMAGE_RATE_BURST,
+    max_retries=Config.AI_UPSTREAM_MAX_RETRIES,
+    retry_base_seconds=Config.AI_UPSTREAM_RETRY_BASE_SECONDS,
+    retry_max_seconds=Config.AI_UPSTREAM_RETRY_MAX_SECONDS
+)
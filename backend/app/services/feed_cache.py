@@ -0,0 +1,202 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Set, Tuple
+
+from config import Config
+
+FEATURED_FEED = "featured"
+NEW_FEED = "new"
+POPULAR_FEED = "popular"
+
+# Invalidation stamps are only needed by fills still in flight; a feed query
+# that takes longer than this is not cached, which lets old stamps be dropped
+FILL_WINDOW_SECONDS = 30.0
+
+
+@dataclass
+class _FeedEntry:
+    feed: str
+    body: bytes
+    story_ids: FrozenSet[int]
+    expires_at: float
+
+
+class FeedCache:
+    """
+    Pre-serialized JSON cache for the public story feeds (/featured, /new, /popular).
+
+    Entries are bounded by count, total bytes and TTL. Writes invalidate only
+    what they can change: a whole feed when ordering or membership shifts,
+    otherwise just the cached pages that contain the touched story.
+
+    Every invalidation also advances a clock and records when each feed and
+    story was last invalidated. Callers read generation() before querying and
+    pass it to put(), which drops the page if anything it covers was
+    invalidated while the query ran. Stamps older than FILL_WINDOW_SECONDS
+    are pruned, and put() refuses fills that started before the pruned point.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple, _FeedEntry]" = OrderedDict()
+        self._keys_by_feed: Dict[str, Set[Tuple]] = {}
+        self._keys_by_story: Dict[int, Set[Tuple]] = {}
+        self._size_bytes = 0
+        self._clock = 0
+        self._feed_invalidated_at: Dict[str, int] = {}
+        self._story_invalidated_at: Dict[int, int] = {}
+        self._pruned_through = 0
+        self._checkpoint = (time.monotonic(), 0)  # (when, clock) of the last prune
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.time():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.body
+
+    def generation(self) -> int:
+        """Invalidation clock; read before running the query whose result goes to put()."""
+        return self._clock
+
+    def put(self, key: Tuple, body: bytes, story_ids, generation: int) -> None:
+        if not self.enabled or len(body) > self.max_bytes:
+            return
+        feed = key[0]
+        story_ids = frozenset(story_ids)
+        if (
+            generation < self._pruned_through
+            or self._feed_invalidated_at.get(feed, 0) > generation
+            or any(self._story_invalidated_at.get(story_id, 0) > generation for story_id in story_ids)
+        ):
+            self.stale_puts += 1  # a write committed while this page was being queried
+            return
+        self._remove(key)
+        entry = _FeedEntry(
+            feed=feed,
+            body=body,
+            story_ids=story_ids,
+            expires_at=time.time() + self.ttl_seconds
+        )
+        self._entries[key] = entry
+        self._size_bytes += len(body)
+        self._keys_by_feed.setdefault(feed, set()).add(key)
+        for story_id in entry.story_ids:
+            self._keys_by_story.setdefault(story_id, set()).add(key)
+
+        while len(self._entries) > self.max_entries or self._size_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate_feed(self, feed: str) -> None:
+        self._clock += 1
+        self._feed_invalidated_at[feed] = self._clock
+        self._prune_stamps()
+        for key in list(self._keys_by_feed.get(feed, ())):
+            self._remove(key)
+            self.invalidations += 1
+
+    def invalidate_story(self, story_id: int) -> None:
+        self._clock += 1
+        self._story_invalidated_at[story_id] = self._clock
+        self._prune_stamps()
+        for key in list(self._keys_by_story.get(story_id, ())):
+            self._remove(key)
+            self.invalidations += 1
+
+    # --- write hooks used by the story service ---
+
+    def story_created(self, featured: bool) -> None:
+        self.invalidate_feed(NEW_FEED)
+        self.invalidate_feed(POPULAR_FEED)
+        if featured:
+            self.invalidate_feed(FEATURED_FEED)
+
+    def story_updated(self, story_id: int) -> None:
+        self.invalidate_story(story_id)
+
+    def story_deleted(self, story_id: int, featured: bool) -> None:
+        self.story_created(featured)  # membership and totals shift the same way
+        self.invalidate_story(story_id)
+
+    def story_reacted(self, story_id: int) -> None:
+        self.invalidate_feed(POPULAR_FEED)
+        self.invalidate_story(story_id)
+
+    def clear(self) -> None:
+        self._clock += 1
+        for feed in (FEATURED_FEED, NEW_FEED, POPULAR_FEED):
+            self._feed_invalidated_at[feed] = self._clock
+        self._entries.clear()
+        self._keys_by_feed.clear()
+        self._keys_by_story.clear()
+        self._size_bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self._size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_puts": self.stale_puts,
+            "invalidation_stamps": len(self._feed_invalidated_at) + len(self._story_invalidated_at),
+        }
+
+    def _prune_stamps(self) -> None:
+        """Drop stamps no fill can still need, at most once per FILL_WINDOW_SECONDS."""
+        now = time.monotonic()
+        checked_at, clock = self._checkpoint
+        if now - checked_at < FILL_WINDOW_SECONDS:
+            return
+        # Fills that read a generation below the previous checkpoint are refused
+        # by put(), so stamps at or below it can no longer reject anything
+        self._pruned_through = clock
+        self._feed_invalidated_at = {
+            feed: stamp for feed, stamp in self._feed_invalidated_at.items() if stamp > clock
+        }
+        self._story_invalidated_at = {
+            story_id: stamp for story_id, stamp in self._story_invalidated_at.items() if stamp > clock
+        }
+        self._checkpoint = (now, self._clock)
+
+    def _remove(self, key: Tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._size_bytes -= len(entry.body)
+        feed_keys = self._keys_by_feed.get(entry.feed)
+        if feed_keys is not None:
+            feed_keys.discard(key)
+        for story_id in entry.story_ids:
+            story_keys = self._keys_by_story.get(story_id)
+            if story_keys is not None:
+                story_keys.discard(key)
+                if not story_keys:
+                    del self._keys_by_story[story_id]
+
+
+feed_cache = FeedCache(
+    ttl_seconds=Config.FEED_CACHE_TTL_SECONDS,
+    max_entries=Config.FEED_CACHE_MAX_ENTRIES,
+    max_bytes=Config.FEED_CACHE_MAX_BYTES,
+)
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy import update, bindparam
+
+from app.core.database import engine
+from app.models import OrmStory
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ReadCountBuffer:
+    """
+    Write-behind buffer for story read counts.
+
+    The detail endpoint only records an increment in memory; a background task
+    periodically applies all pending increments with one batched UPDATE, so
+    reading a story is no longer a write transaction.
+    """
+
+    def __init__(self, flush_interval_seconds: float):
+        self.flush_interval_seconds = flush_interval_seconds
+        self._pending: Dict[int, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.flush_count = 0
+        self.flushed_increments = 0
+
+    def record(self, story_id: int) -> None:
+        self._pending[story_id] = self._pending.get(story_id, 0) + 1
+
+    def stats(self) -> dict:
+        return {
+            "pending_stories": len(self._pending),
+            "pending_increments": sum(self._pending.values()),
+            "flush_count": self.flush_count,
+            "flushed_increments": self.flushed_increments,
+        }
+
+    async def flush(self) -> int:
+        """Apply pending increments in one transaction; returns the number of stories touched."""
+        if self._flush_lock is None:
+            # flush() without start(), e.g. a one-off flush from a script
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            stmt = (
+                update(OrmStory)
+                .where(OrmStory.id == bindparam("target_id"))
+                .values(
+                    read_count=OrmStory.read_count + bindparam("increment"),
+                    # keep updated_at for real edits, not reads
+                    updated_at=OrmStory.updated_at
+                )
+                .execution_options(synchronize_session=False)
+            )
+            try:
+                async with engine.begin() as conn:
+                    await conn.execute(
+                        stmt,
+                        [{"target_id": story_id, "increment": count} for story_id, count in batch.items()]
+                    )
+            except Exception as e:
+                # Put the increments back so the next flush retries them
+                for story_id, count in batch.items():
+                    self._pending[story_id] = self._pending.get(story_id, 0) + count
+                logger.error(f"Failed to flush read counts for {len(batch)} stories: {e}")
+                return 0
+
+            self.flush_count += 1
+            self.flushed_increments += sum(batch.values())
+            return len(batch)
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval_seconds)
+            except asyncio.TimeoutError:
+                await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            # Created here so the event and lock belong to the loop the app runs on
+            self._stopping = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and flush whatever is still pending."""
+        if self._task is not None:
+            # Signal rather than cancel: a cancelled flush would drop the batch it
+            # already took out of _pending, so let one in progress finish
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+read_count_buffer = ReadCountBuffer(flush_interval_seconds=Config.READ_COUNT_FLUSH_INTERVAL_SECONDS)
@@ -0,0 +1,130 @@
+import re
+from typing import Iterable, Optional
+
+from sqlalchemy import literal_column, or_, text, func
+from sqlalchemy.future import select
+
+from app.core.database import IS_SQLITE
+from app.models import OrmStory, OrmStoryPage, OrmTag
+from app.models.story import story_tags
+
+FTS_TABLE = "stories_fts"
+
+# Turkish dotted/dotless i pairs that str.lower() gets wrong ("I" -> "i", "İ" -> "i̇")
+_TURKISH_CASEFOLD = str.maketrans({"I": "ı", "İ": "i"})
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_fts_table = literal_column(FTS_TABLE)
+
+
+def normalize_turkish(value: Optional[str]) -> str:
+    """Lowercase text with Turkish casing rules so İ/i and I/ı match correctly."""
+    if not value:
+        return ""
+    return value.translate(_TURKISH_CASEFOLD).lower()
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """Turn free user input into a safe FTS5 MATCH expression (AND of prefix terms)."""
+    tokens = _TOKEN_RE.findall(normalize_turkish(query))
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+async def ensure_search_index(conn) -> None:
+    """Create the FTS5 table and backfill it from existing stories if it is empty."""
+    if not IS_SQLITE:
+        return
+    # Text is pre-normalized in Python, so the tokenizer must not touch diacritics (ı != i)
+    await conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+        "USING fts5(title, description, tags, pages, tokenize='unicode61 remove_diacritics 0')"
+    ))
+    indexed = (await conn.execute(text(f"SELECT count(*) FROM {FTS_TABLE}"))).scalar_one()
+    if indexed:
+        return
+
+    page_texts = (
+        select(func.group_concat(OrmStoryPage.text, " "))
+        .where(OrmStoryPage.story_id == OrmStory.id)
+        .scalar_subquery()
+    )
+    rows = await conn.execute(
+        select(
+            OrmStory.id,
+            OrmStory.title,
+            OrmStory.description,
+            page_texts,
+            func.group_concat(OrmTag.name, " ")
+        )
+        .outerjoin(story_tags, story_tags.c.story_id == OrmStory.id)
+        .outerjoin(OrmTag, OrmTag.id == story_tags.c.tag_id)
+        .group_by(OrmStory.id)
+    )
+    for story_id, title, description, pages, tag_names in rows.all():
+        await _insert_document(conn, story_id, title, description, (tag_names or "").split(" "), [pages])
+
+
+async def _insert_document(db, story_id: int, title: str, description: str,
+                           tag_names: Iterable[str], page_texts: Iterable[Optional[str]]) -> None:
+    await db.execute(
+        text(
+            f"INSERT INTO {FTS_TABLE}(rowid, title, description, tags, pages) "
+            "VALUES (:id, :title, :description, :tags, :pages)"
+        ),
+        {
+            "id": story_id,
+            "title": normalize_turkish(title),
+            "description": normalize_turkish(description),
+            "tags": normalize_turkish(" ".join(tag_names)),
+            "pages": normalize_turkish(" ".join(page_text or "" for page_text in page_texts)),
+        }
+    )
+
+
+async def index_story(db, story: OrmStory, tag_names: Iterable[str], page_texts: Iterable[Optional[str]]) -> None:
+    """(Re)index a story inside the caller's transaction."""
+    if not IS_SQLITE:
+        return
+    await unindex_story(db, story.id)
+    await _insert_document(db, story.id, story.title, story.description, tag_names, page_texts)
+
+
+async def unindex_story(db, story_id: int) -> None:
+    """Remove a story from the search index inside the caller's transaction."""
+    if not IS_SQLITE:
+        return
+    await db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": story_id})
+
+
+def search_condition(query: str):
+    """Filter condition restricting stories to search matches."""
+    if not IS_SQLITE:
+        search_query = f"%{query}%"
+        return or_(OrmStory.title.ilike(search_query), OrmStory.description.ilike(search_query))
+
+    match_query = build_match_query(query)
+    if match_query is None:
+        return True
+    return OrmStory.id.in_(
+        select(literal_column("rowid"))
+        .select_from(text(FTS_TABLE))
+        .where(_fts_table.op("MATCH")(match_query))
+    )
+
+
+def rank_subquery(query: str):
+    """Subquery of (story_id, rank) for bm25 ordering; lower rank is more relevant."""
+    match_query = build_match_query(query)
+    if not IS_SQLITE or match_query is None:
+        return None
+    return (
+        select(
+            literal_column("rowid").label("story_id"),
+            func.bm25(_fts_table).label("rank")
+        )
+        .select_from(text(FTS_TABLE))
+        .where(_fts_table.op("MATCH")(match_query))
+        .subquery()
+    )
@@ -1,34 +1,30 @@
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, desc, asc
+from sqlalchemy import desc, asc, update, delete, insert, and_, or_, literal, String, DateTime
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import datetime
+from typing import List, Optional, Tuple
+import base64
 import json
 import logging # Import logging
 
-from app.models import OrmStory, OrmTag, OrmUser, Page
+from app.models import OrmStory, OrmStoryPage, OrmTag, OrmUser, Page, StoryList, StoryPatch, User
+from app.models.story import story_tags, story_reactions
+from app.core.database import IS_SQLITE
+from app.services.story_totals import story_totals
+from app.services.feed_cache import feed_cache
+from app.services.story_search import index_story, unindex_story, rank_subquery
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-async def get_story_by_id(
-    story_id: int, 
-    db: AsyncSession, 
-    include_liked_by: bool = False,
-    include_disliked_by: bool = False 
-):
-    """Get a story by its ID with optional relationship loading"""
+async def get_story_by_id(story_id: int, db: AsyncSession):
+    """Get a story by its ID"""
     query = select(OrmStory).where(OrmStory.id == story_id)
-    
-    options_to_load = []
-    if include_liked_by:
-        options_to_load.append(selectinload(OrmStory.liked_by))
-    if include_disliked_by:
-        options_to_load.append(selectinload(OrmStory.disliked_by))
-        
-    if options_to_load:
-        query = query.options(*options_to_load)
         
     result = await db.execute(query)
     story = result.scalar_one_or_none()
@@ -38,41 +34,181 @@ async def get_story_by_id(
             
     return story
 
+def _ordering_name(sort_column, sort_direction) -> str:
+    # e.g. "likes desc"; ties a cursor to the ordering it was issued for
+    return f"{sort_column.key} {sort_direction.__name__}"
+
+def encode_cursor(sort_column, sort_direction, sort_value, story_id: int) -> str:
+    """Encode a (sort_key, id) keyset position and its ordering as an opaque URL-safe cursor"""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat(sep=" ")
+    raw = json.dumps(
+        [_ordering_name(sort_column, sort_direction), sort_value, story_id], separators=(",", ":")
+    ).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort_column, sort_direction):
+    """
+    Decode a cursor produced by encode_cursor for the same sort column and
+    direction; a cursor from another ordering is rejected with 400 instead of
+    comparing, say, a timestamp against like counts.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ordering, sort_value, story_id = json.loads(base64.urlsafe_b64decode(padded))
+        if ordering != _ordering_name(sort_column, sort_direction):
+            raise ValueError(ordering)
+        if isinstance(sort_column.type, DateTime):
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, int(story_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _keyset_bind(sort_column, sort_value):
+    # SQLite stores server_default timestamps as 'YYYY-MM-DD HH:MM:SS' text, while
+    # the DateTime type would bind '.000000' microseconds and break tie comparisons
+    if isinstance(sort_value, datetime) and IS_SQLITE:
+        return literal(sort_value.isoformat(sep=" "), String)
+    return sort_value
+
 async def get_stories_with_filter(
     db: AsyncSession,
     filter_condition,
     sort_column=OrmStory.created_at,
     sort_direction=desc,
     limit: int = 10,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    total_key: Optional[str] = None,
+    search_query: Optional[str] = None
 ):
-    """Helper function to get stories with filtering and sorting"""
-    count_query = select(func.count()).select_from(OrmStory).where(filter_condition)
-    total_result = await db.execute(count_query)
-    total = total_result.scalar_one()
+    """
+    Helper function to get stories with filtering and sorting.
+
+    With a cursor the page is fetched by keyset on (sort_column, id) and offset is
+    ignored; otherwise classic LIMIT/OFFSET is used. total_key names an exact
+    counter from story_totals for fixed feeds; other filters use a cached count.
+    A sort_column of None orders by bm25 relevance for search_query.
+    Returns (total, stories, next_cursor); total is None when include_total is False.
+    """
+    total = None
+    if include_total:
+        if total_key is not None:
+            total = await story_totals.get_exact(db, total_key)
+        else:
+            total = await story_totals.get_filtered(db, filter_condition)
+
+    ranks = None
+    if sort_column is None:
+        ranks = rank_subquery(search_query) if search_query else None
+        if ranks is None:
+            sort_column, sort_direction = OrmStory.created_at, desc
+        else:
+            sort_column, sort_direction = ranks.c.rank, asc
     
+    # Project only what StoryList needs; the content blob and tags are never read
     query = (
-        select(OrmStory)
-        .options(selectinload(OrmStory.author), selectinload(OrmStory.tags))
+        select(
+            OrmStory.id,
+            OrmStory.title,
+            OrmStory.image,
+            OrmStory.description,
+            OrmStory.category,
+            OrmStory.likes,
+            OrmUser.id.label("author_id"),
+            OrmUser.username.label("author_username"),
+            OrmUser.email.label("author_email"),
+            sort_column.label("sort_key")
+        )
+        .join(OrmUser, OrmUser.id == OrmStory.author_id)
+    )
+    if ranks is not None:
+        query = query.join(ranks, ranks.c.story_id == OrmStory.id)
+    query = (
+        query
         .where(filter_condition)
-        .order_by(sort_direction(sort_column))
+        .order_by(sort_direction(sort_column), sort_direction(OrmStory.id))
         .limit(limit)
-        .offset(offset)
     )
+
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor, sort_column, sort_direction)
+        bound_value = _keyset_bind(sort_column, sort_value)
+        # The leading bound lets SQLite seek the (sort_key, id) index; with bound
+        # parameters it plans the bare OR as a scan from the top of the index
+        if sort_direction is desc:
+            query = query.where(sort_column <= bound_value, or_(
+                sort_column < bound_value,
+                and_(sort_column == bound_value, OrmStory.id < last_id)
+            ))
+        else:
+            query = query.where(sort_column >= bound_value, or_(
+                sort_column > bound_value,
+                and_(sort_column == bound_value, OrmStory.id > last_id)
+            ))
+    else:
+        query = query.offset(offset)
+
     result = await db.execute(query)
-    stories = result.scalars().all()
+    rows = result.all()
+    stories = [
+        StoryList(
+            id=row.id,
+            title=row.title,
+            image=row.image,
+            description=row.description,
+            category=row.category,
+            likes=row.likes,
+            author=User(id=row.author_id, username=row.author_username, email=row.author_email)
+        )
+        for row in rows
+    ]
+
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_cursor(sort_column, sort_direction, rows[-1].sort_key, rows[-1].id)
     
-    return total, stories
+    return total, stories, next_cursor
+
+async def _page_texts(db: AsyncSession, story_id: int) -> List[Optional[str]]:
+    result = await db.execute(
+        select(OrmStoryPage.text)
+        .where(OrmStoryPage.story_id == story_id)
+        .order_by(OrmStoryPage.page_index)
+    )
+    return result.scalars().all()
+
+async def _resolve_tags(db: AsyncSession, tag_names: List[str]) -> List[OrmTag]:
+    """Tags with the given names; missing ones are created in the session."""
+    unique_tag_names = list(set(tag_names))
+
+    # Fetch existing tags
+    existing_tags_result = await db.execute(
+        select(OrmTag).where(OrmTag.name.in_(unique_tag_names))
+    )
+    existing_tags = {tag.name: tag for tag in existing_tags_result.scalars()}
+    tags = list(existing_tags.values())
+
+    # Identify and create new tags
+    for tag_name in unique_tag_names:
+        if tag_name not in existing_tags:
+            new_tag = OrmTag(name=tag_name)
+            db.add(new_tag)
+            tags.append(new_tag)
+    return tags
 
 async def create_new_story(db: AsyncSession, story_data, author_id: int):
     """Create a new story with associated tags within a single transaction."""
-    content_json = json.dumps([page.dict(exclude_none=True) for page in story_data.content])
-
     new_story = OrmStory(
         title=story_data.title,
         image=story_data.image,
         description=story_data.description,
-        content=content_json,
+        pages=[
+            OrmStoryPage(page_index=index, text=page.text, image=page.image)
+            for index, page in enumerate(story_data.content)
+        ],
+        page_count=len(story_data.content),
         category=story_data.category,
         is_interactive=story_data.is_interactive,
         age_group=story_data.age_group,
@@ -82,22 +218,7 @@ async def create_new_story(db: AsyncSession, story_data, author_id: int):
     # Prepare tags before adding the story to the session
     tags_to_associate = []
     if hasattr(story_data, "tags") and story_data.tags:
-        unique_tag_names = list(set(story_data.tags))
-        
-        # Fetch existing tags
-        existing_tags_result = await db.execute(
-            select(OrmTag).where(OrmTag.name.in_(unique_tag_names))
-        )
-        existing_tags = {tag.name: tag for tag in existing_tags_result.scalars()}
-        
-        tags_to_associate.extend(existing_tags.values())
-
-        # Identify and create new tags
-        for tag_name in unique_tag_names:
-            if tag_name not in existing_tags:
-                new_tag = OrmTag(name=tag_name)
-                db.add(new_tag) # Add new tag to session
-                tags_to_associate.append(new_tag) # Add the new ORM object
+        tags_to_associate = await _resolve_tags(db, story_data.tags)
 
     # Add the story to the session
     db.add(new_story)
@@ -111,6 +232,11 @@ async def create_new_story(db: AsyncSession, story_data, author_id: int):
 
     # Commit everything at once
     try:
+        # Flush for the story id so the search index is written in the same transaction
+        await db.flush()
+        await index_story(
+            db, new_story, [tag.name for tag in tags_to_associate], [page.text for page in story_data.content]
+        )
         await db.commit()
     except Exception as e:
         await db.rollback() # Rollback on error
@@ -120,7 +246,7 @@ async def create_new_story(db: AsyncSession, story_data, author_id: int):
     # Use the committed story's ID
     final_result = await db.execute(
         select(OrmStory)
-        .options(selectinload(OrmStory.tags), selectinload(OrmStory.author))
+        .options(selectinload(OrmStory.tags), selectinload(OrmStory.author), selectinload(OrmStory.pages))
         .where(OrmStory.id == new_story.id)
     )
     loaded_story = final_result.scalar_one_or_none() # Use scalar_one_or_none for safety
@@ -129,30 +255,8 @@ async def create_new_story(db: AsyncSession, story_data, author_id: int):
          # This shouldn't happen if commit succeeded, but handle defensively
          raise HTTPException(status_code=404, detail="Story not found after creation commit")
 
-    # Content deserialization for the response model is now handled by Pydantic StoryDetail model
-    # No need for manual deserialization here.
-    # if loaded_story.content:
-    #     try:
-    #         content_data = json.loads(loaded_story.content)
-    #         if isinstance(content_data, list):
-    #              deserialized_pages = []
-    #              for page_dict in content_data:
-    #                  try:
-    #                      if isinstance(page_dict, dict):
-    #                          deserialized_pages.append(Page(**page_dict))
-    #                      else:
-    #                          logger.warning(f"Skipping invalid page data (not a dict) post-creation in story {loaded_story.id}: {page_dict}")
-    #                  except TypeError as page_err:
-    #                      logger.error(f"Error deserializing page data post-creation in story {loaded_story.id}: {page_err} - Data: {page_dict}")
-    #              loaded_story.content = deserialized_pages
-    #         else:
-    #              logger.warning(f"Story {loaded_story.id} content (post-creation) is not a list: {loaded_story.content}")
-    #              loaded_story.content = [Page(text=str(content_data))]
-    #     except (json.JSONDecodeError, TypeError) as e:
-    #         logger.error(f"Error decoding story content after creation for story {loaded_story.id}: {e}")
-    #         loaded_story.content = [Page(text="Error loading content")]
-    # else:
-    #     loaded_story.content = []
+    story_totals.record_created(loaded_story)
+    feed_cache.story_created(loaded_story.featured)
 
     return loaded_story
 
@@ -166,15 +270,28 @@ async def update_existing_story(db: AsyncSession, story_id: int, story_data, use
             detail="You don't have permission to update this story"
         )
     
+    old_category = story.category
     for field, value in story_data.dict(exclude_unset=True).items():
         setattr(story, field, value)
+    # Incremented in SQL so a PATCH committed since the story was read is not reused
+    story.version = OrmStory.version + 1
+
+    tag_names_result = await db.execute(
+        select(OrmTag.name)
+        .join(story_tags, story_tags.c.tag_id == OrmTag.id)
+        .where(story_tags.c.story_id == story_id)
+    )
+    await index_story(db, story, tag_names_result.scalars().all(), await _page_texts(db, story_id))
     
     await db.commit()
+    story_totals.record_category_changed(old_category, story.category)
+    feed_cache.story_updated(story_id)
     
     result = await db.execute(
         select(OrmStory)
-        .options(selectinload(OrmStory.tags), selectinload(OrmStory.author))
+        .options(selectinload(OrmStory.tags), selectinload(OrmStory.author), selectinload(OrmStory.pages))
         .where(OrmStory.id == story_id)
+        .execution_options(populate_existing=True)
     )
     updated_story = result.scalar_one_or_none()
     
@@ -183,6 +300,138 @@ async def update_existing_story(db: AsyncSession, story_id: int, story_data, use
     
     return updated_story
 
+async def _shift_pages(db: AsyncSession, story_id: int, start: int, end: int, delta: int) -> None:
+    """Move pages start <= index < end by delta positions."""
+    if start >= end:
+        return
+    in_story = OrmStoryPage.story_id == story_id
+    # Through negative indexes (-2 and below; -1 parks a moving page) so that no
+    # intermediate row collides with the (story_id, page_index) primary key
+    await db.execute(
+        update(OrmStoryPage)
+        .where(in_story, OrmStoryPage.page_index >= start, OrmStoryPage.page_index < end)
+        .values(page_index=-(OrmStoryPage.page_index + delta) - 2)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        update(OrmStoryPage)
+        .where(in_story, OrmStoryPage.page_index <= -2)
+        .values(page_index=-OrmStoryPage.page_index - 2)
+        .execution_options(synchronize_session=False)
+    )
+
+def _check_page_index(index: int, page_count: int, op: str) -> None:
+    if index >= page_count:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Page {index} is out of range for {op} (story has {page_count} pages)"
+        )
+
+async def _apply_page_operation(db: AsyncSession, story_id: int, operation, page_count: int) -> int:
+    """Apply one StoryPatch operation; returns the new page count."""
+    in_story = OrmStoryPage.story_id == story_id
+
+    if operation.op == "insert":
+        _check_page_index(operation.index, page_count + 1, operation.op)
+        await _shift_pages(db, story_id, operation.index, page_count, 1)
+        await db.execute(insert(OrmStoryPage).values(
+            story_id=story_id, page_index=operation.index, text=operation.page.text, image=operation.page.image
+        ))
+        return page_count + 1
+
+    _check_page_index(operation.index, page_count, operation.op)
+    if operation.op == "replace":
+        await db.execute(
+            update(OrmStoryPage)
+            .where(in_story, OrmStoryPage.page_index == operation.index)
+            .values(text=operation.page.text, image=operation.page.image)
+            .execution_options(synchronize_session=False)
+        )
+    elif operation.op == "delete":
+        await db.execute(
+            delete(OrmStoryPage)
+            .where(in_story, OrmStoryPage.page_index == operation.index)
+            .execution_options(synchronize_session=False)
+        )
+        await _shift_pages(db, story_id, operation.index + 1, page_count, -1)
+        return page_count - 1
+    elif operation.op == "move" and operation.to != operation.index:
+        _check_page_index(operation.to, page_count, operation.op)
+
+        async def set_index(old: int, new: int) -> None:
+            await db.execute(
+                update(OrmStoryPage)
+                .where(in_story, OrmStoryPage.page_index == old)
+                .values(page_index=new)
+                .execution_options(synchronize_session=False)
+            )
+
+        await set_index(operation.index, -1)
+        if operation.index < operation.to:
+            await _shift_pages(db, story_id, operation.index + 1, operation.to + 1, -1)
+        else:
+            await _shift_pages(db, story_id, operation.to, operation.index, 1)
+        await set_index(-1, operation.to)
+    return page_count
+
+async def patch_story(db: AsyncSession, story_id: int, patch: StoryPatch, user_id: int):
+    """
+    Apply page operations and a tag change to a story in one transaction.
+
+    Only the affected page rows are written. The story's version is bumped
+    with a conditional UPDATE first, so an edit based on an older version
+    fails with 409 instead of overwriting a concurrent one.
+    """
+    try:
+        claimed = await db.execute(
+            update(OrmStory)
+            .where(OrmStory.id == story_id, OrmStory.author_id == user_id, OrmStory.version == patch.version)
+            .values(version=OrmStory.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if claimed.rowcount == 0:
+            story = await get_story_by_id(story_id, db)
+            if story.author_id != user_id:
+                raise HTTPException(
+                    status_code=403,
+                    detail="You don't have permission to update this story"
+                )
+            raise HTTPException(
+                status_code=409,
+                detail=f"Story was changed by another edit (version {story.version}); reload and retry"
+            )
+
+        result = await db.execute(
+            select(OrmStory)
+            .options(selectinload(OrmStory.tags))
+            .where(OrmStory.id == story_id)
+            .execution_options(populate_existing=True)
+        )
+        story = result.scalar_one()
+
+        page_count = story.page_count
+        for operation in patch.operations:
+            page_count = await _apply_page_operation(db, story_id, operation, page_count)
+        story.page_count = page_count
+        if patch.tags is not None:
+            story.tags = await _resolve_tags(db, patch.tags)
+
+        await db.flush()
+        await index_story(db, story, [tag.name for tag in story.tags], await _page_texts(db, story_id))
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    feed_cache.story_updated(story_id)
+
+    result = await db.execute(
+        select(OrmStory)
+        .options(selectinload(OrmStory.tags), selectinload(OrmStory.author), selectinload(OrmStory.pages))
+        .where(OrmStory.id == story_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one()
+
 async def delete_story_by_id(db: AsyncSession, story_id: int, user_id: int):
     """Delete a story by its ID"""
     story = await get_story_by_id(story_id, db)
@@ -193,107 +442,95 @@ async def delete_story_by_id(db: AsyncSession, story_id: int, user_id: int):
             detail="You don't have permission to delete this story"
         )
     
+    await db.execute(delete(story_reactions).where(story_reactions.c.story_id == story_id))
+    await db.execute(delete(OrmStoryPage).where(OrmStoryPage.story_id == story_id))
     await db.delete(story)
+    await unindex_story(db, story_id)
     await db.commit()
+    story_totals.record_deleted(story)
+    feed_cache.story_deleted(story_id, story.featured)
     
     return None
 
-async def process_story_like(db: AsyncSession, story_id: int, user_id: int):
-    """Process like action for a story"""
-    story = await get_story_by_id(story_id, db, include_liked_by=True, include_disliked_by=True)
-    
-    user_in_liked_by = any(user.id == user_id for user in story.liked_by)
-    user_in_disliked_by = any(user.id == user_id for user in story.disliked_by)
-
-    # Get the current user
-    result = await db.execute(select(OrmUser).where(OrmUser.id == user_id))
-    current_user = result.scalar_one_or_none()
-    
-    if not current_user:
-        raise HTTPException(status_code=404, detail="User not found")
+async def _toggle_reaction(db: AsyncSession, story_id: int, user_id: int, value: int) -> int:
+    """Toggle the (story, user) reaction row; returns the change to the story's score."""
+    reaction_match = and_(
+        story_reactions.c.story_id == story_id,
+        story_reactions.c.user_id == user_id
+    )
 
-    if user_in_liked_by:
-        # zaten like varsa, kaldır (toggle off)
-        story.liked_by = [user for user in story.liked_by if user.id != user_id]
-    else:
-        # like ekle
-        story.liked_by.append(current_user)
-        # eğer disliked ise, dislike'i kaldır
-        if user_in_disliked_by:
-            story.disliked_by = [user for user in story.disliked_by if user.id != user_id]
-
-    # Update likes count
-    story.likes = len(story.liked_by) - len(story.disliked_by)
-    await db.commit()
-    
-    # Get updated story
-    result = await db.execute(
-        select(OrmStory)
-        .options(
-            selectinload(OrmStory.tags), 
-            selectinload(OrmStory.author), 
-            selectinload(OrmStory.liked_by), 
-            selectinload(OrmStory.disliked_by)
-        )
-        .where(OrmStory.id == story_id)
+    # aynı tepki tekrar gelirse kaldır (toggle off)
+    removed = await db.execute(
+        delete(story_reactions).where(reaction_match, story_reactions.c.value == value)
     )
-    loaded_story = result.scalar_one_or_none()
-    
-    if not loaded_story:
-        raise HTTPException(status_code=404, detail="Story not found after like update")
-    
-    return loaded_story
+    if removed.rowcount:
+        return -value
+    # ters tepki varsa çevir, yoksa yeni tepki ekle
+    flipped = await db.execute(
+        update(story_reactions).where(reaction_match).values(value=value)
+    )
+    if flipped.rowcount:
+        return 2 * value
+    await db.execute(
+        insert(story_reactions).values(story_id=story_id, user_id=user_id, value=value)
+    )
+    return value
 
-async def process_story_dislike(db: AsyncSession, story_id: int, user_id: int):
-    """Process dislike action for a story"""
-    story = await get_story_by_id(story_id, db, include_liked_by=True, include_disliked_by=True)
-    
-    user_in_liked_by = any(user.id == user_id for user in story.liked_by)
-    user_in_disliked_by = any(user.id == user_id for user in story.disliked_by)
+async def _process_story_reaction(db: AsyncSession, story_id: int, user_id: int, value: int):
+    """
+    Toggle a user's reaction (1 = like, -1 = dislike) on a story.
 
-    # Get the current user
-    result = await db.execute(select(OrmUser).where(OrmUser.id == user_id))
-    current_user = result.scalar_one_or_none()
-    
-    if not current_user:
-        raise HTTPException(status_code=404, detail="User not found")
+    Only the single (story, user) reaction row and the story's net score are
+    touched; liker lists are never loaded.
+    """
+    exists_result = await db.execute(select(OrmStory.id).where(OrmStory.id == story_id))
+    if exists_result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Story not found")
 
-    if user_in_disliked_by:
-        # If already disliked, remove dislike (toggle off)
-        story.disliked_by = [user for user in story.disliked_by if user.id != user_id]
-    else:
-        # Add dislike
-        story.disliked_by.append(current_user)
-        # If previously liked, remove like
-        if user_in_liked_by:
-            story.liked_by = [user for user in story.liked_by if user.id != user_id]
-
-    # Update likes count
-    story.likes = len(story.liked_by) - len(story.disliked_by)
-    await db.commit()
-    
-    # Get updated story
-    result = await db.execute(
-        select(OrmStory)
-        .options(
-            selectinload(OrmStory.tags), selectinload(OrmStory.author), selectinload(OrmStory.liked_by),
-            selectinload(OrmStory.disliked_by) 
-        )
+    try:
+        delta = await _toggle_reaction(db, story_id, user_id, value)
+    except IntegrityError:
+        # A concurrent reaction by the same user inserted the row first; the
+        # retry sees that row and removes or flips it like a serial request would
+        await db.rollback()
+        delta = await _toggle_reaction(db, story_id, user_id, value)
+
+    await db.execute(
+        update(OrmStory)
         .where(OrmStory.id == story_id)
+        .values(
+            likes=OrmStory.likes + delta,
+            # reactions are not edits to the story itself
+            updated_at=OrmStory.updated_at
+        )
+        .execution_options(synchronize_session=False)
     )
-    loaded_story = result.scalar_one_or_none()
-    
-    if not loaded_story:
-        raise HTTPException(status_code=404, detail="Story not found after dislike update")
-    
-    return loaded_story
+    await db.commit()
+    feed_cache.story_reacted(story_id)
+
+    return await get_story_detail_by_id(db, story_id)
+
+async def process_story_like(db: AsyncSession, story_id: int, user_id: int):
+    """Process like action for a story"""
+    return await _process_story_reaction(db, story_id, user_id, 1)
 
-async def increment_story_read_count(db: AsyncSession, story_id: int):
-    """Increment story read count and return the updated story"""
-    # Use selectinload to eagerly load relationships needed for the response *after* the update
+async def process_story_dislike(db: AsyncSession, story_id: int, user_id: int):
+    """Process dislike action for a story"""
+    return await _process_story_reaction(db, story_id, user_id, -1)
+
+async def get_story_detail_by_id(db: AsyncSession, story_id: int, page_limit: Optional[int] = None):
+    """
+    Load a story with the relationships needed for the StoryDetail response.
+
+    With page_limit only the first page_limit pages are loaded; readers fetch
+    the rest through get_story_pages as they advance.
+    """
+    options = [selectinload(OrmStory.tags), selectinload(OrmStory.author)]
+    if page_limit is None:
+        options.append(selectinload(OrmStory.pages))
     result = await db.execute(
         select(OrmStory)
-        .options(selectinload(OrmStory.tags), selectinload(OrmStory.author)) # Eager load here
+        .options(*options)
         .where(OrmStory.id == story_id)
     )
     story = result.scalar_one_or_none()
@@ -301,37 +538,37 @@ async def increment_story_read_count(db: AsyncSession, story_id: int):
     if not story:
         raise HTTPException(status_code=404, detail="Story not found")
 
-    # Increment count
-    story.read_count += 1
-    db.add(story) # Mark as dirty
-    await db.commit() # Commit the change
-
-    # Refresh is likely not needed as we eager loaded, but can be kept for safety
-    # await db.refresh(story, ['tags', 'author']) # Re-fetches data
-
-    # Content deserialization for the response model is now handled by Pydantic StoryDetail model
-    # No need for manual deserialization here.
-    # if story.content:
-    #     try:
-    #         content_data = json.loads(story.content)
-    #         if isinstance(content_data, list):
-    #             deserialized_pages = []
-    #             for page_dict in content_data:
-    #                 try:
-    #                     if isinstance(page_dict, dict):
-    #                         deserialized_pages.append(Page(**page_dict))
-    #                     else:
-    #                         logger.warning(f"Skipping invalid page data (not a dict) after read increment in story {story.id}: {page_dict}")
-    #                 except TypeError as page_err:
-    #                     logger.error(f"Error deserializing page data after read increment in story {story.id}: {page_err} - Data: {page_dict}")
-    #             story.content = deserialized_pages
-    #         else:
-    #             logger.warning(f"Story {story.id} content (after read increment) is not a list: {story.content}")
-    #             story.content = [Page(text=str(content_data))]
-    #     except (json.JSONDecodeError, TypeError) as e:
-    #         logger.error(f"Error decoding story content after incrementing read count for story {story.id}: {e}")
-    #         story.content = [Page(text="Error loading content")]
-    # else:
-    #     story.content = []
+    if page_limit is not None:
+        _, pages = await get_story_pages(db, story_id, 0, page_limit, story.page_count)
+        # Attach without marking the story as modified
+        set_committed_value(story, "pages", pages)
 
     return story
+
+async def get_story_pages(
+    db: AsyncSession,
+    story_id: int,
+    start: int,
+    end: int,
+    page_count: Optional[int] = None
+) -> Tuple[int, List[OrmStoryPage]]:
+    """Pages start <= index < end of a story, with the story's page count."""
+    if page_count is None:
+        count_result = await db.execute(select(OrmStory.page_count).where(OrmStory.id == story_id))
+        page_count = count_result.scalar_one_or_none()
+        if page_count is None:
+            raise HTTPException(status_code=404, detail="Story not found")
+
+    pages = []
+    if start < min(end, page_count):
+        result = await db.execute(
+            select(OrmStoryPage)
+            .where(
+                OrmStoryPage.story_id == story_id,
+                OrmStoryPage.page_index >= start,
+                OrmStoryPage.page_index < end
+            )
+            .order_by(OrmStoryPage.page_index)
+        )
+        pages = result.scalars().all()
+    return page_count, pages
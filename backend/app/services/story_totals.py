@@ -0,0 +1,138 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models import OrmStory
+from config import Config
+
+ALL_KEY = "all"
+FEATURED_KEY = "featured"
+
+
+def category_key(category: str) -> str:
+    return f"category:{category}"
+
+
+def age_group_key(age_group: str) -> str:
+    return f"age_group:{age_group}"
+
+
+class StoryTotals:
+    """
+    Story totals without a COUNT(*) per list request.
+
+    Fixed feeds (all, featured, per category, per age group) use counters
+    seeded from the database and kept current by this process's story service
+    on create/update/delete. Writes from other processes are not seen, so the
+    counters are re-seeded every reseed_seconds; a seed that overlapped a local
+    write may have missed it and is used for the current request only. Ad-hoc
+    filters get a short-lived cached COUNT keyed by the compiled filter.
+    """
+
+    def __init__(self, reseed_seconds: int, filter_ttl_seconds: int, filter_max_entries: int):
+        self.reseed_seconds = reseed_seconds
+        self.filter_ttl_seconds = filter_ttl_seconds
+        self.filter_max_entries = filter_max_entries
+        self._counters: Optional[Dict[str, int]] = None
+        self._counters_expire_at = 0.0
+        self._writes = 0  # local writes so far, to detect ones racing a seed
+        self._filter_counts: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+
+    async def get_exact(self, db: AsyncSession, key: str) -> int:
+        counters = self._counters
+        if counters is None or self._counters_expire_at <= time.time():
+            counters = await self._load_counters(db)
+        return counters.get(key, 0)
+
+    async def get_filtered(self, db: AsyncSession, filter_condition) -> int:
+        cache_key = str(select(OrmStory.id).where(filter_condition).compile(
+            compile_kwargs={"literal_binds": True}
+        ))
+        entry = self._filter_counts.get(cache_key)
+        if entry is not None and entry[1] > time.time():
+            self._filter_counts.move_to_end(cache_key)
+            return entry[0]
+
+        result = await db.execute(select(func.count()).select_from(OrmStory).where(filter_condition))
+        total = result.scalar_one()
+        if self.filter_ttl_seconds > 0:
+            self._filter_counts[cache_key] = (total, time.time() + self.filter_ttl_seconds)
+            self._filter_counts.move_to_end(cache_key)
+            while len(self._filter_counts) > self.filter_max_entries:
+                self._filter_counts.popitem(last=False)
+        return total
+
+    def record_created(self, story: OrmStory) -> None:
+        self._apply(story.category, story.age_group, story.featured, 1)
+
+    def record_deleted(self, story: OrmStory) -> None:
+        self._apply(story.category, story.age_group, story.featured, -1)
+
+    def record_category_changed(self, old_category: str, new_category: str) -> None:
+        if old_category == new_category:
+            return
+        self._writes += 1
+        if self._counters is not None:
+            self._bump(category_key(old_category), -1)
+            self._bump(category_key(new_category), 1)
+        self._filter_counts.clear()
+
+    def reset(self) -> None:
+        self._counters = None
+        self._filter_counts.clear()
+
+    async def _load_counters(self, db: AsyncSession) -> Dict[str, int]:
+        writes_before = self._writes
+        counters: Dict[str, int] = {}
+        total_result = await db.execute(select(func.count()).select_from(OrmStory))
+        counters[ALL_KEY] = total_result.scalar_one()
+
+        featured_result = await db.execute(
+            select(func.count()).select_from(OrmStory).where(OrmStory.featured == True)
+        )
+        counters[FEATURED_KEY] = featured_result.scalar_one()
+
+        category_result = await db.execute(
+            select(OrmStory.category, func.count()).group_by(OrmStory.category)
+        )
+        for category, count in category_result.all():
+            counters[category_key(category)] = count
+
+        age_group_result = await db.execute(
+            select(OrmStory.age_group, func.count()).group_by(OrmStory.age_group)
+        )
+        for age_group, count in age_group_result.all():
+            counters[age_group_key(age_group)] = count
+
+        if self._writes == writes_before:
+            self._counters = counters
+            self._counters_expire_at = time.time() + self.reseed_seconds
+        else:
+            # A local write committed while the COUNTs ran: they may or may not
+            # include it, so keep nothing and seed again on the next request
+            self._counters = None
+        return counters
+
+    def _apply(self, category: str, age_group: str, featured: bool, delta: int) -> None:
+        self._writes += 1
+        if self._counters is not None:
+            self._bump(ALL_KEY, delta)
+            self._bump(category_key(category), delta)
+            self._bump(age_group_key(age_group), delta)
+            if featured:
+                self._bump(FEATURED_KEY, delta)
+        self._filter_counts.clear()
+
+    def _bump(self, key: str, delta: int) -> None:
+        self._counters[key] = max(self._counters.get(key, 0) + delta, 0)
+
+
+story_totals = StoryTotals(
+    reseed_seconds=Config.STORY_TOTALS_RESEED_SECONDS,
+    filter_ttl_seconds=Config.STORY_FILTER_COUNT_TTL_SECONDS,
+    filter_max_entries=Config.STORY_FILTER_COUNT_MAX_ENTRIES,
+)
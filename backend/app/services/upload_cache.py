@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from typing import Optional
+
+from config import Config
+
+
+class UploadCache:
+    """
+    In-memory LRU of small, frequently requested /uploads files.
+
+    Stored keys are never rewritten, so entries need no TTL or invalidation;
+    they only leave on eviction (bounded by total bytes) or when the file is
+    deleted from storage.
+    """
+
+    def __init__(self, max_bytes: int, max_file_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key: str, body: bytes) -> None:
+        if len(body) > min(self.max_file_bytes, self.max_bytes):
+            return
+        self.discard(key)
+        self._entries[key] = body
+        self._size_bytes += len(body)
+        while self._size_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size_bytes -= len(evicted)
+            self.evictions += 1
+
+    def discard(self, key: str) -> None:
+        body = self._entries.pop(key, None)
+        if body is not None:
+            self._size_bytes -= len(body)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size_bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self._size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+upload_cache = UploadCache(
+    max_bytes=Config.UPLOADS_MEMORY_CACHE_BYTES,
+    max_file_bytes=Config.UPLOADS_INLINE_MAX_BYTES,
+)
@@ -0,0 +1,271 @@
+import asyncio
+import logging
+import string
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import select
+
+from app.core.database import engine
+from app.core.migrations import _legacy_pages
+from app.models import OrmStory, OrmStoryPage
+from app.services.upload_cache import upload_cache
+from app.utils.file_utils import image_set_keys
+from app.utils.image_processing import FULL_VARIANT, WEBP_EXTENSION
+from app.utils.storage import StoredObject, key_for_path, path_for_key, storage
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Every uploaded or generated image is stored under this namespace (see sharded_key)
+SCANNED_PREFIX = "images/"
+SHA256_HEX_LENGTH = 64
+REPORT_SAMPLE_SIZE = 50
+
+
+def asset_group(key: str) -> str:
+    """
+    Keys that live and die together.
+
+    Content-addressed keys (<sha256>_<variant>.<ext>) share their hash, so a
+    reference to the full WebP keeps the width variants and the fallback
+    copy; any other key (legacy UUID names, stray temp files) is its own group.
+    """
+    directory, _, name = key.rpartition("/")
+    digest = name[:SHA256_HEX_LENGTH]
+    if (
+        len(name) > SHA256_HEX_LENGTH
+        and name[SHA256_HEX_LENGTH] in "_."
+        and all(char in string.hexdigits for char in digest)
+    ):
+        return f"{directory}/{digest}"
+    return key
+
+
+def _groups_for_paths(paths: Iterable[Optional[str]]) -> Set[str]:
+    groups = set()
+    for path in paths:
+        key = key_for_path(path) if path else None
+        if key:
+            groups.add(asset_group(key))
+    return groups
+
+
+@dataclass
+class UploadGCReport:
+    dry_run: bool
+    started_at: float
+    duration_seconds: float = 0.0
+    batches: int = 0
+    scanned: int = 0
+    referenced: int = 0
+    within_grace: int = 0
+    orphaned: int = 0
+    orphaned_bytes: int = 0
+    deleted: int = 0
+    kept_on_recheck: int = 0  # Orphans re-touched or newly referenced while the scan ran
+    errors: int = 0
+    sample: List[str] = field(default_factory=list)  # First orphaned keys, for dry-run review
+
+
+class UploadGarbageCollector:
+    """
+    Deletes stored files that no story references any more.
+
+    Replaced or deleted story images, images of failed AI generations and
+    uploads that were never used all end up here. A file is removed only if
+    neither stories.image nor story_pages.image (nor, until the page migration
+    has finished, a legacy stories.content blob) points at its asset group and it
+    is older than the grace period, which protects uploads whose story has
+    not been saved yet. Storage is listed in batches and every storage and
+    listing step runs off the event loop; dry-run mode only reports.
+
+    References are snapshotted when a run starts, so each batch's orphan
+    groups are re-checked right before deletion: a group is kept if any of
+    its files was touched since (a dedup upload) or a story now points at it.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float,
+        grace_seconds: float,
+        batch_size: int,
+        batch_pause_seconds: float,
+        dry_run: bool
+    ):
+        self.interval_seconds = interval_seconds
+        self.grace_seconds = grace_seconds
+        self.batch_size = batch_size
+        self.batch_pause_seconds = batch_pause_seconds
+        self.dry_run = dry_run
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self.runs = 0
+        self.last_report: Optional[UploadGCReport] = None
+
+    async def _legacy_content_groups(self, conn) -> Set[str]:
+        """
+        Groups referenced from stories.content blobs that migrate_content_to_pages
+        has not moved into story_pages yet; empty once the migration has finished.
+        """
+        groups: Set[str] = set()
+        stmt = (
+            select(OrmStory.legacy_content)
+            .where(OrmStory.legacy_content.is_not(None), OrmStory.legacy_content != "")
+            .execution_options(yield_per=self.batch_size)
+        )
+        result = await conn.stream_scalars(stmt)
+        async for contents in result.partitions():
+            for content in contents:
+                groups |= _groups_for_paths(image for _, image in _legacy_pages(content))
+            await asyncio.sleep(0)
+        return groups
+
+    async def referenced_groups(self) -> Set[str]:
+        groups: Set[str] = set()
+        async with engine.connect() as conn:
+            groups |= await self._legacy_content_groups(conn)
+            for image_column in (OrmStory.image, OrmStoryPage.image):
+                stmt = (
+                    select(image_column)
+                    .where(image_column.is_not(None))
+                    .execution_options(yield_per=self.batch_size)
+                )
+                result = await conn.stream_scalars(stmt)
+                async for paths in result.partitions():
+                    groups |= _groups_for_paths(paths)
+                    await asyncio.sleep(0)
+        return groups
+
+    async def _still_orphaned(self, orphans: List[StoredObject], cutoff: float) -> List[StoredObject]:
+        """The orphans whose whole group is still unreferenced and untouched since cutoff."""
+        groups = {asset_group(stored.key) for stored in orphans}
+        stats = await asyncio.gather(*(storage.stat(stored.key) for stored in orphans))
+        kept = {
+            asset_group(stored.key)
+            for stored, current in zip(orphans, stats)
+            if current is not None and current.modified_at > cutoff
+        }
+
+        # Every path a story could use for these groups: the listed keys and full image sets
+        candidate_paths = {path_for_key(stored.key) for stored in orphans}
+        for group in groups:
+            digest = group.rpartition("/")[2]
+            if len(digest) == SHA256_HEX_LENGTH:
+                candidate_paths.update(path_for_key(key) for key in image_set_keys(digest))
+        candidate_paths = list(candidate_paths)
+        async with engine.connect() as conn:
+            kept |= groups & await self._legacy_content_groups(conn)
+            for image_column in (OrmStory.image, OrmStoryPage.image):
+                for start in range(0, len(candidate_paths), self.batch_size):
+                    result = await conn.execute(
+                        select(image_column).where(image_column.in_(candidate_paths[start:start + self.batch_size]))
+                    )
+                    kept |= _groups_for_paths(result.scalars())
+
+        return [stored for stored in orphans if asset_group(stored.key) not in kept]
+
+    async def _delete(self, orphans: List[StoredObject], report: UploadGCReport) -> None:
+        # Full WebPs first: while one exists, store_image treats its whole set as present
+        marker_suffix = f"_{FULL_VARIANT}{WEBP_EXTENSION}"
+        markers = [stored.key for stored in orphans if stored.key.endswith(marker_suffix)]
+        others = [stored.key for stored in orphans if not stored.key.endswith(marker_suffix)]
+        for keys in (markers, others):
+            results = await asyncio.gather(*(storage.delete(key) for key in keys), return_exceptions=True)
+            for key, result in zip(keys, results):
+                if isinstance(result, Exception):
+                    report.errors += 1
+                    logger.warning(f"Upload GC could not delete {key}: {result}")
+                else:
+                    report.deleted += 1
+                    upload_cache.discard(key)
+
+    async def collect(self, dry_run: Optional[bool] = None) -> UploadGCReport:
+        """Run one full pass over storage; returns what was found (and deleted)."""
+        if self._lock is None:
+            # collect() without start(), e.g. from scripts/gc_uploads.py
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            report = UploadGCReport(
+                dry_run=self.dry_run if dry_run is None else dry_run,
+                started_at=time.time()
+            )
+            referenced = await self.referenced_groups()
+            cutoff = report.started_at - self.grace_seconds
+
+            start_after = None
+            while True:
+                batch = await storage.list_keys(SCANNED_PREFIX, start_after, self.batch_size)
+                if not batch:
+                    break
+                report.batches += 1
+                start_after = batch[-1].key
+                orphans = []
+                for stored in batch:
+                    report.scanned += 1
+                    if asset_group(stored.key) in referenced:
+                        report.referenced += 1
+                    elif stored.modified_at > cutoff:
+                        report.within_grace += 1
+                    else:
+                        orphans.append(stored)
+                report.orphaned += len(orphans)
+                report.orphaned_bytes += sum(stored.size for stored in orphans)
+                report.sample.extend(stored.key for stored in orphans[:REPORT_SAMPLE_SIZE - len(report.sample)])
+                if orphans and not report.dry_run:
+                    confirmed = await self._still_orphaned(orphans, cutoff)
+                    report.kept_on_recheck += len(orphans) - len(confirmed)
+                    await self._delete(confirmed, report)
+                if len(batch) < self.batch_size:
+                    break
+                await asyncio.sleep(self.batch_pause_seconds)  # Leave room for request traffic
+
+            report.duration_seconds = round(time.time() - report.started_at, 3)
+            self.runs += 1
+            self.last_report = report
+            logger.info(
+                f"Upload GC{' (dry run)' if report.dry_run else ''}: scanned {report.scanned}, "
+                f"orphaned {report.orphaned} ({report.orphaned_bytes} bytes), deleted {report.deleted}, "
+                f"errors {report.errors} in {report.duration_seconds}s"
+            )
+            return report
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.collect()
+            except Exception as e:
+                logger.error(f"Upload GC run failed: {e}")
+
+    def start(self) -> None:
+        # Created here so the lock belongs to the loop the app runs on
+        self._lock = asyncio.Lock()
+        if self._task is None and self.interval_seconds > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "running": self._lock is not None and self._lock.locked(),
+            "last_report": asdict(self.last_report) if self.last_report else None,
+        }
+
+
+upload_gc = UploadGarbageCollector(
+    interval_seconds=Config.UPLOADS_GC_INTERVAL_SECONDS,
+    grace_seconds=Config.UPLOADS_GC_GRACE_SECONDS,
+    batch_size=Config.UPLOADS_GC_BATCH_SIZE,
+    batch_pause_seconds=Config.UPLOADS_GC_BATCH_PAUSE_SECONDS,
+    dry_run=Config.UPLOADS_GC_DRY_RUN,
+)
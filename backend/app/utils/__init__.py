@@ -1,6 +1,29 @@
-from app.utils.file_utils import is_valid_image, save_upload_file
+from app.utils.file_utils import (
+    StoredFile,
+    image_fallback_keys,
+    image_variant_urls,
+    is_valid_image,
+    read_upload_limited,
+    save_upload_file,
+    sniff_image_extension,
+    store_image,
+)
+from app.utils.image_processing import InvalidImageError, shutdown_image_pool
+from app.utils.storage import InvalidStorageKeyError, RangeNotSatisfiableError, StorageBackend, storage
 
 __all__ = [
+    "InvalidImageError",
+    "InvalidStorageKeyError",
+    "RangeNotSatisfiableError",
+    "StorageBackend",
+    "StoredFile",
+    "image_fallback_keys",
+    "image_variant_urls",
     "is_valid_image",
+    "read_upload_limited",
     "save_upload_file",
+    "sniff_image_extension",
+    "shutdown_image_pool",
+    "storage",
+    "store_image",
 ]
@@ -1,17 +1,125 @@
 from fastapi import UploadFile, HTTPException
+from dataclasses import dataclass
 from pathlib import Path
-import uuid
-import aiofiles
+from typing import Dict, List, Optional, Union
+import asyncio
+import hashlib
 from config import Config 
+from app.utils.storage import storage, sharded_key, path_for_key
+from app.utils.image_processing import (
+    FULL_VARIANT,
+    WEBP_EXTENSION,
+    InvalidImageError,
+    process_image_async,
+)
 
-# Create an uploads directory path
-UPLOADS_DIR = Path(__file__).parent.parent.parent / "uploads" / "images"
-UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+@dataclass(frozen=True)
+class StoredFile:
+    """Result of writing a file to the storage backend."""
+    path: str  # Relative URL path stored in the database
+    size: int
+    sha256: str  # Content hash the storage key is derived from
+
+async def store_image(data: Union[bytes, bytearray, memoryview]) -> StoredFile:
+    """
+    Re-encode an image and store it with its variants.
+
+    Keys derive from the hash of the source bytes, so an image uploaded or
+    generated again is neither re-processed nor stored twice. The returned
+    StoredFile describes the full-size WebP; the narrower WebP variants and
+    the JPEG/PNG fallback sit next to it (see image_variant_urls).
+    Raises InvalidImageError if the data is not a decodable image.
+    """
+    sha256 = hashlib.sha256(data).hexdigest()
+    full_key = sharded_key(sha256, f"_{FULL_VARIANT}{WEBP_EXTENSION}")
+    existing_size = await storage.size(full_key)
+    if existing_size is not None:
+        # Restart the GC grace period: the caller is about to reference this set again
+        await asyncio.gather(*(storage.touch(key) for key in image_set_keys(sha256)))
+        return StoredFile(path=path_for_key(full_key), size=existing_size, sha256=sha256)
+
+    # bytes and bytearray pickle into the worker as they are; only a memoryview needs a copy
+    payload = data.tobytes() if isinstance(data, memoryview) else data
+    variants = await process_image_async(
+        payload, Config.IMAGE_MAX_DIMENSION, Config.IMAGE_VARIANT_WIDTHS, Config.IMAGE_QUALITY
+    )
+    # The full WebP is written last: its presence means the whole set is stored
+    full_variant = variants[0]
+    await asyncio.gather(*(
+        storage.put(sharded_key(sha256, f"_{name}{extension}"), encoded)
+        for name, extension, encoded in variants[1:]
+    ))
+    await storage.put(full_key, full_variant[2])
+    return StoredFile(path=path_for_key(full_key), size=len(full_variant[2]), sha256=sha256)
+
+def image_variant_urls(image_path: Optional[str]) -> Optional[Dict[str, str]]:
+    """Variant URLs for an image stored by store_image; None for other images."""
+    full_suffix = f"_{FULL_VARIANT}{WEBP_EXTENSION}"
+    if not image_path or not image_path.endswith(full_suffix):
+        return None
+    base = image_path[:-len(full_suffix)]
+    variant_urls = {FULL_VARIANT: image_path}
+    for name in Config.IMAGE_VARIANT_WIDTHS:
+        variant_urls[name] = f"{base}_{name}{WEBP_EXTENSION}"
+    return variant_urls
+
+# Formats process_image writes next to the full WebP for clients without WebP support
+FALLBACK_EXTENSIONS = (".jpg", ".png")
+
+def image_set_keys(sha256: str) -> List[str]:
+    """Every key store_image may write for a source hash (only one fallback format exists)."""
+    keys = [sharded_key(sha256, f"_{name}{WEBP_EXTENSION}") for name in (FULL_VARIANT, *Config.IMAGE_VARIANT_WIDTHS)]
+    keys.extend(sharded_key(sha256, f"_{FULL_VARIANT}{extension}") for extension in FALLBACK_EXTENSIONS)
+    return keys
+
+def image_fallback_keys(key: str) -> List[str]:
+    """Candidate JPEG/PNG keys for a WebP variant key written by store_image; [] for other keys."""
+    base, separator, variant = key.rpartition("_")
+    variant_names = {f"{name}{WEBP_EXTENSION}" for name in (FULL_VARIANT, *Config.IMAGE_VARIANT_WIDTHS)}
+    if not separator or variant not in variant_names:
+        return []
+    return [f"{base}_{FULL_VARIANT}{extension}" for extension in FALLBACK_EXTENSIONS]
 
 def is_valid_image(filename: str) -> bool:
     """Check if the file has a valid image extension."""
     return Path(filename).suffix.lower() in Config.ALLOWED_IMAGE_EXTENSIONS # Use Config
 
+# Leading bytes of each accepted image format, keyed by extension
+IMAGE_SIGNATURES = {
+    ".png": (b"\x89PNG\r\n\x1a\n",),
+    ".jpg": (b"\xff\xd8\xff",),
+    ".jpeg": (b"\xff\xd8\xff",),
+    ".gif": (b"GIF87a", b"GIF89a"),
+}
+
+def sniff_image_extension(header: bytes) -> Optional[str]:
+    """Return the allowed extension whose magic bytes start header, if any."""
+    for extension in Config.ALLOWED_IMAGE_EXTENSIONS:
+        if header.startswith(IMAGE_SIGNATURES.get(extension, ())):
+            return extension
+    return None
+
+async def read_upload_limited(upload_file: UploadFile, max_bytes: int, chunk_size: int = 64 * 1024) -> bytearray:
+    """
+    Read an upload into memory, rejecting it as early as possible.
+
+    The magic bytes of the first chunk decide whether it is an image at all
+    (415), and reading stops as soon as max_bytes is exceeded (413), so memory
+    use is bounded by the cap whatever the client sends.
+    """
+    if upload_file.size is not None and upload_file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File is too large. Maximum size is {max_bytes} bytes")
+
+    data = bytearray(await upload_file.read(chunk_size))
+    if sniff_image_extension(bytes(data[:16])) is None:
+        raise HTTPException(status_code=415, detail="File content is not a supported image")
+
+    while chunk := await upload_file.read(chunk_size):
+        if len(data) + len(chunk) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"File is too large. Maximum size is {max_bytes} bytes")
+        data += chunk
+    return data
+
 async def save_upload_file(upload_file: UploadFile) -> str:
     """
     Save an uploaded file with validation and return the file path.
@@ -23,7 +131,8 @@ async def save_upload_file(upload_file: UploadFile) -> str:
         str: Relative file path to be stored in the database
         
     Raises:
-        HTTPException: If file type is invalid
+        HTTPException: 400 for a wrong extension or undecodable image, 415 when
+            the content is not an image, 413 above Config.MAX_UPLOAD_BYTES
     """
     if not is_valid_image(upload_file.filename):
         raise HTTPException(
@@ -31,16 +140,10 @@ async def save_upload_file(upload_file: UploadFile) -> str:
             detail=f"Invalid file type. Allowed types: {', '.join(Config.ALLOWED_IMAGE_EXTENSIONS)}" 
         )
     
-    # Generate a unique filename to prevent collisions
-    file_extension = Path(upload_file.filename).suffix
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = UPLOADS_DIR / unique_filename
-    
-    # Save the file using aiofiles for async I/O
-    async with aiofiles.open(file_path, 'wb') as out_file:
-        # Read the file in chunks to handle large files efficiently
-        while content := await upload_file.read(1024 * 1024):  # 1MB chunks
-            await out_file.write(content)
-    
+    try:
+        stored_file = await store_image(await read_upload_limited(upload_file, Config.MAX_UPLOAD_BYTES))
+    except InvalidImageError:
+        raise HTTPException(status_code=400, detail="Invalid image file")
+
     # Return the relative path to be stored in the database
-    return f"/uploads/images/{unique_filename}"
+    return stored_file.path
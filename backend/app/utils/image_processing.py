@@ -0,0 +1,111 @@
+import asyncio
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+from PIL import Image, ImageOps
+
+from config import Config
+
+# Name of the largest variant; the stored image path always points at it
+FULL_VARIANT = "full"
+WEBP_EXTENSION = ".webp"
+
+# (variant name, file extension, encoded bytes)
+EncodedVariant = Tuple[str, str, bytes]
+
+
+class InvalidImageError(ValueError):
+    """The data could not be decoded as an image."""
+
+
+def _encode(image: Image.Image, image_format: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    # Nothing from the source (EXIF, ICC, text chunks) is passed on to the encoder
+    if image_format == "WEBP":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    elif image_format == "JPEG":
+        image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def process_image(
+    data: Union[bytes, bytearray],
+    max_dimension: int,
+    variant_widths: Dict[str, int],
+    quality: int
+) -> List[EncodedVariant]:
+    """
+    Decode, normalize and re-encode an image. Runs in a worker process.
+
+    Returns a full-size WebP capped at max_dimension, one narrower WebP per
+    entry in variant_widths (never upscaled) and a JPEG/PNG fallback of the
+    full size for clients without WebP support.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            source.load()  # A full decode is the real validation
+            image = ImageOps.exif_transpose(source)
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        raise InvalidImageError(str(e)) from e
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    variants = [(FULL_VARIANT, WEBP_EXTENSION, _encode(image, "WEBP", quality))]
+    for name, width in variant_widths.items():
+        resized = image
+        if image.width > width:
+            resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        variants.append((name, WEBP_EXTENSION, _encode(resized, "WEBP", quality)))
+
+    if has_alpha:
+        variants.append((FULL_VARIANT, ".png", _encode(image, "PNG", quality)))
+    else:
+        variants.append((FULL_VARIANT, ".jpg", _encode(image, "JPEG", quality)))
+    return variants
+
+
+# Pillow work is CPU-bound and holds the GIL, so it runs in separate processes
+_image_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_image_pool() -> ProcessPoolExecutor:
+    global _image_pool
+    if _image_pool is None:
+        # spawn: forking a process that already runs threads is unsafe
+        _image_pool = ProcessPoolExecutor(
+            max_workers=Config.IMAGE_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _image_pool
+
+
+def start_image_pool() -> None:
+    """Spawn the worker processes in the background so the first image does not pay for it."""
+    pool = _get_image_pool()
+    for _ in range(Config.IMAGE_PROCESS_WORKERS):
+        pool.submit(int)
+
+
+async def process_image_async(
+    data: Union[bytes, bytearray],
+    max_dimension: int,
+    variant_widths: Dict[str, int],
+    quality: int
+) -> List[EncodedVariant]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_image_pool(), process_image, data, max_dimension, variant_widths, quality
+    )
+
+
+def shutdown_image_pool() -> None:
+    global _image_pool
+    if _image_pool is not None:
+        _image_pool.shutdown(wait=False, cancel_futures=True)
+        _image_pool = None
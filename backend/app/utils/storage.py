@@ -0,0 +1,404 @@
+import asyncio
+import mimetypes
+import os
+import stat
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
+
+from config import Config
+
+# Stored paths are "/uploads/<key>"; the key is what the backend stores
+UPLOADS_URL_PREFIX = "/uploads/"
+
+# A key is written once and never rewritten, so whatever was fetched under it stays valid
+IMMUTABLE_CACHE_CONTROL = f"public, max-age={Config.UPLOADS_CACHE_MAX_AGE_SECONDS}, immutable"
+
+
+# Suffix of the temporary files LocalStorageBackend writes before renaming them into place
+TEMP_SUFFIX = ".tmp"
+
+# Proxied S3 objects are streamed to the client in chunks of this size
+S3_STREAM_CHUNK_BYTES = 64 * 1024
+
+
+class InvalidStorageKeyError(ValueError):
+    """The key does not name a location inside the storage backend."""
+
+
+class RangeNotSatisfiableError(ValueError):
+    """The requested byte range lies outside the stored object."""
+
+
+def path_for_key(key: str) -> str:
+    return f"{UPLOADS_URL_PREFIX}{key}"
+
+
+def key_for_path(path: str) -> Optional[str]:
+    """The storage key of a stored "/uploads/..." path, or None for other values."""
+    if not path or not path.startswith(UPLOADS_URL_PREFIX):
+        return None
+    return path[len(UPLOADS_URL_PREFIX):]
+
+
+def sharded_key(digest: str, suffix: str, namespace: str = "images") -> str:
+    """images/ab/cd/abcd...<suffix>: two hash-prefix levels keep directories small."""
+    return f"{namespace}/{digest[:2]}/{digest[2:4]}/{digest}{suffix}"
+
+
+def content_type_for_key(key: str) -> str:
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    """One entry of a storage listing."""
+    key: str
+    size: int
+    modified_at: float  # Unix timestamp of the last write or touch()
+
+
+class StorageBackend:
+    """
+    Where uploaded and generated files live.
+
+    Keys are relative, slash-separated paths (e.g. images/ab/cd/<hash>.webp).
+    Content-addressed keys make put() idempotent, so callers can skip work
+    when size() shows the key is already stored.
+    """
+
+    name = "base"
+
+    async def put(self, key: str, data: Union[bytes, memoryview]) -> None:
+        raise NotImplementedError
+
+    async def size(self, key: str) -> Optional[int]:
+        """Size in bytes, or None if the key is not stored."""
+        raise NotImplementedError
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        """Size and modification time of a stored key, or None if it is not stored."""
+        raise NotImplementedError
+
+    async def read(self, key: str, max_bytes: int) -> Optional[bytes]:
+        """
+        The whole file if it is at most max_bytes, None if it is larger or
+        should be served through response() instead. Raises
+        FileNotFoundError if the key is missing.
+        """
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def touch(self, key: str) -> None:
+        """Refresh the modification time of a stored key; missing keys are ignored."""
+        raise NotImplementedError
+
+    async def list_keys(self, prefix: str, start_after: Optional[str], limit: int) -> List[StoredObject]:
+        """
+        Up to limit stored objects under prefix, in key order, starting after
+        start_after. Repeated calls page through the whole prefix.
+        """
+        raise NotImplementedError
+
+    async def response(
+        self,
+        key: str,
+        headers: Optional[Dict[str, str]] = None,
+        range_header: Optional[str] = None
+    ) -> Response:
+        """
+        HTTP response serving the key with the given extra headers; honours a
+        Range request header. Raises FileNotFoundError if the key is missing
+        and RangeNotSatisfiableError for a range the backend cannot serve.
+        """
+        raise NotImplementedError
+
+
+class LocalStorageBackend(StorageBackend):
+    """Files under a local directory, written atomically (temp file + rename)."""
+
+    name = "local"
+
+    def __init__(self, root: Path):
+        self.root = Path(root).resolve()
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        # Keys come from URLs; never leave the storage root
+        if self.root not in path.parents:
+            raise InvalidStorageKeyError(f"Key outside the storage root: {key}")
+        return path
+
+    def _write(self, path: Path, data: Union[bytes, memoryview]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}{TEMP_SUFFIX}")
+        try:
+            with open(temp_path, 'wb') as out_file:
+                out_file.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+    async def put(self, key: str, data: Union[bytes, memoryview]) -> None:
+        await asyncio.to_thread(self._write, self._path(key), data)
+
+    async def size(self, key: str) -> Optional[int]:
+        try:
+            return (await asyncio.to_thread(os.stat, self._path(key))).st_size
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        try:
+            stat_result = await asyncio.to_thread(os.stat, self._path(key))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return StoredObject(key=key, size=stat_result.st_size, modified_at=stat_result.st_mtime)
+
+    def _read_small(self, path: Path, max_bytes: int) -> Optional[bytes]:
+        # One worker-thread hop for open, size check and read
+        try:
+            with open(path, 'rb') as in_file:
+                file_stat = os.fstat(in_file.fileno())
+                if not stat.S_ISREG(file_stat.st_mode):
+                    raise FileNotFoundError(path)
+                if file_stat.st_size > max_bytes:
+                    return None
+                return in_file.read()
+        except (NotADirectoryError, IsADirectoryError):
+            raise FileNotFoundError(path)
+
+    async def read(self, key: str, max_bytes: int) -> Optional[bytes]:
+        return await asyncio.to_thread(self._read_small, self._path(key), max_bytes)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._path(key).unlink, True)
+
+    def _touch(self, path: Path) -> None:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    async def touch(self, key: str) -> None:
+        await asyncio.to_thread(self._touch, self._path(key))
+
+    def _walk(self, directory: Path, relative: str, start_after: Optional[str]) -> Iterator[StoredObject]:
+        try:
+            entries = list(os.scandir(directory))
+        except (FileNotFoundError, NotADirectoryError):
+            return
+        # Directories sort as "name/" so the walk yields keys in plain string order
+        named = sorted((entry.name + ("/" if entry.is_dir(follow_symlinks=False) else ""), entry) for entry in entries)
+        for name, entry in named:
+            key = relative + name
+            if name.endswith("/"):
+                # Skip subtrees whose keys all sort before start_after
+                if start_after and key < start_after and not start_after.startswith(key):
+                    continue
+                yield from self._walk(Path(entry.path), key, start_after)
+            elif entry.is_file(follow_symlinks=False) and (not start_after or key > start_after):
+                entry_stat = entry.stat(follow_symlinks=False)
+                yield StoredObject(key=key, size=entry_stat.st_size, modified_at=entry_stat.st_mtime)
+
+    def _list_batch(self, prefix: str, start_after: Optional[str], limit: int) -> List[StoredObject]:
+        directory = self._path(prefix) if prefix.strip("/") else self.root
+        relative = prefix.rstrip("/") + "/" if prefix.strip("/") else ""
+        batch = []
+        for stored in self._walk(directory, relative, start_after):
+            batch.append(stored)
+            if len(batch) >= limit:
+                break
+        return batch
+
+    async def list_keys(self, prefix: str, start_after: Optional[str], limit: int) -> List[StoredObject]:
+        return await asyncio.to_thread(self._list_batch, prefix, start_after, limit)
+
+    async def response(
+        self,
+        key: str,
+        headers: Optional[Dict[str, str]] = None,
+        range_header: Optional[str] = None
+    ) -> Response:
+        path = self._path(key)
+        try:
+            stat_result = await asyncio.to_thread(os.stat, path)
+        except (FileNotFoundError, NotADirectoryError):
+            stat_result = None
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            raise FileNotFoundError(path)
+        # FileResponse parses Range itself and uses the server's pathsend (sendfile) extension when offered
+        return FileResponse(path, headers=headers, media_type=content_type_for_key(key), stat_result=stat_result)
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    Objects in an S3-compatible bucket (AWS S3, MinIO, a local moto server).
+
+    boto3 is only needed when this backend is selected. Files are served by
+    redirecting to S3_PUBLIC_BASE_URL when set, otherwise streamed through
+    the app without holding the whole object in memory.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str],
+        region: Optional[str],
+        public_base_url: Optional[str]
+    ):
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+        self.bucket = bucket
+        self.public_base_url = public_base_url.rstrip("/") if public_base_url else None
+        # Credentials come from the standard AWS environment variables/config
+        self._client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self._client_error = ClientError
+
+    def _is_missing(self, error) -> bool:
+        return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    async def put(self, key: str, data: Union[bytes, memoryview]) -> None:
+        await asyncio.to_thread(
+            self._client.put_object,
+            Bucket=self.bucket, Key=key, Body=bytes(data), ContentType=content_type_for_key(key),
+            CacheControl=IMMUTABLE_CACHE_CONTROL
+        )
+
+    async def size(self, key: str) -> Optional[int]:
+        try:
+            head = await asyncio.to_thread(self._client.head_object, Bucket=self.bucket, Key=key)
+        except self._client_error as e:
+            if self._is_missing(e):
+                return None
+            raise
+        return head["ContentLength"]
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        try:
+            head = await asyncio.to_thread(self._client.head_object, Bucket=self.bucket, Key=key)
+        except self._client_error as e:
+            if self._is_missing(e):
+                return None
+            raise
+        return StoredObject(key=key, size=head["ContentLength"], modified_at=head["LastModified"].timestamp())
+
+    def _read_small(self, key: str, max_bytes: int) -> Optional[bytes]:
+        try:
+            obj = self._client.get_object(Bucket=self.bucket, Key=key)
+        except self._client_error as e:
+            if self._is_missing(e):
+                raise FileNotFoundError(key)
+            raise
+        if obj["ContentLength"] > max_bytes:
+            obj["Body"].close()
+            return None
+        return obj["Body"].read()
+
+    async def read(self, key: str, max_bytes: int) -> Optional[bytes]:
+        if self.public_base_url:
+            return None  # response() redirects clients to the bucket
+        return await asyncio.to_thread(self._read_small, key, max_bytes)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._client.delete_object, Bucket=self.bucket, Key=key)
+
+    def _touch(self, key: str) -> None:
+        try:
+            # An in-place copy is the only way to move LastModified forward
+            self._client.copy_object(
+                Bucket=self.bucket, Key=key, CopySource={"Bucket": self.bucket, "Key": key},
+                MetadataDirective="REPLACE", ContentType=content_type_for_key(key),
+                CacheControl=IMMUTABLE_CACHE_CONTROL
+            )
+        except self._client_error as e:
+            if not self._is_missing(e):
+                raise
+
+    async def touch(self, key: str) -> None:
+        await asyncio.to_thread(self._touch, key)
+
+    def _list_batch(self, prefix: str, start_after: Optional[str], limit: int) -> List[StoredObject]:
+        request = {"Bucket": self.bucket, "Prefix": prefix, "MaxKeys": limit}
+        if start_after:
+            request["StartAfter"] = start_after
+        listing = self._client.list_objects_v2(**request)
+        return [
+            StoredObject(key=obj["Key"], size=obj["Size"], modified_at=obj["LastModified"].timestamp())
+            for obj in listing.get("Contents", [])
+        ]
+
+    async def list_keys(self, prefix: str, start_after: Optional[str], limit: int) -> List[StoredObject]:
+        return await asyncio.to_thread(self._list_batch, prefix, start_after, limit)
+
+    async def response(
+        self,
+        key: str,
+        headers: Optional[Dict[str, str]] = None,
+        range_header: Optional[str] = None
+    ) -> Response:
+        if self.public_base_url:
+            return RedirectResponse(f"{self.public_base_url}/{key}", headers=headers)
+        request = {"Bucket": self.bucket, "Key": key}
+        if range_header:
+            request["Range"] = range_header
+        try:
+            obj = await asyncio.to_thread(self._client.get_object, **request)
+        except self._client_error as e:
+            if self._is_missing(e):
+                raise FileNotFoundError(key)
+            if e.response.get("Error", {}).get("Code") == "InvalidRange":
+                raise RangeNotSatisfiableError(range_header)
+            raise
+        response_headers = {
+            **(headers or {}),
+            "Accept-Ranges": "bytes",
+            "Content-Length": str(obj["ContentLength"])
+        }
+        status_code = 200
+        if obj.get("ContentRange"):
+            status_code = 206
+            response_headers["Content-Range"] = obj["ContentRange"]
+        return StreamingResponse(
+            iterate_in_threadpool(_iter_body(obj["Body"])),
+            status_code=status_code,
+            headers=response_headers,
+            media_type=obj.get("ContentType") or content_type_for_key(key)
+        )
+
+
+def _iter_body(body) -> Iterator[bytes]:
+    """Chunks of a boto3 StreamingBody; the connection is released however the iteration ends."""
+    try:
+        yield from body.iter_chunks(S3_STREAM_CHUNK_BYTES)
+    finally:
+        body.close()
+
+
+def create_storage_backend(name: str) -> StorageBackend:
+    """Build the backend selected by STORAGE_BACKEND."""
+    if name == LocalStorageBackend.name:
+        return LocalStorageBackend(Config.STORAGE_LOCAL_ROOT)
+    if name == S3StorageBackend.name:
+        return S3StorageBackend(
+            bucket=Config.S3_BUCKET,
+            endpoint_url=Config.S3_ENDPOINT_URL,
+            region=Config.S3_REGION,
+            public_base_url=Config.S3_PUBLIC_BASE_URL
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {name}")
+
+
+storage = create_storage_backend(Config.STORAGE_BACKEND)
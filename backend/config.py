@@ -15,14 +15,121 @@ class Config:
         f"sqlite+aiosqlite:///{BASE_DIR / 'app.db'}"
     )
 
+    # SQLite performance profile (applied on every new connection)
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -64000))  # negative = KiB
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    SQLITE_TEMP_STORE = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+
     # JWT settings
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", 
                               "".join(secrets.choice(string.ascii_letters + string.digits) for _ in range(32)))
     JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
+    # password hashing
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+
+    # authenticated principal cache (0 disables it)
+    PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", 10000))
+    PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 300))
+
+    # exact feed totals are re-seeded from the database this often, so writes made
+    # by other worker processes (or the AI job runner) show up within this window
+    STORY_TOTALS_RESEED_SECONDS = int(os.getenv("STORY_TOTALS_RESEED_SECONDS", 60))
+
+    # cached COUNT(*) for ad-hoc /filter queries
+    STORY_FILTER_COUNT_TTL_SECONDS = int(os.getenv("STORY_FILTER_COUNT_TTL_SECONDS", 30))
+    STORY_FILTER_COUNT_MAX_ENTRIES = int(os.getenv("STORY_FILTER_COUNT_MAX_ENTRIES", 1000))
+
+    # response cache for the public feeds (/featured, /new, /popular)
+    FEED_CACHE_TTL_SECONDS = int(os.getenv("FEED_CACHE_TTL_SECONDS", 60))
+    FEED_CACHE_MAX_ENTRIES = int(os.getenv("FEED_CACHE_MAX_ENTRIES", 512))
+    FEED_CACHE_MAX_BYTES = int(os.getenv("FEED_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+
+    # most pages returned by one /api/stories/{id}/pages request
+    STORY_PAGE_RANGE_LIMIT = int(os.getenv("STORY_PAGE_RANGE_LIMIT", 20))
+
+    # how often buffered story read counts are written back
+    READ_COUNT_FLUSH_INTERVAL_SECONDS = float(os.getenv("READ_COUNT_FLUSH_INTERVAL_SECONDS", 5))
+
     # image file extensions
     ALLOWED_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif'}
 
+    # file storage: "local" (sharded directory) or "s3" (any S3-compatible endpoint, needs boto3)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+    STORAGE_LOCAL_ROOT = Path(os.getenv("STORAGE_LOCAL_ROOT", BASE_DIR / "uploads"))
+    S3_BUCKET = os.getenv("S3_BUCKET")
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+    S3_REGION = os.getenv("S3_REGION")
+    S3_PUBLIC_BASE_URL = os.getenv("S3_PUBLIC_BASE_URL")
+
+    # /uploads serving: stored keys never change content, so clients may cache them for good;
+    # .webp URLs fall back to the JPEG/PNG copy for clients that do not accept WebP
+    UPLOADS_CACHE_MAX_AGE_SECONDS = int(os.getenv("UPLOADS_CACHE_MAX_AGE_SECONDS", 365 * 24 * 3600))
+    UPLOADS_WEBP_NEGOTIATION = os.getenv("UPLOADS_WEBP_NEGOTIATION", "true").lower() == "true"
+    # files up to this size are read in one go and kept in a memory LRU; larger ones and ranges are streamed
+    UPLOADS_INLINE_MAX_BYTES = int(os.getenv("UPLOADS_INLINE_MAX_BYTES", 1024 * 1024))
+    UPLOADS_MEMORY_CACHE_BYTES = int(os.getenv("UPLOADS_MEMORY_CACHE_BYTES", 64 * 1024 * 1024))
+
+    # garbage collection of stored files no story references (interval 0 disables the background job);
+    # the grace period must outlast the time between an upload and saving its story
+    UPLOADS_GC_INTERVAL_SECONDS = float(os.getenv("UPLOADS_GC_INTERVAL_SECONDS", 6 * 3600))
+    UPLOADS_GC_GRACE_SECONDS = float(os.getenv("UPLOADS_GC_GRACE_SECONDS", 24 * 3600))
+    UPLOADS_GC_BATCH_SIZE = int(os.getenv("UPLOADS_GC_BATCH_SIZE", 500))
+    UPLOADS_GC_BATCH_PAUSE_SECONDS = float(os.getenv("UPLOADS_GC_BATCH_PAUSE_SECONDS", 0.05))
+    UPLOADS_GC_DRY_RUN = os.getenv("UPLOADS_GC_DRY_RUN", "false").lower() == "true"
+
+    # upload limits: per image file, and per request body (form fields included)
+    MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+    MAX_REQUEST_BODY_BYTES = int(os.getenv("MAX_REQUEST_BODY_BYTES", MAX_UPLOAD_BYTES + 1024 * 1024))
+
+    # image processing: every stored image is re-encoded to WebP in these widths
+    IMAGE_PROCESS_WORKERS = int(os.getenv("IMAGE_PROCESS_WORKERS", 2))
+    IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", 2048))
+    IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", 80))
+    IMAGE_VARIANT_WIDTHS = {"thumb": 320, "medium": 768}
+
     # Google API Key for Gemini
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+
+    # AI provider: "google" or the offline "stub" used for local load tests
+    AI_PROVIDER = os.getenv("AI_PROVIDER", "google").lower()
+    AI_STUB_TEXT_LATENCY_SECONDS = float(os.getenv("AI_STUB_TEXT_LATENCY_SECONDS", 1.0))
+    AI_STUB_IMAGE_LATENCY_SECONDS = float(os.getenv("AI_STUB_IMAGE_LATENCY_SECONDS", 2.0))
+    AI_STUB_FAILURE_RATE = float(os.getenv("AI_STUB_FAILURE_RATE", 0))
+    AI_STUB_PAGE_COUNT = int(os.getenv("AI_STUB_PAGE_COUNT", 4))
+    AI_STUB_SEED = int(os.getenv("AI_STUB_SEED", 0))
+
+    # open AI client connections at startup instead of on the first request
+    AI_WARMUP_ON_STARTUP = os.getenv("AI_WARMUP_ON_STARTUP", "false").lower() == "true"
+
+    # content-addressed cache of AI text output and generated image paths
+    AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "true").lower() == "true"
+    AI_CACHE_DIR = Path(os.getenv("AI_CACHE_DIR", BASE_DIR / "ai_cache"))
+    AI_CACHE_MAX_BYTES = int(os.getenv("AI_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+    AI_CACHE_MAX_AGE_SECONDS = int(os.getenv("AI_CACHE_MAX_AGE_SECONDS", 7 * 24 * 3600))
+
+    # background AI story generation jobs
+    AI_JOB_WORKERS = int(os.getenv("AI_JOB_WORKERS", 2))
+    AI_JOB_MAX_PENDING = int(os.getenv("AI_JOB_MAX_PENDING", 100))
+    # a running job whose heartbeat is older than this is treated as abandoned and re-queued
+    AI_JOB_LEASE_SECONDS = float(os.getenv("AI_JOB_LEASE_SECONDS", 60))
+    # SSE job streams re-read the job row and send a keep-alive comment this often
+    AI_JOB_EVENTS_POLL_SECONDS = float(os.getenv("AI_JOB_EVENTS_POLL_SECONDS", 5))
+
+    # AI image generation: concurrent requests per story / across the process, per-image timeout
+    AI_IMAGE_CONCURRENCY_PER_STORY = int(os.getenv("AI_IMAGE_CONCURRENCY_PER_STORY", 4))
+    AI_IMAGE_CONCURRENCY_GLOBAL = int(os.getenv("AI_IMAGE_CONCURRENCY_GLOBAL", 8))
+    AI_IMAGE_TIMEOUT_SECONDS = float(os.getenv("AI_IMAGE_TIMEOUT_SECONDS", 90))
+
+    # upstream AI calls: dedicated thread pool, image quota and retry backoff
+    AI_UPSTREAM_WORKERS = int(os.getenv("AI_UPSTREAM_WORKERS", 8))
+    AI_IMAGE_RATE_PER_MINUTE = float(os.getenv("AI_IMAGE_RATE_PER_MINUTE", 60))
+    AI_IMAGE_RATE_BURST = int(os.getenv("AI_IMAGE_RATE_BURST", 4))
+    AI_UPSTREAM_MAX_RETRIES = int(os.getenv("AI_UPSTREAM_MAX_RETRIES", 3))
+    AI_UPSTREAM_RETRY_BASE_SECONDS = float(os.getenv("AI_UPSTREAM_RETRY_BASE_SECONDS", 1.0))
+    AI_UPSTREAM_RETRY_MAX_SECONDS = float(os.getenv("AI_UPSTREAM_RETRY_MAX_SECONDS", 30.0))
@@ -1,12 +1,25 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.responses import RedirectResponse
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware # Import CORSMiddleware
-from app.routers import auth, stories
-from app.core.database import engine, metadata
+from app.routers import auth, stories, metrics, uploads
+from app.core.database import engine, read_engine, metadata
+from app.core.migrations import migrate_content_to_pages, run_migrations
+from app.core.body_limit import BodySizeLimitMiddleware
+from app.auth.utils import shutdown_hash_executor
+from app.utils.image_processing import start_image_pool, shutdown_image_pool
+from app.services.story_search import ensure_search_index
+from app.services.read_counter import read_count_buffer
+from app.services.upload_gc import upload_gc
+from app.services.ai_jobs import ai_job_manager
+from app.services.ai_providers import ai_provider
+from app.services.ai_upstream import ai_upstream
+from app.services.ai_story_generator import start_image_slots
+from config import Config
+import logging
 import os
-from pathlib import Path
+
+logger = logging.getLogger(__name__)
 
 # Define the lifespan context manager
 @asynccontextmanager
@@ -17,14 +30,38 @@ async def lifespan(app: FastAPI):
     try:
         async with engine.begin() as conn:
             await conn.run_sync(metadata.create_all)
+            await run_migrations(conn)
+        # Batched data migration, one transaction per batch; pages must exist before indexing
+        await migrate_content_to_pages(engine)
+        async with engine.begin() as conn:
+            await ensure_search_index(conn)
         print("Database tables created/verified.")
-    except Exception as e:
-        print(f"Error creating tables: {e}")
-        # Handle error appropriately
+    except Exception:
+        # Serving on a half-migrated schema would show stories without their pages
+        logger.exception("Database setup failed; aborting startup")
+        raise
+    read_count_buffer.start()
+    # Only reached once the content migration has finished, so legacy page images are never orphans
+    upload_gc.start()
+    start_image_pool()
+    start_image_slots()
+    ai_provider.start()
+    if Config.AI_WARMUP_ON_STARTUP:
+        await ai_provider.warm_up()
+    await ai_job_manager.start()
     yield
     # Code to run on shutdown
     print("Shutting down...")
+    await upload_gc.stop()
+    await ai_job_manager.stop()
+    await ai_provider.close()
+    ai_upstream.shutdown()
+    await read_count_buffer.stop()
+    shutdown_hash_executor()
+    shutdown_image_pool()
     await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
     print("Database connections closed.")
 
 # Pass the lifespan manager to the FastAPI app
@@ -35,6 +72,10 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Oversized uploads are cut off while streaming, before the multipart parser spools them.
+# Added before CORS so CORS wraps it and the early 413 still carries the CORS headers
+app.add_middleware(BodySizeLimitMiddleware, max_body_bytes=Config.MAX_REQUEST_BODY_BYTES)
+
 # CORS Middleware
 app.add_middleware(
     CORSMiddleware,
@@ -44,16 +85,11 @@ app.add_middleware(
     allow_headers=["*"], # Allows all headers
 )
 
-# Create the uploads directory if it doesn't exist
-uploads_dir = Path(__file__).parent / "uploads"
-if not uploads_dir.exists():
-    uploads_dir.mkdir(parents=True)
-
-# Mount the uploads directory to serve files statically
-app.mount("/uploads", StaticFiles(directory=str(uploads_dir)), name="uploads")
-
 app.include_router(auth.router)
 app.include_router(stories.router)
+app.include_router(metrics.router)
+# Uploaded and generated files, served from the configured storage backend
+app.include_router(uploads.router)
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,160 @@
+"""
+Per-request latency of the Google provider with fresh clients versus reused ones.
+
+Before client reuse every story request built a ChatGoogleGenerativeAI model,
+a JsonOutputParser, a PromptTemplate and a google-genai Client, and so opened
+new connections for its text call and its image calls. GoogleAIProvider now
+builds them once in start() and requests share the clients' connection pools.
+
+This runs the real GoogleAIProvider code end to end against a local stand-in
+for the Gemini REST API that answers with StubAIProvider output, so nothing
+leaves the machine. Each simulated story request is one text call plus one
+image call per page and the cover. "per request" builds, starts and closes a
+provider for every story; "reused" starts one provider up front. The report
+shows latency per story and the new TCP connections each story opened. The
+stand-in speaks plain HTTP, so a real endpoint adds a TLS handshake to every
+new connection on top of what is measured here.
+
+    cd backend
+    python -m scripts.benchmark_ai_clients --requests 100 --latency 0.005
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("JWT_SECRET_KEY", uuid.uuid4().hex)
+
+from app.services.ai_providers import GoogleAIProvider, StubAIProvider  # noqa: E402
+
+USER_PROMPT = "Ormanda kaybolan ve arkadaşlarından yardım isteyen küçük bir tavşan"
+CATEGORY = "Dostluk"
+
+
+class StubGeminiHandler(BaseHTTPRequestHandler):
+    """generateContent and models.get for the text and image models, from canned stub output."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so reused clients really reuse connections
+    # One write per response; split header/body writes stall on delayed ACKs
+    wbufsize = 1 << 16
+    disable_nagle_algorithm = True
+    story_json = ""
+    image = (b"", "")
+    latency = 0.0
+    connections = 0
+    connections_lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with StubGeminiHandler.connections_lock:
+            StubGeminiHandler.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._send_json({"name": self.path.rpartition("/")[2]})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.latency)
+        if GoogleAIProvider.image_model in self.path:
+            data, mime_type = self.image
+            part = {"inlineData": {"mimeType": mime_type, "data": base64.b64encode(data).decode("ascii")}}
+        else:
+            part = {"text": self.story_json}
+        self._send_json({
+            "candidates": [{"content": {"role": "model", "parts": [part]}, "finishReason": "STOP"}],
+            "usageMetadata": {"promptTokenCount": 1, "candidatesTokenCount": 1, "totalTokenCount": 2},
+        })
+
+
+async def story_request(provider):
+    """The provider calls one generated story makes."""
+    story = await provider.generate_story_text(USER_PROMPT, CATEGORY)
+    prompts = [story["image_prompt"]] + [page["image_prompt"] for page in story["content"]]
+    for prompt in prompts:
+        await provider.generate_image(prompt)
+
+
+async def per_request(base_url):
+    provider = GoogleAIProvider("benchmark-dummy-key", base_url=base_url)
+    provider.start()
+    try:
+        await story_request(provider)
+    finally:
+        await provider.close()
+
+
+async def run(label, requests, fn):
+    latencies, connections = [], []
+    for _ in range(requests):
+        opened_before = StubGeminiHandler.connections
+        started = time.perf_counter()
+        await fn()
+        latencies.append(time.perf_counter() - started)
+        connections.append(StubGeminiHandler.connections - opened_before)
+    ordered = sorted(latencies)
+    print(
+        f"{label:<12} mean {statistics.mean(latencies) * 1000:7.2f} ms  "
+        f"p50 {statistics.median(latencies) * 1000:7.2f} ms  "
+        f"p95 {ordered[max(0, int(len(ordered) * 0.95) - 1)] * 1000:7.2f} ms  "
+        f"new connections/story {statistics.mean(connections):.1f}"
+    )
+    return statistics.mean(latencies)
+
+
+async def main(args):
+    stub = StubAIProvider(
+        text_latency_seconds=0, image_latency_seconds=0, failure_rate=0, page_count=args.pages, seed=0
+    )
+    StubGeminiHandler.story_json = json.dumps(await stub.generate_story_text(USER_PROMPT, CATEGORY))
+    StubGeminiHandler.image = await stub.generate_image("")
+    StubGeminiHandler.latency = args.latency
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGeminiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    reused = GoogleAIProvider("benchmark-dummy-key", base_url=base_url)
+    reused.start()
+    # Warm imports and module state on both paths
+    await per_request(base_url)
+    await story_request(reused)
+
+    print(
+        f"{args.requests} stories, 1 text + {args.pages + 1} image calls each, "
+        f"{args.latency * 1000:.0f} ms stub latency per call"
+    )
+    fresh_ms = await run("per request", args.requests, lambda: per_request(base_url))
+    reused_ms = await run("reused", args.requests, lambda: story_request(reused))
+    print(f"saved per story: {(fresh_ms - reused_ms) * 1000:.2f} ms")
+
+    await reused.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds the stand-in waits per call")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,160 @@
+"""
+Load benchmark for /ai-generate using the offline stub AI provider.
+
+Starts the app in-process on a temporary SQLite database, submits concurrent
+generation jobs, polls each one until it finishes and reports end-to-end
+latency percentiles, throughput and event-loop lag of the server loop.
+
+    cd backend
+    python -m scripts.benchmark_ai_generate --requests 200 --concurrency 20
+
+Stub latency and failure rate are taken from the AI_STUB_* environment
+variables (see config.py).
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BENCH_DIR = Path(tempfile.mkdtemp(prefix="ai-bench-"))
+
+# Must be set before the app (and config.py) is imported
+os.environ["AI_PROVIDER"] = "stub"
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{BENCH_DIR / 'bench.db'}"
+os.environ["AI_CACHE_DIR"] = str(BENCH_DIR / "ai_cache")
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["STORAGE_LOCAL_ROOT"] = str(BENCH_DIR / "uploads")
+os.environ.setdefault("JWT_SECRET_KEY", uuid.uuid4().hex)
+sys.path.insert(0, str(BACKEND_DIR))
+
+import uvicorn  # noqa: E402
+
+TERMINAL_STATUSES = {"succeeded", "failed"}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def http_json(method, url, token=None, body=None, form=None):
+    headers = {}
+    data = None
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    if body is not None:
+        data = json.dumps(body).encode()
+        headers["Content-Type"] = "application/json"
+    elif form is not None:
+        data = urllib.parse.urlencode(form).encode()
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+    request = urllib.request.Request(url, data=data, headers=headers, method=method)
+    with urllib.request.urlopen(request, timeout=600) as response:
+        return json.loads(response.read())
+
+
+def run_job(base_url, token, prompt, poll_interval):
+    """Submit one job and block until it is terminal; returns (seconds, status)."""
+    started = time.perf_counter()
+    try:
+        job = http_json("POST", f"{base_url}/api/stories/ai-generate", token,
+                        body={"user_prompt": prompt, "category": "macera"})
+        while job["status"] not in TERMINAL_STATUSES:
+            time.sleep(poll_interval)
+            job = http_json("GET", f"{base_url}/api/stories/ai-jobs/{job['id']}", token)
+        status = job["status"]
+    except urllib.error.HTTPError as e:
+        status = f"http_{e.code}"
+    return time.perf_counter() - started, status
+
+
+async def sample_loop_lag(interval, samples, stop):
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - expected))
+
+
+async def main(args):
+    from main import app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(max_workers=args.concurrency + 1)
+    credentials = {"email": "bench@example.com", "username": "bench", "password": "bench-password"}
+    await loop.run_in_executor(pool, lambda: http_json("POST", f"{base_url}/auth/register", body=credentials))
+    token = (await loop.run_in_executor(pool, lambda: http_json(
+        "POST", f"{base_url}/auth/login",
+        form={"username": credentials["username"], "password": credentials["password"]}
+    )))["access_token"]
+
+    lag_samples = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(sample_loop_lag(args.lag_interval, lag_samples, stop))
+    limiter = asyncio.Semaphore(args.concurrency)
+
+    async def one(index):
+        # Distinct prompts unless asked otherwise, so the AI cache does not short-circuit the run
+        prompt = "bench" if args.same_prompt else f"bench {index}"
+        async with limiter:
+            return await loop.run_in_executor(pool, run_job, base_url, token, prompt, args.poll_interval)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await lag_task
+    server.should_exit = True
+    await server_task
+    pool.shutdown()
+
+    latencies = [seconds for seconds, status in results if status == "succeeded"]
+    statuses = {}
+    for _, status in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    print(f"requests     {args.requests} (concurrency {args.concurrency})")
+    print(f"statuses     {statuses}")
+    print(f"elapsed      {elapsed:.2f}s")
+    print(f"throughput   {len(latencies) / elapsed:.2f} stories/s")
+    print(f"latency p50  {percentile(latencies, 50):.3f}s")
+    print(f"latency p95  {percentile(latencies, 95):.3f}s")
+    print(f"latency p99  {percentile(latencies, 99):.3f}s")
+    if lag_samples:
+        print(f"loop lag     mean {statistics.mean(lag_samples) * 1000:.1f}ms, "
+              f"p99 {percentile(lag_samples, 99) * 1000:.1f}ms, max {max(lag_samples) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    parser.add_argument("--lag-interval", type=float, default=0.05)
+    parser.add_argument("--same-prompt", action="store_true", help="send one prompt for every request")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,65 @@
+"""
+Requests/s on /api/stories/new with and without the principal cache.
+
+Seeds a temporary SQLite database with one user and some stories, then runs
+the app in its own uvicorn process once per configuration and drives
+authenticated GETs over keep-alive connections. Without the cache every
+request decodes the JWT and looks the user up in the users table; with it a
+repeated token skips both. The feed response cache is measured on and off,
+since with it on the auth lookup is most of what a request costs.
+
+    cd backend
+    python -m scripts.benchmark_auth_cache --requests 5000 --concurrency 16
+"""
+import argparse
+import asyncio
+import os
+
+from scripts.benchmark_feed_pagination import BENCH_DIR, DB_PATH, create_schema, seed_stories  # noqa: E402 (sets up the env)
+from scripts.benchmark_image_serving import report, run_load, start_server  # noqa: E402
+
+from app.auth.jwt import create_access_token  # noqa: E402
+from app.core.database import engine, read_engine  # noqa: E402
+
+CONFIGURATIONS = [
+    ("feed cache on", "no principal cache", {"FEED_CACHE_MAX_ENTRIES": "512", "PRINCIPAL_CACHE_MAX_ENTRIES": "0"}),
+    ("feed cache on", "principal cache", {"FEED_CACHE_MAX_ENTRIES": "512", "PRINCIPAL_CACHE_MAX_ENTRIES": "10000"}),
+    ("feed cache off", "no principal cache", {"FEED_CACHE_MAX_ENTRIES": "0", "PRINCIPAL_CACHE_MAX_ENTRIES": "0"}),
+    ("feed cache off", "principal cache", {"FEED_CACHE_MAX_ENTRIES": "0", "PRINCIPAL_CACHE_MAX_ENTRIES": "10000"}),
+]
+
+
+async def main(args):
+    await create_schema()
+    seed_stories(DB_PATH, args.stories)
+    await engine.dispose()
+    await read_engine.dispose()
+
+    # The server processes inherit the environment: point them at the seeded
+    # database (importing the image benchmark switched it to its own directory)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DB_PATH}"
+    os.environ["STORAGE_LOCAL_ROOT"] = str(BENCH_DIR / "uploads")
+    os.environ["AI_CACHE_DIR"] = str(BENCH_DIR / "ai_cache")
+
+    token = create_access_token({"sub": "bench"})
+    headers = {"Authorization": f"Bearer {token}"}
+    jobs = [("/api/stories/new?limit=10", headers)] * args.requests
+    loop = asyncio.get_running_loop()
+    print(f"{args.stories} stories, {args.requests} requests, concurrency {args.concurrency}")
+    for feed_label, label, settings in CONFIGURATIONS:
+        os.environ.update(settings)
+        server, port = start_server("main:app")
+        await loop.run_in_executor(None, run_load, port, jobs[:args.concurrency], args.concurrency)  # warm up
+        elapsed, results = await loop.run_in_executor(None, run_load, port, jobs, args.concurrency)
+        print(f"{feed_label}, {label}")
+        report("", elapsed, results)
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    asyncio.run(main(parser.parse_args()))
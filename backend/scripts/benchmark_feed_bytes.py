@@ -0,0 +1,63 @@
+"""
+Image bytes transferred per story feed page, before and after the image pipeline.
+
+Generates illustration-like PNGs the size the image model returns, runs them
+through the same processing as uploads and generated images, and compares
+the cover bytes a feed page downloads when cards use the original file
+versus the thumb/medium WebP variants.
+
+    cd backend
+    python -m scripts.benchmark_feed_bytes --page-size 10
+"""
+import argparse
+import io
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image, ImageDraw, ImageFilter  # noqa: E402
+
+from app.utils.image_processing import process_image  # noqa: E402
+from config import Config  # noqa: E402
+
+
+def sample_png(seed: int, size: int) -> bytes:
+    """Soft shapes over a gradient with light noise, similar to a generated illustration."""
+    rng = random.Random(seed)
+    image = Image.linear_gradient("L").resize((size, size)).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y, r = rng.randrange(size), rng.randrange(size), rng.randrange(size // 20, size // 4)
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(rng.randrange(256) for _ in range(3)))
+    image = image.filter(ImageFilter.GaussianBlur(3))
+    noise = Image.effect_noise((size, size), 12).convert("RGB")
+    image = Image.blend(image, noise, 0.08)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def main(args):
+    totals = {"original": 0}
+    for seed in range(args.page_size):
+        original = sample_png(seed, args.image_size)
+        totals["original"] += len(original)
+        for name, extension, encoded in process_image(
+            original, Config.IMAGE_MAX_DIMENSION, Config.IMAGE_VARIANT_WIDTHS, Config.IMAGE_QUALITY
+        ):
+            key = f"{name}{extension}"
+            totals[key] = totals.get(key, 0) + len(encoded)
+
+    print(f"feed page of {args.page_size} cards, {args.image_size}px source images")
+    for key, total in totals.items():
+        ratio = total / totals["original"] * 100
+        print(f"  {key:<14} {total / 1024:>9.1f} KiB  ({ratio:5.1f}% of original)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--image-size", type=int, default=1024)
+    main(parser.parse_args())
@@ -0,0 +1,175 @@
+"""
+Deep-page latency of the story feeds: LIMIT/OFFSET versus keyset cursors.
+
+Bulk-loads a temporary SQLite database with the current schema (including
+the (sort_key, id) indexes), then times get_stories_with_filter for the
+same page reached by ?offset= and by ?cursor= for each feed ordering, and
+checks both modes return the same stories.
+
+    cd backend
+    python -m scripts.benchmark_feed_pagination --stories 500000 --page 1000
+
+seed_stories() is shared with the other database benchmarks.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BENCH_DIR = Path(tempfile.mkdtemp(prefix="feed-bench-"))
+DB_PATH = BENCH_DIR / "bench.db"
+
+# Must be set before the app (and config.py) is imported
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DB_PATH}"
+os.environ["AI_PROVIDER"] = "stub"
+os.environ.setdefault("JWT_SECRET_KEY", uuid.uuid4().hex)
+sys.path.insert(0, str(BACKEND_DIR))
+
+from sqlalchemy import asc, desc  # noqa: E402
+from sqlalchemy.future import select  # noqa: E402
+
+from app.core.database import engine, metadata, read_engine, read_session_maker  # noqa: E402
+from app.core.migrations import run_migrations  # noqa: E402
+from app.models import OrmStory  # noqa: E402
+from app.services.story_service import encode_cursor, get_stories_with_filter  # noqa: E402
+
+CATEGORIES = ["macera", "bilim", "masal", "hayvanlar", "uzay"]
+AGE_GROUPS = ["3-6", "7-10", "11-14", "all"]
+WORDS = (
+    "ejderha orman deniz yıldız kedi köpek ışık gölge dağ nehir rüzgar bulut güneş ay "
+    "kale prenses şövalye uzay gemi robot çiçek ağaç kuş balık ırmak İstanbul ılık "
+    "sihir kitap okul arkadaş macera hazine harita ada korsan kar buz ateş yol köprü"
+).split()
+FEEDS = [
+    ("/new", OrmStory.created_at, desc),
+    ("/popular", OrmStory.likes, desc),
+    ("/filter read_count asc", OrmStory.read_count, asc),
+]
+
+
+def sentence(rng, words, vocabulary=WORDS):
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+async def create_schema():
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.create_all)
+        await run_migrations(conn)
+
+
+def seed_stories(db_path, count, pages_per_story=0, page_words=0, legacy_content_bytes=0, seed=0, vocabulary=WORDS):
+    """
+    Bulk-insert one author and count stories straight through sqlite3.
+
+    pages_per_story adds story_pages rows of page_words words each;
+    legacy_content_bytes fills the old stories.content column the way rows
+    looked before pages moved to their own table. Titles, descriptions and
+    pages draw their words uniformly from vocabulary.
+    """
+    rng = random.Random(seed)
+    started = datetime(2024, 1, 1)
+    connection = sqlite3.connect(db_path)
+    connection.execute(
+        "INSERT INTO users (id, username, email, hashed_password) "
+        "VALUES (1, 'bench', 'bench@example.com', 'x')"
+    )
+    filler = ("x" * legacy_content_bytes) if legacy_content_bytes else ""
+    batch_size = 10000
+    for first in range(1, count + 1, batch_size):
+        stories, pages = [], []
+        for story_id in range(first, min(first + batch_size, count + 1)):
+            created_at = (started + timedelta(seconds=rng.randrange(60 * 86400))).strftime("%Y-%m-%d %H:%M:%S")
+            stories.append((
+                story_id, sentence(rng, 4, vocabulary), None, sentence(rng, 12, vocabulary), filler,
+                pages_per_story, rng.randrange(1000), rng.randrange(100000), rng.choice(CATEGORIES),
+                rng.choice(AGE_GROUPS), int(rng.random() < 0.05), created_at, created_at
+            ))
+            pages.extend((story_id, index, sentence(rng, page_words, vocabulary)) for index in range(pages_per_story))
+        connection.executemany(
+            "INSERT INTO stories (id, title, image, description, content, page_count, likes, read_count, "
+            "category, age_group, featured, created_at, updated_at, version, read_time, is_interactive, author_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, 5, 1, 1)",
+            stories
+        )
+        if pages:
+            connection.executemany(
+                "INSERT INTO story_pages (story_id, page_index, text, created_at, updated_at) "
+                "VALUES (?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)",
+                pages
+            )
+    connection.commit()
+    connection.execute("ANALYZE")
+    connection.close()
+
+
+async def timed(call, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = await call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+async def cursor_before(sort_column, sort_direction, offset):
+    """The cursor a client holds after paging to offset (the last story of the previous page)."""
+    async with read_session_maker() as db:
+        row = (await db.execute(
+            select(sort_column, OrmStory.id)
+            .order_by(sort_direction(sort_column), sort_direction(OrmStory.id))
+            .offset(offset - 1)
+            .limit(1)
+        )).one()
+    return encode_cursor(sort_column, sort_direction, row[0], row[1])
+
+
+async def main(args):
+    await create_schema()
+    load_started = time.perf_counter()
+    seed_stories(DB_PATH, args.stories)
+    print(f"{args.stories} stories loaded in {time.perf_counter() - load_started:.1f}s; "
+          f"page {args.page} of {args.limit}, median of {args.repeat} runs")
+
+    offset = (args.page - 1) * args.limit
+    for label, sort_column, sort_direction in FEEDS:
+        async def by_offset():
+            async with read_session_maker() as db:
+                return await get_stories_with_filter(
+                    db, True, sort_column, sort_direction, args.limit, offset, include_total=False
+                )
+
+        cursor = await cursor_before(sort_column, sort_direction, offset)
+
+        async def by_cursor():
+            async with read_session_maker() as db:
+                return await get_stories_with_filter(
+                    db, True, sort_column, sort_direction, args.limit, cursor=cursor, include_total=False
+                )
+
+        offset_ms, (_, offset_stories, _) = await timed(by_offset, args.repeat)
+        cursor_ms, (_, cursor_stories, _) = await timed(by_cursor, args.repeat)
+        same = [story.id for story in offset_stories] == [story.id for story in cursor_stories]
+        print(f"  {label:<24} offset {offset_ms:>8.2f} ms   cursor {cursor_ms:>6.2f} ms   "
+              f"{offset_ms / cursor_ms:>6.1f}x  same page: {same}")
+
+    await engine.dispose()
+    await read_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=500000)
+    parser.add_argument("--page", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,179 @@
+"""
+Throughput of /uploads image serving: the old bare StaticFiles mount versus
+the storage route (immutable Cache-Control, strong ETags, 304s, Range).
+
+Stores sample images through the real image pipeline in a temporary local
+storage root, serves the same directory from both apps (each in its own
+uvicorn process) and measures, over keep-alive connections:
+
+  full     plain GETs (200), requests/s and MiB/s
+  revisit  what a browser sends when a story page is viewed again: the mount
+           has no freshness lifetime, so every image is revalidated (304);
+           with the route the immutable response is reused without a request
+  range    GETs of the first 64 KiB of each image (206)
+
+    cd backend
+    python -m scripts.benchmark_image_serving --images 20 --requests 2000 --concurrency 16
+"""
+import argparse
+import asyncio
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+# Shared with the server processes through the environment
+BENCH_DIR = Path(os.environ.setdefault("SERVE_BENCH_DIR", tempfile.mkdtemp(prefix="serve-bench-")))
+
+# Must be set before the app (and config.py) is imported
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{BENCH_DIR / 'bench.db'}"
+os.environ["AI_PROVIDER"] = "stub"
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["STORAGE_LOCAL_ROOT"] = str(BENCH_DIR / "uploads")
+os.environ.setdefault("JWT_SECRET_KEY", uuid.uuid4().hex)
+sys.path.insert(0, str(BACKEND_DIR))
+
+from starlette.applications import Starlette  # noqa: E402
+from starlette.routing import Mount  # noqa: E402
+from starlette.staticfiles import StaticFiles  # noqa: E402
+
+from scripts.benchmark_feed_bytes import sample_png  # noqa: E402
+
+BROWSER_ACCEPT = "image/avif,image/webp,image/apng,image/*,*/*;q=0.8"
+RANGE_BYTES = 64 * 1024
+
+
+async def store_samples(count, size):
+    from app.utils.file_utils import store_image
+    from app.utils.image_processing import shutdown_image_pool
+    paths = [(await store_image(sample_png(seed, size))).path for seed in range(count)]
+    shutdown_image_pool()
+    return paths
+
+
+def mount_app():
+    """The previous setup: a bare StaticFiles mount over the uploads directory."""
+    return Starlette(routes=[Mount("/uploads", StaticFiles(directory=BENCH_DIR / "uploads"))])
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app_path, factory=False):
+    """Run the app in its own uvicorn process so the client threads do not share its GIL."""
+    port = free_port()
+    command = [sys.executable, "-m", "uvicorn", app_path, "--port", str(port), "--log-level", "warning"]
+    if factory:
+        command.append("--factory")
+    server = subprocess.Popen(command, cwd=BACKEND_DIR)
+    for _ in range(200):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return server, port
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f"{app_path} did not start")
+
+
+def client_worker(port, jobs, results, lock):
+    """Pull (path, headers) jobs over one keep-alive connection; record (status, body bytes)."""
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    while True:
+        with lock:
+            if not jobs:
+                break
+            path, headers = jobs.pop()
+        connection.request("GET", path, headers=headers)
+        response = connection.getresponse()
+        body = response.read()
+        results.append((response.status, len(body), dict(response.getheaders())))
+    connection.close()
+
+
+def run_load(port, jobs, concurrency):
+    jobs = list(jobs)
+    results = []
+    lock = threading.Lock()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client_worker, port, jobs, results, lock)
+    return time.perf_counter() - started, results
+
+
+def revisit_jobs(paths, first_responses):
+    """Requests a browser makes for a repeat page view, given the headers it cached."""
+    jobs = []
+    for path in paths:
+        cached = {key.lower(): value for key, value in first_responses[path].items()}
+        if "immutable" in cached.get("cache-control", ""):
+            continue  # fresh for a year: served from the browser cache
+        conditional = {"Accept": BROWSER_ACCEPT}
+        if "etag" in cached:
+            conditional["If-None-Match"] = cached["etag"]
+        jobs.append((path, conditional))
+    return jobs
+
+
+def report(label, elapsed, results):
+    statuses = {}
+    for status, _, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    transferred = sum(size for _, size, _ in results)
+    rate = len(results) / elapsed if elapsed else 0.0
+    print(f"  {label:<8} {rate:>9.0f} req/s  {transferred / elapsed / 2**20 if elapsed else 0:>8.1f} MiB/s  {statuses}")
+
+
+async def main(args):
+    paths = await store_samples(args.images, args.image_size)
+    loop = asyncio.get_running_loop()
+    print(f"{args.images} images of {args.image_size}px, {args.requests} requests, concurrency {args.concurrency}")
+    for label, app_path, factory in (
+        ("mount", "scripts.benchmark_image_serving:mount_app", True),
+        ("route", "main:app", False),
+    ):
+        server, port = start_server(app_path, factory)
+        print(label)
+        headers = {"Accept": BROWSER_ACCEPT}
+        full_jobs = [(paths[i % len(paths)], headers) for i in range(args.requests)]
+        elapsed, results = await loop.run_in_executor(None, run_load, port, full_jobs, args.concurrency)
+        report("full", elapsed, results)
+
+        first_responses = {}
+        for path in paths:
+            _, page_results = await loop.run_in_executor(None, run_load, port, [(path, headers)], 1)
+            first_responses[path] = page_results[0][2]
+        page_jobs = revisit_jobs(paths, first_responses)
+        views = max(1, args.requests // len(paths))
+        elapsed, results = await loop.run_in_executor(None, run_load, port, page_jobs * views, args.concurrency)
+        print(f"  revisit  {len(page_jobs)} requests per repeat page view of {len(paths)} images")
+        if results:
+            report("", elapsed, results)
+
+        range_headers = {**headers, "Range": f"bytes=0-{RANGE_BYTES - 1}"}
+        range_jobs = [(paths[i % len(paths)], range_headers) for i in range(args.requests)]
+        elapsed, results = await loop.run_in_executor(None, run_load, port, range_jobs, args.concurrency)
+        report("range", elapsed, results)
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--image-size", type=int, default=1024)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,117 @@
+"""
+Bytes read and latency per story list page: full ORM rows versus the
+StoryList column projection.
+
+Bulk-loads a temporary SQLite database whose stories still carry a 10 KB
+legacy content column, then times one /new page built the old way (whole
+OrmStory rows with selectinload for author and tags, validated into
+StoryList) and through get_stories_with_filter, and sums the size of every
+column value each way reads from the database.
+
+    cd backend
+    python -m scripts.benchmark_list_projection --stories 20000 --content-bytes 10000
+"""
+import argparse
+import asyncio
+
+from scripts.benchmark_feed_pagination import DB_PATH, create_schema, seed_stories, timed  # noqa: E402 (sets up the env)
+
+from sqlalchemy import desc  # noqa: E402
+from sqlalchemy.future import select  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+
+from app.core.database import engine, read_engine, read_session_maker  # noqa: E402
+from app.models import OrmStory, OrmTag, OrmUser, StoryList  # noqa: E402
+from app.models.story import story_tags  # noqa: E402
+from app.services.story_service import get_stories_with_filter  # noqa: E402
+
+PROJECTED_COLUMNS = [
+    OrmStory.id, OrmStory.title, OrmStory.image, OrmStory.description, OrmStory.category, OrmStory.likes,
+    OrmUser.id, OrmUser.username, OrmUser.email, OrmStory.created_at
+]
+
+
+def value_bytes(rows):
+    return sum(len(str(value).encode()) for row in rows for value in row if value is not None)
+
+
+async def full_rows_page(limit, offset):
+    """The list path before the projection."""
+    async with read_session_maker() as db:
+        result = await db.execute(
+            select(OrmStory)
+            .options(selectinload(OrmStory.author), selectinload(OrmStory.tags))
+            .order_by(desc(OrmStory.created_at), desc(OrmStory.id))
+            .limit(limit)
+            .offset(offset)
+        )
+        return [StoryList.model_validate(story) for story in result.scalars().all()]
+
+
+async def projected_page(limit, offset):
+    async with read_session_maker() as db:
+        _, stories, _ = await get_stories_with_filter(
+            db, True, OrmStory.created_at, desc, limit, offset, include_total=False
+        )
+        return stories
+
+
+async def bytes_read(limit, offset):
+    """Sum of the column values each path fetches for the page: (full rows, projection)."""
+    stories = OrmStory.__table__
+    users = OrmUser.__table__
+    async with read_session_maker() as db:
+        page = (await db.execute(
+            select(stories).order_by(desc(stories.c.created_at), desc(stories.c.id)).limit(limit).offset(offset)
+        )).all()
+        author_ids = {row.author_id for row in page}
+        story_ids = [row.id for row in page]
+        authors = (await db.execute(select(users).where(users.c.id.in_(author_ids)))).all()
+        tags = (await db.execute(
+            select(story_tags.c.story_id, OrmTag.__table__)
+            .join(OrmTag, OrmTag.id == story_tags.c.tag_id)
+            .where(story_tags.c.story_id.in_(story_ids))
+        )).all()
+        projected = (await db.execute(
+            select(*PROJECTED_COLUMNS)
+            .join(OrmUser, OrmUser.id == OrmStory.author_id)
+            .order_by(desc(OrmStory.created_at), desc(OrmStory.id))
+            .limit(limit)
+            .offset(offset)
+        )).all()
+    return value_bytes(page) + value_bytes(authors) + value_bytes(tags), value_bytes(projected)
+
+
+async def main(args):
+    await create_schema()
+    seed_stories(DB_PATH, args.stories, legacy_content_bytes=args.content_bytes)
+    print(f"{args.stories} stories with {args.content_bytes} bytes of legacy content, median of {args.repeat} runs")
+
+    for page in args.pages:
+        offset = (page - 1) * args.limit
+
+        async def before():
+            return await full_rows_page(args.limit, offset)
+
+        async def after():
+            return await projected_page(args.limit, offset)
+
+        before_ms, before_stories = await timed(before, args.repeat)
+        after_ms, after_stories = await timed(after, args.repeat)
+        before_bytes, after_bytes = await bytes_read(args.limit, offset)
+        same = [story.model_dump() for story in before_stories] == [story.model_dump() for story in after_stories]
+        print(f"  page {page:<5} full rows {before_bytes / 1024:>7.1f} KiB {before_ms:>7.2f} ms   "
+              f"projection {after_bytes / 1024:>6.1f} KiB {after_ms:>6.2f} ms   same response: {same}")
+
+    await engine.dispose()
+    await read_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=20000)
+    parser.add_argument("--content-bytes", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 100])
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,125 @@
+"""
+Stress test for like/dislike toggles on one story with a large reaction set.
+
+Loads a temporary SQLite database with one story and --reactions users who
+already reacted to it, then times like/dislike taps through the story
+service, sequentially and concurrently, and checks that the story's net
+score still equals the sum of its reaction rows. For reference it also times
+what every tap used to do before reactions became single rows: loading the
+full liker and disliker lists.
+
+    cd backend
+    python -m scripts.benchmark_reactions --reactions 100000 --taps 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import random
+import sqlite3
+import statistics
+import time
+
+from scripts.benchmark_feed_pagination import DB_PATH, create_schema, seed_stories, timed  # noqa: E402 (sets up the env)
+
+from sqlalchemy import func  # noqa: E402
+from sqlalchemy.future import select  # noqa: E402
+
+from app.core.database import async_session_maker, engine, read_engine  # noqa: E402
+from app.models import OrmStory, OrmUser  # noqa: E402
+from app.models.story import story_reactions  # noqa: E402
+from app.services.story_service import process_story_dislike, process_story_like  # noqa: E402
+
+STORY_ID = 1
+
+
+def seed_reactions(db_path, count, like_ratio, seed=0):
+    """count extra users, each with a reaction on STORY_ID; the net score is stored on the story."""
+    rng = random.Random(seed)
+    connection = sqlite3.connect(db_path)
+    connection.executemany(
+        "INSERT INTO users (id, username, email, hashed_password) VALUES (?, ?, ?, 'x')",
+        ((user_id, f"user{user_id}", f"user{user_id}@example.com") for user_id in range(2, count + 2))
+    )
+    reactions = [(STORY_ID, user_id, 1 if rng.random() < like_ratio else -1) for user_id in range(2, count + 2)]
+    connection.executemany("INSERT INTO story_reactions (story_id, user_id, value) VALUES (?, ?, ?)", reactions)
+    connection.execute("UPDATE stories SET likes = ? WHERE id = ?", (sum(value for _, _, value in reactions), STORY_ID))
+    connection.commit()
+    connection.close()
+
+
+async def tap(user_id, like):
+    started = time.perf_counter()
+    async with async_session_maker() as db:
+        if like:
+            await process_story_like(db, STORY_ID, user_id)
+        else:
+            await process_story_dislike(db, STORY_ID, user_id)
+    return (time.perf_counter() - started) * 1000
+
+
+async def consistent():
+    async with async_session_maker() as db:
+        stored = (await db.execute(select(OrmStory.likes).where(OrmStory.id == STORY_ID))).scalar_one()
+        summed = (await db.execute(
+            select(func.coalesce(func.sum(story_reactions.c.value), 0)).where(story_reactions.c.story_id == STORY_ID)
+        )).scalar_one()
+    return stored, summed
+
+
+async def load_reactor_lists():
+    """The old per-tap work: every liker and disliker as a user row."""
+    async with async_session_maker() as db:
+        rows = (await db.execute(
+            select(OrmUser, story_reactions.c.value)
+            .join(story_reactions, story_reactions.c.user_id == OrmUser.id)
+            .where(story_reactions.c.story_id == STORY_ID)
+        )).all()
+    return len(rows)
+
+
+def report(label, samples, elapsed):
+    p95 = statistics.quantiles(samples, n=20)[18]
+    print(f"  {label:<12} {len(samples) / elapsed:>8.0f} taps/s   p50 {statistics.median(samples):6.2f} ms   "
+          f"p95 {p95:6.2f} ms   max {max(samples):7.2f} ms")
+
+
+async def main(args):
+    await create_schema()
+    seed_stories(DB_PATH, 1)
+    seed_reactions(DB_PATH, args.reactions, args.like_ratio)
+    print(f"1 story with {args.reactions} reactions; {args.taps} taps per run")
+
+    rng = random.Random(1)
+    users = [rng.randrange(2, args.reactions + 2) for _ in range(args.taps)]
+    actions = [rng.random() < 0.5 for _ in range(args.taps)]
+
+    started = time.perf_counter()
+    samples = [await tap(user_id, like) for user_id, like in zip(users, actions)]
+    report("sequential", samples, time.perf_counter() - started)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(user_id, like):
+        async with semaphore:
+            return await tap(user_id, like)
+
+    started = time.perf_counter()
+    samples = await asyncio.gather(*(limited(user_id, not like) for user_id, like in zip(users, actions)))
+    report(f"{args.concurrency} at once", samples, time.perf_counter() - started)
+
+    stored, summed = await consistent()
+    print(f"  net score {stored}, sum of reaction rows {summed}: {'consistent' if stored == summed else 'MISMATCH'}")
+
+    old_ms, loaded = await timed(load_reactor_lists, 5)
+    print(f"  old per-tap liker/disliker list load: {loaded} user rows in {old_ms:.1f} ms (median of 5)")
+
+    await engine.dispose()
+    await read_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reactions", type=int, default=100000)
+    parser.add_argument("--like-ratio", type=float, default=0.7)
+    parser.add_argument("--taps", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
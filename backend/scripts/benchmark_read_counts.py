@@ -0,0 +1,104 @@
+"""
+Write transactions per story read: commit-per-read versus the write-behind
+read counter.
+
+Bulk-loads a temporary SQLite database, then serves a read-heavy load of
+story detail reads from concurrent workers two ways: the old path (an atomic
+UPDATE read_count + 1 and a commit on every read) and the current one
+(read_count_buffer.record, flushed in the background). Commits on the write
+engine are counted with a SQLAlchemy event, and the stored read counts are
+checked against the number of reads.
+
+    cd backend
+    python -m scripts.benchmark_read_counts --stories 1000 --reads 20000 --concurrency 16
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from scripts.benchmark_feed_pagination import DB_PATH, create_schema, seed_stories  # noqa: E402 (sets up the env)
+
+from sqlalchemy import event, func, update  # noqa: E402
+from sqlalchemy.future import select  # noqa: E402
+
+from app.core.database import async_session_maker, engine, read_engine, read_session_maker  # noqa: E402
+from app.models import OrmStory  # noqa: E402
+from app.services.read_counter import read_count_buffer  # noqa: E402
+from app.services.story_service import get_story_detail_by_id  # noqa: E402
+
+commits = 0
+
+
+@event.listens_for(engine.sync_engine, "commit")
+def count_commit(conn):
+    global commits
+    commits += 1
+
+
+async def commit_per_read(story_id):
+    """The detail route before the buffer."""
+    async with async_session_maker() as db:
+        await db.execute(update(OrmStory).where(OrmStory.id == story_id).values(read_count=OrmStory.read_count + 1))
+        await db.commit()
+    async with read_session_maker() as read_db:
+        await get_story_detail_by_id(read_db, story_id)
+
+
+async def buffered_read(story_id):
+    read_count_buffer.record(story_id)
+    async with read_session_maker() as read_db:
+        await get_story_detail_by_id(read_db, story_id)
+
+
+async def total_read_count():
+    async with read_session_maker() as db:
+        return (await db.execute(select(func.sum(OrmStory.read_count)))).scalar_one()
+
+
+async def run_load(read, story_ids, concurrency):
+    queue = list(story_ids)
+
+    async def worker():
+        while queue:
+            await read(queue.pop())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started
+
+
+async def main(args):
+    global commits
+    await create_schema()
+    seed_stories(DB_PATH, args.stories, pages_per_story=4, page_words=40)
+    rng = random.Random(0)
+    # Skewed towards popular stories, like real traffic
+    story_ids = [min(args.stories, int(rng.paretovariate(1.2))) for _ in range(args.reads)]
+    print(f"{args.reads} detail reads over {args.stories} stories, concurrency {args.concurrency}, "
+          f"flush every {args.flush_interval}s")
+
+    read_count_buffer.flush_interval_seconds = args.flush_interval
+    for label, read in (("commit per read", commit_per_read), ("write-behind", buffered_read)):
+        before_total = await total_read_count()
+        commits = 0
+        if read is buffered_read:
+            read_count_buffer.start()
+        elapsed = await run_load(read, story_ids, args.concurrency)
+        if read is buffered_read:
+            await read_count_buffer.stop()
+        counted = await total_read_count() - before_total
+        print(f"  {label:<16} {args.reads / elapsed:>7.0f} reads/s   {commits:>6} commits "
+              f"({commits / elapsed:>7.1f}/s)   read_count +{counted}")
+
+    await engine.dispose()
+    await read_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=1000)
+    parser.add_argument("--reads", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--flush-interval", type=float, default=5.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,94 @@
+"""
+Story search latency: the FTS5 index versus the old title/description ILIKE.
+
+Bulk-loads a temporary SQLite database with stories that have page text,
+builds the search index the way startup does, then times one page of
+/filter?query= results through get_stories_with_filter for both conditions
+and reports how many stories each one matches.
+
+    cd backend
+    python -m scripts.benchmark_search --stories 100000
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+
+from scripts.benchmark_feed_pagination import DB_PATH, WORDS, create_schema, seed_stories, timed  # noqa: E402 (sets up the env)
+
+from sqlalchemy import desc, func, or_  # noqa: E402
+from sqlalchemy.future import select  # noqa: E402
+
+from app.core.database import engine, read_engine, read_session_maker  # noqa: E402
+from app.models import OrmStory  # noqa: E402
+from app.services.story_search import ensure_search_index, search_condition  # noqa: E402
+from app.services.story_service import get_stories_with_filter  # noqa: E402
+
+QUERIES = ["ejderha", "ejderha kale", "İSTANBUL", "ırm", "zümrüt"]
+SYLLABLES = ["ba", "ce", "dı", "fo", "gü", "ha", "ke", "lı", "mo", "nü", "pa", "re", "sı", "to", "yü", "za"]
+
+
+def story_vocabulary(size, seed=0):
+    """WORDS plus made-up Turkish-looking words, so each word is in roughly 1% of stories, not all of them."""
+    made_up = ["".join(parts) for parts in itertools.product(SYLLABLES, repeat=4)]
+    random.Random(seed).shuffle(made_up)
+    return WORDS + made_up[:size - len(WORDS)]
+
+
+def ilike_condition(query):
+    """The condition /filter?query= used before the search index."""
+    search_query = f"%{query}%"
+    return or_(OrmStory.title.ilike(search_query), OrmStory.description.ilike(search_query))
+
+
+async def count_matches(condition):
+    async with read_session_maker() as db:
+        return (await db.execute(select(func.count(OrmStory.id)).where(condition))).scalar_one()
+
+
+async def main(args):
+    await create_schema()
+    load_started = time.perf_counter()
+    seed_stories(
+        DB_PATH, args.stories, pages_per_story=args.pages, page_words=args.page_words,
+        vocabulary=story_vocabulary(args.vocabulary)
+    )
+    async with engine.begin() as conn:
+        await ensure_search_index(conn)
+    print(f"{args.stories} stories with {args.pages} pages of {args.page_words} words loaded and indexed in "
+          f"{time.perf_counter() - load_started:.1f}s; first page of {args.limit}, median of {args.repeat} runs")
+
+    for query in QUERIES:
+        async def by_ilike():
+            async with read_session_maker() as db:
+                return await get_stories_with_filter(
+                    db, ilike_condition(query), OrmStory.created_at, desc, args.limit, include_total=False
+                )
+
+        async def by_index():
+            async with read_session_maker() as db:
+                return await get_stories_with_filter(
+                    db, search_condition(query), None, limit=args.limit, include_total=False, search_query=query
+                )
+
+        ilike_ms, _ = await timed(by_ilike, args.repeat)
+        index_ms, _ = await timed(by_index, args.repeat)
+        ilike_matches = await count_matches(ilike_condition(query))
+        index_matches = await count_matches(search_condition(query))
+        print(f"  {query!r:<16} ILIKE {ilike_ms:>8.2f} ms ({ilike_matches:>6} matches)   "
+              f"FTS {index_ms:>8.2f} ms ({index_matches:>6} matches)")
+
+    await engine.dispose()
+    await read_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=100000)
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--page-words", type=int, default=40)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,147 @@
+"""
+A 500 MB fake upload against /api/stories/upload-image: server memory stays
+flat and the request is rejected long before the body is read.
+
+Runs the app in its own uvicorn process (fresh per case) and streams a
+generated multipart body over a raw socket, 64 KiB at a time, stopping as
+soon as the server answers. For each case it reports the status, how much
+of the body the client got to send before the answer (including what the
+socket buffers absorbed), and the server's resident memory before the
+request and at its peak (VmHWM, Linux only).
+
+  bad magic     500 MB of zeros named .png, chunked (no Content-Length)
+  oversize      500 MB starting with a PNG signature, chunked
+  declared      the oversize body with its Content-Length declared up front
+  small fake    a 2 MB non-image under the caps, rejected on its magic bytes
+
+    cd backend
+    python -m scripts.benchmark_upload_limits --size-mb 500
+"""
+import argparse
+import asyncio
+import os
+import select
+import socket
+import time
+
+from scripts.benchmark_feed_pagination import BENCH_DIR, DB_PATH, create_schema, seed_stories  # noqa: E402 (sets up the env)
+from scripts.benchmark_image_serving import start_server  # noqa: E402
+
+from app.auth.jwt import create_access_token  # noqa: E402
+from app.core.database import engine, read_engine  # noqa: E402
+from config import Config  # noqa: E402
+
+BOUNDARY = "benchboundary"
+CHUNK_BYTES = 64 * 1024
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def memory_kib(pid, field):
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def multipart_parts(prefix, size):
+    """The multipart body as (head, file chunks, tail), generated lazily so the client stays small too."""
+    head = (
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"fake.png\"\r\n"
+        f"Content-Type: image/png\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{BOUNDARY}--\r\n".encode()
+
+    def chunks():
+        if prefix:
+            yield prefix
+        zeros = bytes(CHUNK_BYTES)
+        remaining = size - len(prefix)
+        while remaining > 0:
+            yield zeros[:min(CHUNK_BYTES, remaining)]
+            remaining -= CHUNK_BYTES
+
+    return head, chunks(), tail
+
+
+def upload(port, token, prefix, size, declare_length):
+    """Stream the body until the server answers; returns (status, body bytes sent, seconds)."""
+    head, chunks, tail = multipart_parts(prefix, size)
+    headers = [
+        "POST /api/stories/upload-image HTTP/1.1",
+        f"Host: 127.0.0.1:{port}",
+        f"Authorization: Bearer {token}",
+        f"Content-Type: multipart/form-data; boundary={BOUNDARY}",
+        "Connection: close",
+    ]
+    headers.append(f"Content-Length: {len(head) + size + len(tail)}" if declare_length else "Transfer-Encoding: chunked")
+
+    def framed(data):
+        return data if declare_length else b"%x\r\n%s\r\n" % (len(data), data)
+
+    sent = 0
+    started = time.perf_counter()
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        sock.sendall(("\r\n".join(headers) + "\r\n\r\n").encode())
+        try:
+            for data in [head, *chunks, tail]:
+                if select.select([sock], [], [], 0)[0]:
+                    break  # the server has answered
+                sock.sendall(framed(data))
+                sent += len(data)
+            else:
+                if not declare_length:
+                    sock.sendall(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        response = b""
+        try:
+            while chunk := sock.recv(65536):
+                response += chunk
+        except ConnectionResetError:
+            pass
+    status = int(response.split(b" ", 2)[1]) if response.startswith(b"HTTP/") else None
+    return status, sent, time.perf_counter() - started
+
+
+async def main(args):
+    await create_schema()
+    seed_stories(DB_PATH, 1)
+    await engine.dispose()
+    await read_engine.dispose()
+
+    # The server processes inherit the environment (see benchmark_auth_cache)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DB_PATH}"
+    os.environ["STORAGE_LOCAL_ROOT"] = str(BENCH_DIR / "uploads")
+    os.environ["AI_CACHE_DIR"] = str(BENCH_DIR / "ai_cache")
+
+    token = create_access_token({"sub": "bench"})
+    size = args.size_mb * 1024 * 1024
+    print(f"MAX_UPLOAD_BYTES {Config.MAX_UPLOAD_BYTES}, MAX_REQUEST_BODY_BYTES {Config.MAX_REQUEST_BODY_BYTES}")
+    loop = asyncio.get_running_loop()
+    for label, prefix, case_size, declare_length in (
+        ("bad magic", b"", size, False),
+        ("oversize", PNG_SIGNATURE, size, False),
+        ("declared", PNG_SIGNATURE, size, True),
+        ("small fake", b"", 2 * 1024 * 1024, True),
+    ):
+        server, port = start_server("main:app")
+        rss_before = memory_kib(server.pid, "VmRSS")
+        status, sent, elapsed = await loop.run_in_executor(
+            None, upload, port, token, prefix, case_size, declare_length
+        )
+        peak = memory_kib(server.pid, "VmHWM")
+        memory = f"RSS {rss_before / 1024:.0f} MiB -> peak {peak / 1024:.0f} MiB" if peak else "RSS n/a"
+        print(f"  {label:<11} {case_size / 2**20:>5.0f} MiB body: {status}  after {sent / 2**20:>6.2f} MiB sent "
+              f"in {elapsed * 1000:>6.0f} ms   {memory}")
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,38 @@
+"""
+Run one upload garbage collection pass now and print its report.
+
+Uses the same database and storage settings as the app (.env / environment).
+With --dry-run nothing is deleted; the report lists what would be.
+
+    cd backend
+    python -m scripts.gc_uploads --dry-run
+    python -m scripts.gc_uploads --grace-hours 48
+"""
+import argparse
+import asyncio
+import json
+import sys
+from dataclasses import asdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.database import engine  # noqa: E402
+from app.services.upload_gc import upload_gc  # noqa: E402
+
+
+async def main(args):
+    if args.grace_hours is not None:
+        upload_gc.grace_seconds = args.grace_hours * 3600
+    try:
+        report = await upload_gc.collect(dry_run=True if args.dry_run else None)
+    finally:
+        await engine.dispose()
+    print(json.dumps(asdict(report), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be deleted")
+    parser.add_argument("--grace-hours", type=float, help="override UPLOADS_GC_GRACE_SECONDS")
+    asyncio.run(main(parser.parse_args()))
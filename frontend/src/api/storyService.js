@@ -102,6 +102,19 @@ const storyService = {
     return await apiClient.get(`/api/stories/${storyId}`);
   },
 
+  /**
+   * Get a range of story pages
+   * @param {number} storyId - ID of the story
+   * @param {number} from - Index of the first page (inclusive)
+   * @param {number} to - Index after the last page (exclusive, optional)
+   * @returns {Promise} - Promise with API response ({ total, pages, next_from })
+   */
+  getStoryPages: async (storyId, from = 0, to) => {
+    return await apiClient.get(`/api/stories/${storyId}/pages`, {
+      params: { from, to },
+    });
+  },
+
   /**
    * Update a story
    * @param {number} storyId - ID of the story to update
@@ -124,6 +137,22 @@ const storyService = {
     });
   },
 
+  /**
+   * Edit story pages and tags without resending the whole story
+   * @param {number} storyId - ID of the story to edit
+   * @param {number} version - The story version the edits are based on
+   * @param {Array} operations - Page operations, e.g. { op: "replace", index: 2, page: { text, image } }
+   * @param {Array} tags - New tag names (optional, leaves tags unchanged when omitted)
+   * @returns {Promise} - Promise with API response (409 if the story changed meanwhile)
+   */
+  patchStory: async (storyId, version, operations = [], tags) => {
+    return await apiClient.patch(`/api/stories/${storyId}`, {
+      version,
+      operations,
+      tags,
+    });
+  },
+
   /**
    * Like a story
    * @param {number} storyId - ID of the story to like
@@ -163,10 +192,10 @@ const storyService = {
   },
 
   /**
-   * Generate a story using AI
+   * Queue AI story generation
    * @param {string} userPrompt - The user's prompt for story generation
    * @param {string} category - The category of the story
-   * @returns {Promise} - Promise with API response
+   * @returns {Promise} - Promise with API response (the queued job)
    */
   generateAIStory: async (userPrompt, category) => {
     return await apiClient.post("/api/stories/ai-generate", {
@@ -174,6 +203,15 @@ const storyService = {
       category: category,
     });
   },
+
+  /**
+   * Get the status of an AI generation job
+   * @param {string} jobId - The job ID returned by generateAIStory
+   * @returns {Promise} - Promise with API response
+   */
+  getAIJob: async (jobId) => {
+    return await apiClient.get(`/api/stories/ai-jobs/${jobId}`);
+  },
 };
 
 export default storyService;
@@ -51,9 +51,12 @@ const StoryCard = memo(({ story, featured = false }) => {
     return <div className="border border-red-500 p-4">Hikaye verisi yok!</div>;
   }
 
-  // Format the image URL properly
-  const imageUrl = story.image
-    ? getCompleteImageUrl(story.image)
+  // Format the image URL properly, preferring the small WebP variant for cards
+  const cardImage =
+    (featured ? story.image_variants?.medium : story.image_variants?.thumb) ||
+    story.image;
+  const imageUrl = cardImage
+    ? getCompleteImageUrl(cardImage)
     : "https://placehold.co/600x400/EEE/31343C";
 
   return (
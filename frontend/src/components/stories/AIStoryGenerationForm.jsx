@@ -69,13 +69,13 @@ const AIStoryGenerationForm = () => {
         autoClose: 2000,
       });
 
-      const response = await storyService.generateAIStory(
+      await storyService.generateAIStory(
         formData.userPrompt,
         formData.category
       );
 
       // Show success message and notify user about the story being ready shortly
-      toast.success("Hikaye başarıyla oluşturuldu!", {
+      toast.success("Hikaye oluşturma isteği alındı!", {
         position: "bottom-center",
         autoClose: 5000,
       });